@@ -4,8 +4,16 @@ load_dotenv()
 from flask import Flask, jsonify, render_template
 from flask_cors import CORS
 from config.settings import get_config
-from extensions import db, migrate
+from extensions import db, migrate, gemini, segment_store, export_store, alert_broker
 from routes import register_blueprints
+from commands import register_commands
+from middlewares.auth import init_auth
+from utils.log import init_logging
+from utils.encryption import init_cipher
+from utils.pagination import InvalidCursor
+from services.withdrawal_periods import withdrawal_periods
+from services.counters import init_counters
+from services.alert_stream import init_alert_stream
 
 
 def create_app(config_name=None):
@@ -14,6 +22,7 @@ def create_app(config_name=None):
   if config_name is None:
     config_name = os.getenv('FLASK_ENV', 'development')  
   app.config.from_object(get_config(config_name))
+  init_logging(app)
 
   CORS(app, resources={
     r"/api/*": {
@@ -27,7 +36,17 @@ def create_app(config_name=None):
 
   db.init_app(app)
   migrate.init_app(app, db)
+  init_auth(app)
+  init_cipher(app)
+  gemini.init_app(app)
+  segment_store.init_app(app)
+  export_store.init_app(app)
+  alert_broker.init_app(app)
+  withdrawal_periods.init_app(app)
+  init_counters(app)
+  init_alert_stream(app)
   register_blueprints(app)
+  register_commands(app)
 
   @app.route('/')
   def home():
@@ -41,6 +60,10 @@ def create_app(config_name=None):
   def not_found(error):
     return jsonify({'error': 'Resource not found'}), 404
 
+  @app.errorhandler(InvalidCursor)
+  def invalid_cursor(error):
+    return jsonify({'error': str(error)}), 400
+
   @app.errorhandler(500)
   def internal_error(error):
     db.session.rollback()
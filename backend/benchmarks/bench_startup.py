@@ -0,0 +1,43 @@
+import argparse, json, os, statistics, subprocess, sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+application = app_module.create_app()
+t2 = time.perf_counter()
+from extensions import firebase, cipher, gemini, segment_store
+print(json.dumps({
+  'import_ms': (t1 - t0) * 1000,
+  'create_app_ms': (t2 - t1) * 1000,
+  'initialized': [s.name for s in (firebase, cipher, gemini, segment_store) if s.initialized]
+}))
+"""
+
+def run_once():
+  env = dict(os.environ)
+  env.setdefault('DATABASE_URL', 'mysql+pymysql://root@localhost:3306/cattlesense_bench')
+  result = subprocess.run([sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+  return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(samples, key):
+  values = [s[key] for s in samples]
+  return {'min': round(min(values), 2), 'median': round(statistics.median(values), 2), 'max': round(max(values), 2)}
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure cold import and create_app() cost in fresh interpreters')
+  parser.add_argument('--runs', type=int, default=10)
+  args = parser.parse_args()
+
+  samples = [run_once() for _ in range(args.runs)]
+  initialized = sorted({name for s in samples for name in s['initialized']})
+  print(f"runs: {args.runs}")
+  print(f"import app:   {summarize(samples, 'import_ms')} ms")
+  print(f"create_app(): {summarize(samples, 'create_app_ms')} ms")
+  print(f"services initialized during startup: {initialized or 'none'}")
+
+if __name__ == '__main__':
+  main()
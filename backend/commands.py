@@ -0,0 +1,111 @@
+import click
+from datetime import datetime
+from flask.cli import AppGroup
+
+ledger_cli = AppGroup('ledger', help='Traceability ledger maintenance.')
+amu_cli = AppGroup('amu', help='Antimicrobial usage maintenance.')
+analytics_cli = AppGroup('analytics', help='Precomputed analytics maintenance.')
+partition_cli = AppGroup('partitions', help='Monthly table partition maintenance.')
+data_cli = AppGroup('data', help='Research dataset exports.')
+counters_cli = AppGroup('counters', help='Per-owner counter maintenance.')
+
+@ledger_cli.command('verify')
+@click.option('--district', default=None, help='Only verify animals on farms in this district.')
+@click.option('--state', default=None, help='Only verify animals on farms in this state.')
+@click.option('--workers', default=4, show_default=True, help='Verification processes (1 runs inline).')
+@click.option('--batch-rows', default=20000, show_default=True, help='Log rows handed to a worker at a time.')
+def verify_ledger(district, state, workers, batch_rows):
+  from services.chain_verifier import run_verification
+  run = run_verification(district=district, state=state, workers=workers, batch_rows=batch_rows)
+  click.echo(f'Run {run.id}: {run.animals_checked} animals, {run.logs_checked} logs ({run.legacy_logs} legacy), {run.broken_animals} broken chains')
+  for animal in run.broken_links or []:
+    reasons = ', '.join(f"{b['log_id']}:{b['reason']}" for b in animal['breaks'])
+    click.echo(f"  livestock {animal['livestock_id']}: {reasons}")
+
+@ledger_cli.command('checkpoint')
+@click.option('--date', 'checkpoint_date', default=None, help='Day to checkpoint (YYYY-MM-DD, default: yesterday UTC).')
+def checkpoint_ledger(checkpoint_date):
+  from services.checkpoints import create_checkpoints
+  day = datetime.strptime(checkpoint_date, '%Y-%m-%d').date() if checkpoint_date else None
+  daily = create_checkpoints(day)
+  if daily is None: click.echo('No traceability logs to checkpoint')
+  else: click.echo(f'{daily.checkpoint_date}: {daily.animal_count} animal checkpoints, root {daily.root_hash}')
+
+@ledger_cli.command('archive')
+@click.option('--older-than-days', default=None, type=int, help='Archive checkpointed logs older than this (default: TRACE_ARCHIVE_AFTER_DAYS).')
+def archive_ledger(older_than_days):
+  from services.archive import archive_segments
+  summary = archive_segments(older_than_days)
+  click.echo(f"Archived {summary['logs']} logs into {summary['segments']} segments ({summary['bytes']} bytes)")
+
+@amu_cli.command('rebuild-usage')
+def rebuild_usage_window():
+  from services.usage_window import rebuild_usage
+  click.echo(f'Rebuilt {rebuild_usage()} usage buckets')
+
+@amu_cli.command('prune-usage')
+def prune_usage_window():
+  from services.usage_window import prune_usage
+  click.echo(f'Removed {prune_usage()} expired usage buckets')
+
+@amu_cli.command('rebuild-rollup')
+@click.option('--since', 'since', default=None, help='Only rebuild days on or after this date (YYYY-MM-DD); default rebuilds everything.')
+def rebuild_farm_rollup(since):
+  from services.farm_rollup import rebuild_farm_usage
+  since = datetime.strptime(since, '%Y-%m-%d').date() if since else None
+  click.echo(f'Rebuilt {rebuild_farm_usage(since)} farm rollup rows')
+
+@analytics_cli.command('refresh')
+@click.option('--since', 'since', default=None, help='Recompute every day from this date (YYYY-MM-DD); default only recomputes days that changed.')
+def refresh_analytics(since):
+  from services.regional_analytics import refresh_regional_analytics
+  since = datetime.strptime(since, '%Y-%m-%d').date() if since else None
+  run = refresh_regional_analytics(since)
+  click.echo(f'Run {run.id}: {run.days_processed} days, {run.rows_written} regional rows')
+
+@partition_cli.command('ensure')
+@click.option('--months-ahead', default=None, type=int, help='Months past the current one to create (default: PARTITION_MONTHS_AHEAD).')
+def ensure_table_partitions(months_ahead):
+  from services.partitions import partitioning_supported, ensure_partitions
+  if not partitioning_supported():
+    click.echo('Partitioning is only set up on PostgreSQL; nothing to do')
+    return
+  created = ensure_partitions(months_ahead)
+  click.echo(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+
+@data_cli.command('export')
+@click.argument('request_id', type=int)
+@click.argument('output')
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'parquet']), default='csv', show_default=True)
+@click.option('--chunk-size', default=None, type=int, help='Rows fetched per chunk / Parquet row group (default: DATA_EXPORT_CHUNK).')
+def export_dataset(request_id, output, export_format, chunk_size):
+  from extensions import db
+  from models.analytics import DataRequest
+  from services.dataset_export import request_statement, write_export
+  data_request = db.session.get(DataRequest, request_id)
+  if not data_request: raise click.ClickException(f'Data request {request_id} not found')
+  written = write_export(request_statement(data_request), output, export_format, chunk_size)
+  click.echo(f'Wrote {written} bytes to {output}')
+
+@data_cli.command('fulfil')
+@click.option('--watch', is_flag=True, help='Keep polling for approved requests instead of exiting when none are left.')
+@click.option('--poll-seconds', default=30, show_default=True, help='Wait between polls with --watch.')
+def fulfil_data_requests(watch, poll_seconds):
+  from services.data_fulfilment import run_fulfilment
+  for job in run_fulfilment(watch, poll_seconds):
+    if job.status == 'completed': click.echo(f'Data request {job.data_request_id}: {job.rows_written} rows, {job.bytes_written} bytes ({job.export_format})')
+    else: click.echo(f'Data request {job.data_request_id}: failed on attempt {job.attempts}: {job.error}')
+
+@counters_cli.command('reconcile')
+def reconcile_owner_counters():
+  from services.counters import reconcile_counters
+  counters, fixed = reconcile_counters()
+  click.echo(f'Checked {counters} counters, corrected {fixed}')
+
+def register_commands(app):
+  app.cli.add_command(ledger_cli)
+  app.cli.add_command(amu_cli)
+  app.cli.add_command(analytics_cli)
+  app.cli.add_command(partition_cli)
+  app.cli.add_command(data_cli)
+  app.cli.add_command(counters_cli)
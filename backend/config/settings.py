@@ -1,11 +1,17 @@
-import os
+import json, os
 from datetime import timedelta
 
 class BaseConfig:
   SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
   SQLALCHEMY_TRACK_MODIFICATIONS = False
   SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 10, 'pool_recycle': 3600, 'pool_pre_ping': True, 'max_overflow': 20}
-  FIREBASE_CREDENTIALS_PATH = os.getenv('FIREBASE_CREDENTIALS_PATH', 'firebase-credentials.json')
+  FIREBASE_CREDENTIALS_PATH = os.getenv('FIREBASE_CREDENTIALS_PATH', 'serviceAccountKey.json')
+  FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID')
+  FIREBASE_VERIFIER = os.getenv('FIREBASE_VERIFIER', 'sdk')
+  FIREBASE_PUBLIC_KEYS_URL = os.getenv('FIREBASE_PUBLIC_KEYS_URL', 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com')
+  FIREBASE_CLOCK_SKEW_SECONDS = int(os.getenv('FIREBASE_CLOCK_SKEW_SECONDS', '0'))
+  AADHAAR_ENCRYPTION_KEY = os.getenv('AADHAAR_ENCRYPTION_KEY')
+  GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
   CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173').split(',')
   MAX_CONTENT_LENGTH = 16 * 1024 * 1024
   UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads/')
@@ -14,9 +20,44 @@ class BaseConfig:
   JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
   PAGINATION_DEFAULT = 20
   PAGINATION_MAX = 100
+  STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '500'))
+  DATA_EXPORT_CHUNK = int(os.getenv('DATA_EXPORT_CHUNK', '50000'))
+  DATA_EXPORT_URL = os.getenv('DATA_EXPORT_URL', 'exports/data-requests')
+  DATA_EXPORT_URL_EXPIRES = int(os.getenv('DATA_EXPORT_URL_EXPIRES', '3600'))
+  DATA_PSEUDONYM_KEY = os.getenv('DATA_PSEUDONYM_KEY')
+  DATA_FULFILMENT_FORMAT = os.getenv('DATA_FULFILMENT_FORMAT', 'parquet')
+  DATA_FULFILMENT_STALE_MINUTES = int(os.getenv('DATA_FULFILMENT_STALE_MINUTES', '30'))
+  DATA_FULFILMENT_MAX_ATTEMPTS = int(os.getenv('DATA_FULFILMENT_MAX_ATTEMPTS', '3'))
+  ALERT_BROKER_URL = os.getenv('ALERT_BROKER_URL', 'memory://')
+  ALERT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('ALERT_STREAM_HEARTBEAT_SECONDS', '15'))
+  ALERT_STREAM_MAX_SECONDS = int(os.getenv('ALERT_STREAM_MAX_SECONDS', '300'))
+  ALERT_STREAM_RETRY_MS = int(os.getenv('ALERT_STREAM_RETRY_MS', '3000'))
+  ALERT_COALESCE_WINDOW_HOURS = int(os.getenv('ALERT_COALESCE_WINDOW_HOURS', '24'))
+  ALERT_STREAM_BATCH = int(os.getenv('ALERT_STREAM_BATCH', '100'))
+  TRACE_ARCHIVE_URL = os.getenv('TRACE_ARCHIVE_URL', 'archive/traceability')
+  TRACE_ARCHIVE_AFTER_DAYS = int(os.getenv('TRACE_ARCHIVE_AFTER_DAYS', '365'))
+  LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+  LOG_REQUEST_SAMPLE_RATE = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', '0.1'))
+  LOG_AUTH_FAILURE_SAMPLE_RATE = float(os.getenv('LOG_AUTH_FAILURE_SAMPLE_RATE', '1.0'))
+  AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '5000'))
+  AUTH_PRINCIPAL_TTL_SECONDS = int(os.getenv('AUTH_PRINCIPAL_TTL_SECONDS', '60'))
+  WITHDRAWAL_CACHE_CHECK_SECONDS = int(os.getenv('WITHDRAWAL_CACHE_CHECK_SECONDS', '60'))
+  AMU_BATCH_MAX = int(os.getenv('AMU_BATCH_MAX', '5000'))
+  AMU_USAGE_THRESHOLD = int(os.getenv('AMU_USAGE_THRESHOLD', '3'))
+  AMU_USAGE_WINDOW_DAYS = int(os.getenv('AMU_USAGE_WINDOW_DAYS', '30'))
+  AMU_USAGE_RULES = {category.lower(): rule for category, rule in json.loads(os.getenv('AMU_USAGE_RULES', '{}')).items()}
+  AMU_METRICS_CHUNK = int(os.getenv('AMU_METRICS_CHUNK', '100000'))
+  AMU_STANDARD_WEIGHTS = json.loads(os.getenv('AMU_STANDARD_WEIGHTS', '{}'))
+  AMU_RESIDUE_PEAK_RATIO = float(os.getenv('AMU_RESIDUE_PEAK_RATIO', '100'))
+  AMU_RESIDUE_HORIZON_DAYS = int(os.getenv('AMU_RESIDUE_HORIZON_DAYS', '30'))
+  AMU_DDDVET = {ingredient.strip().lower(): doses for ingredient, doses in json.loads(os.getenv('AMU_DDDVET', '{}')).items()}
+  ANALYTICS_COMMIT_LAG_SECONDS = int(os.getenv('ANALYTICS_COMMIT_LAG_SECONDS', '300'))
+  PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
 
 class DevelopmentConfig(BaseConfig):
   DEBUG = True
+  LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+  LOG_REQUEST_SAMPLE_RATE = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', '1.0'))
   SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
   SQLALCHEMY_ECHO = False
 
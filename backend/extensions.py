@@ -1,5 +1,58 @@
+import importlib, os, threading
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
+class LazyService:
+  def __init__(self, name, factory):
+    self.name = name
+    self._factory = factory
+    self._instance = None
+    self._pid = None
+    self._config = None
+    self._lock = threading.Lock()
+
+  def init_app(self, app):
+    self._config = app.config
+    app.extensions[self.name] = self
+
+  def get(self):
+    if self._pid != os.getpid():
+      with self._lock:
+        if self._pid != os.getpid():
+          self._instance = self._resolve_factory()(self._current_config())
+          self._pid = os.getpid()
+    return self._instance
+
+  @property
+  def initialized(self):
+    return self._pid == os.getpid()
+
+  def reset(self):
+    with self._lock:
+      self._instance = None
+      self._pid = None
+
+  def __getattr__(self, attr):
+    if attr.startswith('_'): raise AttributeError(attr)
+    return getattr(self.get(), attr)
+
+  def _resolve_factory(self):
+    if callable(self._factory): return self._factory
+    module_name, _, attr = self._factory.partition(':')
+    if not module_name or not attr: raise ValueError(f'Factory for service "{self.name}" must look like "module:attr", got {self._factory!r}')
+    try: return getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e: raise ImportError(f'Cannot load factory {self._factory!r} for service "{self.name}": {e}') from e
+
+  def _current_config(self):
+    if has_app_context(): return current_app.config
+    return self._config if self._config is not None else os.environ
+
 db = SQLAlchemy()
-migrate = Migrate()
\ No newline at end of file
+migrate = Migrate()
+firebase = LazyService('firebase', 'middlewares.auth:create_firebase_app')
+cipher = LazyService('cipher', 'utils.encryption:create_cipher')
+gemini = LazyService('gemini', 'services.gemini:create_gemini_service')
+segment_store = LazyService('segment_store', 'services.archive:create_segment_store')
+export_store = LazyService('export_store', 'services.data_fulfilment:create_export_store')
+alert_broker = LazyService('alert_broker', 'services.alert_stream:create_alert_broker')
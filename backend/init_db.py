@@ -3,9 +3,10 @@ from extensions import db
 from sqlalchemy import create_engine, text
 from models.user import User, Farmer, Veterinarian, GovernmentOfficial, Researcher
 from models.livestock import Livestock, HealthRecord
-from models.amu import AntimicrobialRecord, Prescription, WithdrawalPeriod
-from models.requests import ConsultationRequest, Alert, TraceabilityLog
-from models.analytics import RegionalAnalytics, DataRequest, InspectionLog
+from models.amu import AntimicrobialRecord, AntimicrobialUsageDaily, FarmAmuDaily, Prescription, WithdrawalPeriod
+from models.requests import ConsultationRequest, Alert, TraceabilityLog, TraceabilityChainHead, TraceabilitySegment, TraceabilityCheckpoint, TraceabilityDailyRoot, ChainVerificationRun
+from models.counters import OwnerCounter
+from models.analytics import RegionalAnalytics, RegionalAnalyticsRun, DataRequest, DataRequestJob, InspectionLog
 import os
 
 def init_database():
@@ -45,9 +46,9 @@ def init_database():
       print("\nTables created:")
       tables = [
         "users", "farmers", "veterinarians", "government_officials", "researchers",
-        "livestock", "health_records", "antimicrobial_records", "prescriptions",
-        "withdrawal_periods", "consultation_requests", "alerts", "traceability_logs",
-        "regional_analytics", "data_requests", "inspection_logs"
+        "livestock", "health_records", "antimicrobial_records", "amu_usage_daily", "farm_amu_daily", "prescriptions",
+        "withdrawal_periods", "consultation_requests", "alerts", "traceability_logs", "traceability_chain_heads", "traceability_segments", "traceability_checkpoints", "traceability_daily_roots", "chain_verification_runs",
+        "regional_analytics", "regional_analytics_runs", "data_requests", "data_request_jobs", "inspection_logs", "owner_counters"
       ]
       for table in tables:
         print(f"   - {table}")
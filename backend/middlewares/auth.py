@@ -1,126 +1,171 @@
-from functools import wraps
-from flask import request, jsonify, g
+from dataclasses import dataclass
+from functools import cached_property, wraps
+from typing import Optional
+from flask import request, jsonify, g, current_app
 import firebase_admin
 from firebase_admin import credentials, auth
+from extensions import LazyService, firebase
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+from models.user import User
+from middlewares.token_cache import TokenCache, PRINCIPAL_FIELDS
+from middlewares.token_verifier import GOOGLE_PUBLIC_KEYS_URL, RETRY_SECONDS, OfflineTokenVerifier, PublicKeyStore, PublicKeysUnavailable
+from utils.log import get_logger
 import os
-import sys
 
-cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH', 'serviceAccountKey.json')
-print(f"Loading Firebase credentials from: {cred_path}")
-print(f"File exists: {os.path.exists(cred_path)}")
+logger = get_logger('auth')
+token_cache = TokenCache()
 
-try:
+def create_firebase_app(config):
+  cred_path = config.get('FIREBASE_CREDENTIALS_PATH', 'serviceAccountKey.json')
+  try: firebase_admin.delete_app(firebase_admin.get_app())
+  except ValueError: pass
   cred = credentials.Certificate(cred_path)
-  firebase_admin.initialize_app(cred)
-  print("Firebase Admin SDK initialized successfully")
-
-  with open(cred_path, 'r') as f:
-    import json
-    service_account = json.load(f)
-    print(f"Project ID: {service_account.get('project_id')}")
-    print(f"Client Email: {service_account.get('client_email')}")
-except ValueError as e:
-  if "already exists" in str(e): print("Firebase Admin SDK already initialized")
-  else:
-    print(f"Firebase initialization error: {e}")
-    sys.exit(1)
-except Exception as e:
-  print(f"Failed to initialize Firebase: {type(e).__name__}: {e}")
-  sys.exit(1)
+  app = firebase_admin.initialize_app(cred)
+  logger.info('Firebase Admin SDK initialized', extra={'fields': {'credentials_path': cred_path, 'project_id': cred.project_id, 'pid': os.getpid()}})
+  return app
+
+def create_offline_verifier(config):
+  key_store = PublicKeyStore(url=config.get('FIREBASE_PUBLIC_KEYS_URL', GOOGLE_PUBLIC_KEYS_URL))
+  project_id = config.get('FIREBASE_PROJECT_ID') or firebase.project_id
+  verifier = OfflineTokenVerifier(project_id, key_store, clock_skew_seconds=int(config.get('FIREBASE_CLOCK_SKEW_SECONDS', 0)))
+  key_store.ensure_started()
+  return verifier
+
+offline_verifier = LazyService('offline_verifier', create_offline_verifier)
+_prefetch_after_fork = False
+
+def _prefetch_public_keys():
+  if not _prefetch_after_fork: return
+  try: offline_verifier.get()
+  except Exception: logger.exception('Offline verifier could not be created after fork')
+
+os.register_at_fork(after_in_child=_prefetch_public_keys)
+
+def init_auth(app):
+  global _prefetch_after_fork
+  token_cache.init_app(app)
+  firebase.init_app(app)
+  offline_verifier.init_app(app)
+  _prefetch_after_fork = app.config.get('FIREBASE_VERIFIER') == 'offline'
+
+def verify_id_token(token):
+  if current_app.config.get('FIREBASE_VERIFIER') == 'offline': return offline_verifier.verify(token)
+  return auth.verify_id_token(token, app=firebase.get())
+
+@event.listens_for(User, 'after_update')
+def invalidate_cached_tokens_on_change(mapper, connection, target):
+  state = inspect(target)
+  if any(getattr(state.attrs, attr).history.has_changes() for attr in ('role', 'is_active', 'is_profile_complete', 'onboarding_step')): token_cache.invalidate_uid(target.firebase_uid)
+
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_tokens_on_delete(mapper, connection, target):
+  token_cache.invalidate_uid(target.firebase_uid)
+
+ROLE_PROFILES = {'farmer': 'farmer', 'veterinary': 'veterinarian', 'government': 'government_official', 'researcher': 'researcher'}
+
+@dataclass(frozen=True)
+class Principal:
+  user_id: int
+  role: str
+  profile_id: Optional[int] = None
+  is_profile_complete: bool = False
+  onboarding_step: Optional[int] = None
+
+  @classmethod
+  def from_user(cls, user):
+    profile = getattr(user, ROLE_PROFILES[user.role], None)
+    principal = cls(user.id, user.role, profile.id if profile else None, bool(user.is_profile_complete), user.onboarding_step)
+    principal.__dict__['user'] = user  # already loaded: prime the cached property
+    return principal
+
+  @cached_property
+  def user(self):
+    return load_user(self.role, id=self.user_id)
+
+  @property
+  def profile(self):
+    return getattr(self.user, ROLE_PROFILES[self.role], None)
+
+def load_user(role=None, **filters):
+  if role in ROLE_PROFILES: options = [joinedload(getattr(User, ROLE_PROFILES[role]))]
+  else: options = [joinedload(getattr(User, rel)) for rel in ROLE_PROFILES.values()]
+  return User.query.options(*options).filter_by(**filters).first()
+
+def current_user():
+  principal = g.get('principal')
+  return principal.user if principal else None
+
+def set_principal(user):
+  g.principal = Principal.from_user(user) if user else None
+
+def revoke_user_tokens(firebase_uid):
+  auth.revoke_refresh_tokens(firebase_uid, app=firebase.get())
+  token_cache.invalidate_uid(firebase_uid)
+
+def authenticate(token):
+  g.token_key = token_cache.digest(token)
+  cached = token_cache.get(g.token_key)
+  if cached:
+    g.firebase_uid = cached['uid']
+    g.email = cached['email']
+    if cached['user_id']: g.principal = Principal(**{field: cached[field] for field in PRINCIPAL_FIELDS})
+    else:
+      set_principal(load_user(firebase_uid=g.firebase_uid))
+      token_cache.attach_principal(g.token_key, g.principal)
+    return 'cache_hit'
+
+  decoded_token = verify_id_token(token)
+  g.firebase_uid = decoded_token['uid']
+  g.email = decoded_token.get('email')
+  set_principal(load_user(firebase_uid=g.firebase_uid))
+  token_cache.put(g.token_key, decoded_token, g.principal)
+  return 'ok'
 
 def verify_firebase_token(f):
   @wraps(f)
   def decorated_function(*args, **kwargs):
-    print("\n" + "="*60)
-    print("AUTH MIDDLEWARE - Token Verification Starting")
-    print("="*60)
-    
-    token = None
-    if 'Authorization' in request.headers:
-      auth_header = request.headers['Authorization']
-      print(f"Authorization header present: {auth_header[:50]}...")
-
-      if auth_header.startswith('Bearer '):
-        token = auth_header.split('Bearer ')[1]
-        print(f"Token extracted (length: {len(token)})")
-      else: print("Authorization header doesn't start with 'Bearer '")
-    else: print("No Authorization header in request")
-
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header.split('Bearer ')[1] if auth_header.startswith('Bearer ') else None
     if not token:
-      print("RESULT: No token provided")
-      print("="*60 + "\n")
+      g.auth_outcome = 'missing_token'
       return jsonify({'error': 'No token provided'}), 401
 
     try:
-      print("Attempting to verify token...")
-      print(f"Token preview: {token[:30]}...{token[-30:]}")
-
-      decoded_token = auth.verify_id_token(token)
-      print("Token decoded successfully")
-      print(f"UID: {decoded_token['uid']}")
-      print(f"Email: {decoded_token.get('email', 'N/A')}")
-      print(f"Auth Time: {decoded_token.get('auth_time', 'N/A')}")
-      print(f"Issuer: {decoded_token.get('iss', 'N/A')}")
-
-      g.firebase_uid = decoded_token['uid']
-      g.email = decoded_token.get('email')
-
-      from models.user import User
-      user = User.query.filter_by(firebase_uid=g.firebase_uid).first()
-      g.current_user = user
-
-      if user:
-        print("User found in database:")
-        print(f"   - ID: {user.id}")
-        print(f"   - Email: {user.email}")
-        print(f"   - Role: {user.role}")
-        print(f"   - Profile Complete: {user.is_profile_complete}")
-      else:
-        print(f"User not found in database for UID: {g.firebase_uid}")
-        print("This is normal for new users during signup")
-
-      print("RESULT: Authentication successful")
-      print("="*60 + "\n")
-      return f(*args, **kwargs)
-
-    except auth.InvalidIdTokenError as e:
-      print(f"Invalid ID Token Error: {e}")
-      print("Possible causes:")
-      print("   - Token expired")
-      print("   - Token from different Firebase project")
-      print("   - Malformed token")
-      print("="*60 + "\n")
-      return jsonify({'error': 'Invalid token', 'details': 'Token is invalid or expired'}), 401
-
+      g.auth_outcome = authenticate(token)
     except auth.ExpiredIdTokenError as e:
-      print(f"Expired ID Token Error: {e}")
-      print("="*60 + "\n")
+      g.auth_outcome = 'expired'
+      logger.debug(f'Expired ID token: {e}')
       return jsonify({'error': 'Invalid token', 'details': 'Token has expired'}), 401
-
     except auth.RevokedIdTokenError as e:
-      print(f"Revoked ID Token Error: {e}")
-      print("="*60 + "\n")
+      g.auth_outcome = 'revoked'
+      logger.debug(f'Revoked ID token: {e}')
       return jsonify({'error': 'Invalid token', 'details': 'Token has been revoked'}), 401
-
+    except auth.InvalidIdTokenError as e:
+      g.auth_outcome = 'invalid'
+      logger.debug(f'Invalid ID token: {e}')
+      return jsonify({'error': 'Invalid token', 'details': 'Token is invalid or expired'}), 401
+    except PublicKeysUnavailable as e:
+      g.auth_outcome = 'unavailable'
+      logger.warning(f'Token verification unavailable: {e}')
+      return jsonify({'error': 'Token verification unavailable', 'details': str(e)}), 503, {'Retry-After': str(RETRY_SECONDS)}
     except Exception as e:
-      print("Unexpected error during token verification:")
-      print(f"Type: {type(e).__name__}")
-      print(f"Message: {str(e)}")
-      import traceback
-      print("Traceback:")
-      traceback.print_exc()
-      print("="*60 + "\n")
+      g.auth_outcome = 'error'
+      logger.exception('Unexpected error during token verification')
       return jsonify({'error': 'Invalid token', 'details': str(e)}), 401
 
+    return f(*args, **kwargs)
+
   return decorated_function
 
 def require_role(*roles):
   def decorator(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-      if not hasattr(g, 'current_user') or g.current_user is None:
+      principal = g.get('principal')
+      if principal is None:
         return jsonify({'error': 'Authentication required'}), 401
-      if g.current_user.role not in roles:
+      if principal.role not in roles:
         return jsonify({'error': 'Insufficient permissions'}), 403
       return f(*args, **kwargs)
     return decorated_function
@@ -129,9 +174,10 @@ def require_role(*roles):
 def require_profile_complete(f):
   @wraps(f)
   def decorated_function(*args, **kwargs):
-    if not hasattr(g, 'current_user') or g.current_user is None:
+    principal = g.get('principal')
+    if principal is None:
       return jsonify({'error': 'Authentication required'}), 401
-    if not g.current_user.is_profile_complete:
-      return jsonify({'error': 'Profile incomplete', 'onboarding_step': g.current_user.onboarding_step}), 403
+    if not principal.is_profile_complete:
+      return jsonify({'error': 'Profile incomplete', 'onboarding_step': principal.onboarding_step}), 403
     return f(*args, **kwargs)
   return decorated_function
\ No newline at end of file
@@ -0,0 +1,72 @@
+import hashlib, threading, time
+from collections import OrderedDict
+
+PRINCIPAL_FIELDS = ('user_id', 'role', 'profile_id', 'is_profile_complete', 'onboarding_step')
+
+class TokenCache:
+  def __init__(self, max_size=5000, principal_ttl=60):
+    self.max_size = max_size
+    self.principal_ttl = principal_ttl
+    self._entries = OrderedDict()
+    self._by_uid = {}
+    self._lock = threading.Lock()
+
+  def init_app(self, app):
+    self.max_size = app.config.get('AUTH_TOKEN_CACHE_SIZE', self.max_size)
+    self.principal_ttl = app.config.get('AUTH_PRINCIPAL_TTL_SECONDS', self.principal_ttl)
+    app.extensions['token_cache'] = self
+
+  @staticmethod
+  def digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None: return None
+      if entry['exp'] <= time.time():
+        self._remove(key)
+        return None
+      self._entries.move_to_end(key)
+      entry = dict(entry)
+    # Invalidation on user changes only reaches this process; other workers drop the principal after principal_ttl.
+    if entry['principal_at'] is not None and entry['principal_at'] + self.principal_ttl <= time.time(): entry.update(dict.fromkeys(PRINCIPAL_FIELDS))
+    return entry
+
+  def put(self, key, claims, principal=None):
+    exp = claims.get('exp')
+    if not self.max_size or not exp or exp <= time.time(): return
+    entry = {'uid': claims['uid'], 'email': claims.get('email'), 'exp': exp, 'principal_at': time.time() if principal else None, **{field: getattr(principal, field, None) for field in PRINCIPAL_FIELDS}}
+    with self._lock:
+      if key in self._entries: self._remove(key)
+      self._entries[key] = entry
+      self._by_uid.setdefault(entry['uid'], set()).add(key)
+      while len(self._entries) > self.max_size: self._remove(next(iter(self._entries)))
+
+  def attach_principal(self, key, principal):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and principal is not None: entry.update({field: getattr(principal, field) for field in PRINCIPAL_FIELDS}, principal_at=time.time())
+
+  def invalidate(self, key):
+    with self._lock: self._remove(key)
+
+  def invalidate_uid(self, uid):
+    with self._lock:
+      for key in list(self._by_uid.get(uid, ())): self._remove(key)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._by_uid.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def _remove(self, key):
+    entry = self._entries.pop(key, None)
+    if entry is None: return
+    keys = self._by_uid.get(entry['uid'])
+    if keys is not None:
+      keys.discard(key)
+      if not keys: del self._by_uid[entry['uid']]
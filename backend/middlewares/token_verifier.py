@@ -0,0 +1,126 @@
+import base64, json, os, re, threading, time
+import requests
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from firebase_admin import auth
+from utils.log import get_logger
+
+GOOGLE_PUBLIC_KEYS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+ISSUER_PREFIX = 'https://securetoken.google.com/'
+MIN_REFRESH_SECONDS = 60
+RETRY_SECONDS = 30
+logger = get_logger('auth.keys')
+
+class PublicKeysUnavailable(Exception):
+  pass
+
+def _b64decode(segment):
+  return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+def _max_age(cache_control):
+  match = re.search(r'max-age=(\d+)', cache_control or '')
+  return int(match.group(1)) if match else None
+
+class PublicKeyStore:
+  def __init__(self, url=GOOGLE_PUBLIC_KEYS_URL, timeout=10, default_max_age=3600):
+    self.url = url
+    self.timeout = timeout
+    self.default_max_age = default_max_age
+    self._keys = {}
+    self._lock = threading.Lock()
+    self._timer = None
+    self._pid = None
+    self.last_refresh = 0
+    self.expires_at = 0
+
+  def get(self, kid):
+    self.ensure_started()
+    if not self._keys: raise PublicKeysUnavailable('Public signing keys could not be fetched yet')
+    return self._keys.get(kid)
+
+  def ensure_started(self):
+    if self._pid == os.getpid(): return
+    with self._lock:
+      if self._pid == os.getpid(): return
+      self._pid = os.getpid()
+      self._timer = None
+      # The first fetch of a process is synchronous; afterwards requests never wait on the network and fail fast without keys.
+      self._schedule(max(self.expires_at - time.time(), MIN_REFRESH_SECONDS) if self._keys else self._refresh_or_retry())
+
+  def refresh(self):
+    response = requests.get(self.url, timeout=self.timeout)
+    response.raise_for_status()
+    keys = {kid: x509.load_pem_x509_certificate(pem.encode()).public_key() for kid, pem in response.json().items()}
+    max_age = _max_age(response.headers.get('Cache-Control'))
+    self._keys = keys
+    self.last_refresh = time.time()
+    self.expires_at = self.last_refresh + (max_age if max_age is not None else self.default_max_age)
+    return max_age if max_age is not None else self.default_max_age
+
+  def refresh_soon(self):
+    with self._lock:
+      if time.time() - self.last_refresh < MIN_REFRESH_SECONDS: return
+      self.last_refresh = time.time()
+      self._schedule(0)
+
+  def stop(self):
+    with self._lock:
+      if self._timer: self._timer.cancel()
+      self._timer = None
+      self._pid = None
+
+  def _refresh_or_retry(self):
+    try:
+      return max(self.refresh() * 0.9, MIN_REFRESH_SECONDS)
+    except Exception as e:
+      logger.warning(f'Public key refresh failed: {type(e).__name__}: {e}', extra={'fields': {'url': self.url, 'retry_in': RETRY_SECONDS}})
+      return RETRY_SECONDS
+
+  def _run(self):
+    delay = self._refresh_or_retry()
+    with self._lock: self._schedule(delay)
+
+  def _schedule(self, delay):
+    # Callers hold self._lock, so exactly one timer is pending at a time.
+    if self._timer: self._timer.cancel()
+    self._timer = threading.Timer(delay, self._run)
+    self._timer.daemon = True
+    self._timer.start()
+
+class OfflineTokenVerifier:
+  def __init__(self, project_id, key_store=None, clock_skew_seconds=0):
+    if not project_id: raise ValueError('Project ID is required for offline token verification')
+    self.project_id = project_id
+    self.issuer = ISSUER_PREFIX + project_id
+    self.key_store = key_store or PublicKeyStore()
+    self.clock_skew_seconds = clock_skew_seconds
+
+  def verify(self, token):
+    try:
+      header_segment, payload_segment, signature_segment = token.split('.')
+      header = json.loads(_b64decode(header_segment))
+      payload = json.loads(_b64decode(payload_segment))
+      signature = _b64decode(signature_segment)
+    except ValueError as e: raise auth.InvalidIdTokenError(f'Malformed ID token: {e}')
+
+    if header.get('alg') != 'RS256': raise auth.InvalidIdTokenError(f'ID token has incorrect algorithm. Expected "RS256" but got "{header.get("alg")}"')
+    key = self.key_store.get(header.get('kid'))
+    if key is None:
+      self.key_store.refresh_soon()
+      raise auth.InvalidIdTokenError('ID token has an unknown "kid" claim')
+    try:
+      key.verify(signature, f'{header_segment}.{payload_segment}'.encode(), padding.PKCS1v15(), hashes.SHA256())
+    except InvalidSignature: raise auth.InvalidIdTokenError('ID token has an invalid signature')
+
+    now = time.time()
+    subject = payload.get('sub')
+    if payload.get('aud') != self.project_id: raise auth.InvalidIdTokenError(f'ID token has incorrect "aud" claim. Expected "{self.project_id}"')
+    if payload.get('iss') != self.issuer: raise auth.InvalidIdTokenError(f'ID token has incorrect "iss" claim. Expected "{self.issuer}"')
+    if not isinstance(subject, str) or not subject or len(subject) > 128: raise auth.InvalidIdTokenError('ID token has an invalid "sub" claim')
+    if payload.get('iat', now + 1) > now + self.clock_skew_seconds: raise auth.InvalidIdTokenError('ID token issued in the future')
+    if payload.get('auth_time', now + 1) > now + self.clock_skew_seconds: raise auth.InvalidIdTokenError('ID token has an auth_time in the future')
+    if payload.get('exp', 0) <= now - self.clock_skew_seconds: raise auth.ExpiredIdTokenError('ID token has expired', None)
+    payload['uid'] = subject
+    return payload
@@ -0,0 +1,343 @@
+"""baseline schema: users, profiles, livestock, AMU, alerts, traceability and analytics
+
+Revision ID: 5e0a7c21d9b3
+Revises:
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0a7c21d9b3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# PostgreSQL enum types shared by several tables are created once up front; columns reference them with create_type=False.
+ENUMS = {
+  'user_roles': ('farmer', 'veterinary', 'government', 'researcher'),
+  'verification_status': ('pending', 'verified', 'rejected'),
+  'farm_type': ('dairy', 'poultry', 'mixed', 'goat', 'sheep', 'pig'),
+  'institution_type': ('university', 'research_institute', 'government_lab', 'private_org'),
+  'species_type': ('cattle', 'buffalo', 'goat', 'sheep', 'pig', 'poultry'),
+  'gender_type': ('male', 'female'),
+  'health_status': ('healthy', 'sick', 'under_treatment', 'quarantine', 'deceased'),
+  'life_stage': ('calf', 'juvenile', 'adult', 'breeding', 'production'),
+  'production_type': ('milk', 'meat', 'eggs', 'breeding', 'dual_purpose'),
+  'admin_route': ('oral', 'injection', 'topical', 'feed', 'water'),
+  'prescription_status': ('active', 'completed', 'cancelled'),
+  'tissue_type': ('meat', 'milk', 'eggs', 'honey'),
+  'request_type': ('routine_checkup', 'emergency', 'vaccination', 'prescription', 'other'),
+  'consultation_status': ('pending', 'accepted', 'completed', 'cancelled'),
+  'alert_type': ('excessive_use', 'withdrawal_period', 'mrl_breach', 'health_critical', 'prescription_expired', 'consultation_request'),
+  'severity': ('low', 'medium', 'high', 'critical'),
+  'alert_status': ('unread', 'read', 'acknowledged', 'resolved'),
+  'data_request_status': ('pending', 'approved', 'rejected', 'fulfilled'),
+  'inspection_type': ('routine', 'complaint', 'follow_up', 'random'),
+  'compliance_status': ('compliant', 'minor_issues', 'major_violations')
+}
+
+
+def enum(name):
+  return postgresql.ENUM(*ENUMS[name], name=name, create_type=False)
+
+
+def timestamps():
+  return [sa.Column('created_at', sa.DateTime()), sa.Column('updated_at', sa.DateTime())]
+
+
+def profile(name, *columns):
+  return (
+    name,
+    sa.Column('id', sa.Integer(), primary_key=True),
+    sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True, index=True),
+    *columns
+  )
+
+
+def tables():
+  # In creation order: every foreign key points at a table created earlier.
+  return [
+    (
+      'users',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('firebase_uid', sa.String(length=128), nullable=False, unique=True, index=True),
+      sa.Column('email', sa.String(length=255), nullable=False, unique=True, index=True),
+      sa.Column('name', sa.String(length=255), nullable=False),
+      sa.Column('role', enum('user_roles'), nullable=False),
+      sa.Column('profile_image_url', sa.String(length=500)),
+      sa.Column('aadhaar_encrypted', sa.String(length=255)),
+      sa.Column('phone', sa.String(length=20)),
+      sa.Column('is_active', sa.Boolean()),
+      sa.Column('is_profile_complete', sa.Boolean()),
+      sa.Column('onboarding_step', sa.Integer()),
+      *timestamps()
+    ),
+    profile(
+      'veterinarians',
+      sa.Column('license_number', sa.String(length=100), nullable=False, unique=True, index=True),
+      sa.Column('specialization', sa.String(length=255)),
+      sa.Column('qualification', sa.String(length=255)),
+      sa.Column('alma_mater', sa.String(length=255)),
+      sa.Column('years_of_experience', sa.Integer()),
+      sa.Column('age', sa.Integer()),
+      sa.Column('clinic_hospital_name', sa.String(length=255)),
+      sa.Column('clinic_address', sa.Text()),
+      sa.Column('state', sa.String(length=100)),
+      sa.Column('district', sa.String(length=100)),
+      sa.Column('pincode', sa.String(length=10)),
+      sa.Column('consultation_fee', sa.Float()),
+      sa.Column('available_for_emergency', sa.Boolean()),
+      sa.Column('verification_status', enum('verification_status')),
+      sa.Column('verified_at', sa.DateTime()),
+      *timestamps()
+    ),
+    profile(
+      'farmers',
+      sa.Column('farm_name', sa.String(length=255), nullable=False),
+      sa.Column('farm_address', sa.Text()),
+      sa.Column('region', sa.String(length=100), index=True),
+      sa.Column('state', sa.String(length=100)),
+      sa.Column('district', sa.String(length=100)),
+      sa.Column('pincode', sa.String(length=10)),
+      sa.Column('latitude', sa.Float()),
+      sa.Column('longitude', sa.Float()),
+      sa.Column('registration_number', sa.String(length=100), unique=True),
+      sa.Column('farm_size_acres', sa.Float()),
+      sa.Column('farm_type', enum('farm_type')),
+      sa.Column('primary_veterinarian_id', sa.Integer(), sa.ForeignKey('veterinarians.id')),
+      *timestamps()
+    ),
+    profile(
+      'government_officials',
+      sa.Column('government_id', sa.String(length=100), nullable=False, unique=True, index=True),
+      sa.Column('department_name', sa.String(length=255), nullable=False),
+      sa.Column('department_id', sa.String(length=100)),
+      sa.Column('designation', sa.String(length=255)),
+      sa.Column('jurisdiction_state', sa.String(length=100)),
+      sa.Column('jurisdiction_district', sa.String(length=100)),
+      sa.Column('jurisdiction_regions', sa.JSON()),
+      sa.Column('office_address', sa.Text()),
+      sa.Column('verification_status', enum('verification_status')),
+      sa.Column('verified_at', sa.DateTime()),
+      *timestamps()
+    ),
+    profile(
+      'researchers',
+      sa.Column('institution_name', sa.String(length=255), nullable=False),
+      sa.Column('institution_type', enum('institution_type')),
+      sa.Column('role_designation', sa.String(length=255)),
+      sa.Column('project_name', sa.String(length=500)),
+      sa.Column('research_area', sa.Text()),
+      sa.Column('verification_status', enum('verification_status')),
+      sa.Column('verified_at', sa.DateTime()),
+      *timestamps()
+    ),
+    (
+      'livestock',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('rfid_tag', sa.String(length=50), nullable=False, unique=True, index=True),
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id', ondelete='CASCADE'), nullable=False, index=True),
+      sa.Column('species', enum('species_type'), nullable=False, index=True),
+      sa.Column('breed', sa.String(length=100)),
+      sa.Column('name', sa.String(length=100)),
+      sa.Column('gender', enum('gender_type')),
+      sa.Column('date_of_birth', sa.Date()),
+      sa.Column('age_months', sa.Integer()),
+      sa.Column('parent_id', sa.Integer(), sa.ForeignKey('livestock.id')),
+      sa.Column('health_status', enum('health_status')),
+      sa.Column('current_stage', enum('life_stage')),
+      sa.Column('weight_kg', sa.Float()),
+      sa.Column('production_type', enum('production_type')),
+      sa.Column('milk_production_liters_daily', sa.Float()),
+      sa.Column('egg_production_daily', sa.Integer()),
+      sa.Column('image_url', sa.String(length=500)),
+      sa.Column('is_active', sa.Boolean()),
+      *timestamps()
+    ),
+    (
+      'health_records',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id', ondelete='CASCADE'), nullable=False, index=True),
+      sa.Column('record_date', sa.Date(), nullable=False, index=True),
+      sa.Column('recorded_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+      sa.Column('weight_kg', sa.Float()),
+      sa.Column('temperature_celsius', sa.Float()),
+      sa.Column('symptoms', sa.Text()),
+      sa.Column('diagnosis', sa.Text()),
+      sa.Column('treatment_given', sa.Text()),
+      sa.Column('notes', sa.Text()),
+      sa.Column('attachment_url', sa.String(length=500)),
+      sa.Column('created_at', sa.DateTime())
+    ),
+    (
+      'prescriptions',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('veterinarian_id', sa.Integer(), sa.ForeignKey('veterinarians.id'), nullable=False, index=True),
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id'), nullable=False),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), nullable=False, index=True),
+      sa.Column('prescription_number', sa.String(length=100), unique=True),
+      sa.Column('prescription_date', sa.Date(), nullable=False, index=True),
+      sa.Column('diagnosis', sa.Text()),
+      sa.Column('drugs_prescribed', sa.JSON()),
+      sa.Column('notes', sa.Text()),
+      sa.Column('follow_up_date', sa.Date()),
+      sa.Column('status', enum('prescription_status')),
+      sa.Column('verified_at', sa.DateTime()),
+      sa.Column('created_at', sa.DateTime())
+    ),
+    (
+      'antimicrobial_records',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id', ondelete='CASCADE'), nullable=False, index=True),
+      sa.Column('prescription_id', sa.Integer(), sa.ForeignKey('prescriptions.id')),
+      sa.Column('drug_name', sa.String(length=255), nullable=False),
+      sa.Column('drug_category', sa.String(length=100)),
+      sa.Column('active_ingredient', sa.String(length=255)),
+      sa.Column('dosage', sa.Float(), nullable=False),
+      sa.Column('unit', sa.String(length=20), nullable=False),
+      sa.Column('administration_route', enum('admin_route')),
+      sa.Column('start_date', sa.Date(), nullable=False, index=True),
+      sa.Column('end_date', sa.Date()),
+      sa.Column('frequency', sa.String(length=50)),
+      sa.Column('duration_days', sa.Integer()),
+      sa.Column('reason', sa.Text()),
+      sa.Column('prescribed_by', sa.Integer(), sa.ForeignKey('veterinarians.id'), index=True),
+      sa.Column('recorded_by', sa.Integer(), sa.ForeignKey('users.id')),
+      sa.Column('is_verified', sa.Boolean()),
+      sa.Column('verified_at', sa.DateTime()),
+      sa.Column('withdrawal_end_date', sa.Date()),
+      sa.Column('created_at', sa.DateTime())
+    ),
+    (
+      'withdrawal_periods',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('drug_name', sa.String(length=255), nullable=False, index=True),
+      sa.Column('active_ingredient', sa.String(length=255)),
+      sa.Column('species', enum('species_type'), nullable=False, index=True),
+      sa.Column('withdrawal_period_days', sa.Integer(), nullable=False),
+      sa.Column('mrl_value', sa.Float()),
+      sa.Column('mrl_unit', sa.String(length=20)),
+      sa.Column('tissue_type', enum('tissue_type'), nullable=False),
+      sa.Column('reference_source', sa.String(length=255)),
+      *timestamps(),
+      sa.Index('idx_drug_species_tissue', 'drug_name', 'species', 'tissue_type')
+    ),
+    (
+      'consultation_requests',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id'), nullable=False, index=True),
+      sa.Column('veterinarian_id', sa.Integer(), sa.ForeignKey('veterinarians.id'), index=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id')),
+      sa.Column('request_type', enum('request_type')),
+      sa.Column('description', sa.Text()),
+      sa.Column('preferred_date', sa.Date()),
+      sa.Column('status', enum('consultation_status'), index=True),
+      sa.Column('response_notes', sa.Text()),
+      sa.Column('created_at', sa.DateTime(), index=True),
+      sa.Column('updated_at', sa.DateTime())
+    ),
+    (
+      'alerts',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), index=True),
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id'), nullable=False, index=True),
+      sa.Column('veterinarian_id', sa.Integer(), sa.ForeignKey('veterinarians.id')),
+      sa.Column('alert_type', enum('alert_type'), nullable=False),
+      sa.Column('severity', enum('severity')),
+      sa.Column('title', sa.String(length=255), nullable=False),
+      sa.Column('message', sa.Text(), nullable=False),
+      sa.Column('status', enum('alert_status'), index=True),
+      sa.Column('alert_metadata', sa.JSON()),
+      sa.Column('acknowledged_at', sa.DateTime()),
+      sa.Column('resolved_at', sa.DateTime()),
+      sa.Column('created_at', sa.DateTime(), index=True)
+    ),
+    (
+      'traceability_logs',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), nullable=False, index=True),
+      sa.Column('event_type', sa.String(length=100), nullable=False),
+      sa.Column('event_data', sa.JSON()),
+      sa.Column('performed_by', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+      sa.Column('timestamp', sa.DateTime(), nullable=False, index=True),
+      sa.Column('hash_value', sa.String(length=64)),
+      sa.Column('previous_hash', sa.String(length=64)),
+      sa.Column('ip_address', sa.String(length=45))
+    ),
+    (
+      'regional_analytics',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('region', sa.String(length=100), nullable=False, index=True),
+      sa.Column('state', sa.String(length=100), index=True),
+      sa.Column('district', sa.String(length=100), index=True),
+      sa.Column('analysis_date', sa.Date(), nullable=False, index=True),
+      sa.Column('total_farms', sa.Integer()),
+      sa.Column('total_livestock', sa.Integer()),
+      sa.Column('amu_usage_count', sa.Integer()),
+      sa.Column('mrl_violations_count', sa.Integer()),
+      sa.Column('compliance_rate', sa.Float()),
+      sa.Column('analytics_data', sa.JSON()),
+      sa.Column('ai_insights', sa.Text()),
+      sa.Column('generated_at', sa.DateTime()),
+      sa.Index('idx_region_date', 'region', 'analysis_date')
+    ),
+    (
+      'data_requests',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('researcher_id', sa.Integer(), sa.ForeignKey('researchers.id'), nullable=False, index=True),
+      sa.Column('request_title', sa.String(length=255), nullable=False),
+      sa.Column('request_description', sa.Text()),
+      sa.Column('data_type_requested', sa.JSON()),
+      sa.Column('regions_requested', sa.JSON()),
+      sa.Column('species_requested', sa.JSON()),
+      sa.Column('date_range_start', sa.Date()),
+      sa.Column('date_range_end', sa.Date()),
+      sa.Column('justification', sa.Text()),
+      sa.Column('status', enum('data_request_status'), index=True),
+      sa.Column('reviewed_by', sa.Integer(), sa.ForeignKey('users.id')),
+      sa.Column('review_notes', sa.Text()),
+      sa.Column('approved_at', sa.DateTime()),
+      sa.Column('data_access_url', sa.String(length=500)),
+      sa.Column('created_at', sa.DateTime(), index=True),
+      sa.Column('updated_at', sa.DateTime())
+    ),
+    (
+      'inspection_logs',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('inspector_id', sa.Integer(), sa.ForeignKey('government_officials.id'), nullable=False, index=True),
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id'), nullable=False, index=True),
+      sa.Column('inspection_date', sa.Date(), nullable=False, index=True),
+      sa.Column('inspection_type', enum('inspection_type')),
+      sa.Column('findings', sa.Text()),
+      sa.Column('compliance_status', enum('compliance_status')),
+      sa.Column('violations_found', sa.JSON()),
+      sa.Column('recommendations', sa.Text()),
+      sa.Column('attachments', sa.JSON()),
+      sa.Column('follow_up_required', sa.Boolean()),
+      sa.Column('follow_up_date', sa.Date()),
+      sa.Column('created_at', sa.DateTime())
+    )
+  ]
+
+
+def upgrade():
+  # Databases built by init_db.py (db.create_all) already have these tables and are left as they are.
+  bind = op.get_bind()
+  if bind.dialect.name == 'postgresql':
+    for name, values in ENUMS.items(): postgresql.ENUM(*values, name=name).create(bind, checkfirst=True)
+  existing = set(sa.inspect(bind).get_table_names())
+  for name, *columns in tables():
+    if name not in existing: op.create_table(name, *columns)
+
+
+def downgrade():
+  bind = op.get_bind()
+  existing = set(sa.inspect(bind).get_table_names())
+  for name, *_ in reversed(tables()):
+    if name in existing: op.drop_table(name)
+  if bind.dialect.name == 'postgresql':
+    for name, values in ENUMS.items(): postgresql.ENUM(*values, name=name).drop(bind, checkfirst=True)
@@ -0,0 +1,191 @@
+"""add AMU usage buckets, traceability chain tables, job runs and owner counters
+
+Revision ID: 9d4f1b6e3a82
+Revises: 5e0a7c21d9b3
+Create Date: 2026-10-18 22:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b6e3a82'
+down_revision = '5e0a7c21d9b3'
+branch_labels = None
+depends_on = None
+
+
+def tables():
+  # Merkle nodes, alert fingerprints and their locks come in later revisions.
+  return [
+    (
+      'amu_usage_daily',
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id', ondelete='CASCADE'), primary_key=True),
+      sa.Column('drug_key', sa.String(length=255), primary_key=True),
+      sa.Column('usage_date', sa.Date(), primary_key=True),
+      sa.Column('usage_count', sa.Integer(), nullable=False)
+    ),
+    (
+      'farm_amu_daily',
+      sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id', ondelete='CASCADE'), primary_key=True),
+      sa.Column('usage_date', sa.Date(), primary_key=True),
+      sa.Column('drug_key', sa.String(length=255), primary_key=True),
+      sa.Column('category_key', sa.String(length=100), primary_key=True),
+      sa.Column('unit', sa.String(length=20), primary_key=True),
+      sa.Column('drug_name', sa.String(length=255), nullable=False),
+      sa.Column('drug_category', sa.String(length=100)),
+      sa.Column('record_count', sa.Integer(), nullable=False),
+      sa.Column('total_dosage', sa.Float(), nullable=False),
+      sa.Index('idx_farm_amu_daily_date', 'usage_date')
+    ),
+    (
+      'traceability_chain_heads',
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id', ondelete='CASCADE'), primary_key=True),
+      sa.Column('last_hash', sa.String(length=64), nullable=False),
+      sa.Column('sequence', sa.Integer(), nullable=False),
+      sa.Column('updated_at', sa.DateTime())
+    ),
+    (
+      'traceability_segments',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), nullable=False),
+      sa.Column('first_log_id', sa.Integer(), nullable=False),
+      sa.Column('last_log_id', sa.Integer(), nullable=False),
+      sa.Column('first_sequence', sa.Integer()),
+      sa.Column('last_sequence', sa.Integer()),
+      sa.Column('first_timestamp', sa.DateTime(), nullable=False),
+      sa.Column('last_timestamp', sa.DateTime(), nullable=False),
+      sa.Column('first_previous_hash', sa.String(length=64), nullable=False),
+      sa.Column('last_hash', sa.String(length=64), nullable=False),
+      sa.Column('log_count', sa.Integer(), nullable=False),
+      sa.Column('merkle_peaks', sa.JSON(), nullable=False),
+      sa.Column('storage_key', sa.String(length=500), nullable=False),
+      sa.Column('content_hash', sa.String(length=64), nullable=False),
+      sa.Column('size_bytes', sa.Integer()),
+      sa.Column('archived_at', sa.DateTime()),
+      sa.Index('idx_segment_livestock_last_log', 'livestock_id', 'last_log_id')
+    ),
+    (
+      'traceability_checkpoints',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), nullable=False, index=True),
+      sa.Column('checkpoint_date', sa.Date(), nullable=False, index=True),
+      sa.Column('last_log_id', sa.Integer(), nullable=False),
+      sa.Column('leaf_count', sa.Integer(), nullable=False),
+      sa.Column('root_hash', sa.String(length=64), nullable=False),
+      sa.Column('created_at', sa.DateTime()),
+      sa.UniqueConstraint('livestock_id', 'checkpoint_date', name='uq_checkpoint_livestock_date')
+    ),
+    (
+      'traceability_daily_roots',
+      sa.Column('checkpoint_date', sa.Date(), primary_key=True),
+      sa.Column('animal_count', sa.Integer(), nullable=False),
+      sa.Column('root_hash', sa.String(length=64), nullable=False),
+      sa.Column('created_at', sa.DateTime())
+    ),
+    (
+      'chain_verification_runs',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('state', sa.String(length=100), index=True),
+      sa.Column('district', sa.String(length=100), index=True),
+      sa.Column('status', sa.Enum('running', 'completed', 'failed', name='verification_run_status'), index=True),
+      sa.Column('animals_checked', sa.Integer()),
+      sa.Column('logs_checked', sa.Integer()),
+      sa.Column('legacy_logs', sa.Integer()),
+      sa.Column('broken_animals', sa.Integer()),
+      sa.Column('broken_links', sa.JSON()),
+      sa.Column('error', sa.Text()),
+      sa.Column('started_at', sa.DateTime(), nullable=False, index=True),
+      sa.Column('finished_at', sa.DateTime())
+    ),
+    (
+      'regional_analytics_runs',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('status', sa.Enum('running', 'completed', 'failed', name='analytics_run_status'), index=True),
+      sa.Column('days_processed', sa.Integer()),
+      sa.Column('rows_written', sa.Integer()),
+      sa.Column('last_amu_record_id', sa.Integer()),
+      sa.Column('last_alert_id', sa.Integer()),
+      sa.Column('error', sa.Text()),
+      sa.Column('started_at', sa.DateTime(), nullable=False, index=True),
+      sa.Column('finished_at', sa.DateTime())
+    ),
+    (
+      'data_request_jobs',
+      sa.Column('id', sa.Integer(), primary_key=True),
+      sa.Column('data_request_id', sa.Integer(), sa.ForeignKey('data_requests.id', ondelete='CASCADE'), nullable=False, unique=True),
+      sa.Column('status', sa.Enum('running', 'completed', 'failed', name='data_request_job_status'), index=True),
+      sa.Column('export_format', sa.String(length=20), nullable=False),
+      sa.Column('rows_total', sa.Integer()),
+      sa.Column('rows_written', sa.Integer()),
+      sa.Column('bytes_written', sa.BigInteger()),
+      sa.Column('artifact_key', sa.String(length=500)),
+      sa.Column('attempts', sa.Integer()),
+      sa.Column('error', sa.Text()),
+      sa.Column('started_at', sa.DateTime(), nullable=False),
+      sa.Column('heartbeat_at', sa.DateTime(), index=True),
+      sa.Column('finished_at', sa.DateTime())
+    ),
+    (
+      'owner_counters',
+      sa.Column('owner_type', sa.Enum('farmer', 'veterinarian', 'researcher', name='counter_owner_type'), primary_key=True),
+      sa.Column('owner_id', sa.Integer(), primary_key=True, autoincrement=False),
+      sa.Column('counter_key', sa.String(length=100), primary_key=True),
+      sa.Column('value', sa.Integer(), nullable=False)
+    )
+  ]
+
+# Indexes added to tables from the baseline, as (table, index name, columns).
+INDEXES = [
+  ('antimicrobial_records', 'ix_antimicrobial_records_created_at', ['created_at']),
+  ('antimicrobial_records', 'idx_amu_livestock_withdrawal', ['livestock_id', 'withdrawal_end_date']),
+  ('regional_analytics', 'idx_region_level_date', ['region_level', 'state', 'district', 'analysis_date'])
+]
+REGION_LEVEL = sa.Enum('national', 'state', 'district', name='region_level')
+ENUM_TYPES = ('region_level', 'verification_run_status', 'analytics_run_status', 'data_request_job_status', 'counter_owner_type')
+
+
+def _columns(inspector, table):
+  return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _indexes(inspector, table):
+  return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+  # Each step is skipped when it is already in place, e.g. on databases built by init_db.py (db.create_all).
+  bind = op.get_bind()
+  inspector = sa.inspect(bind)
+  existing = set(inspector.get_table_names())
+  for name, *columns in tables():
+    if name not in existing: op.create_table(name, *columns)
+
+  if 'region_level' not in _columns(inspector, 'regional_analytics'):
+    REGION_LEVEL.create(bind, checkfirst=True)
+    op.add_column('regional_analytics', sa.Column('region_level', REGION_LEVEL, nullable=False, server_default='district'))
+  if 'sequence' not in _columns(inspector, 'traceability_logs'):
+    # Batch mode so SQLite, which cannot add constraints in place, copies the table; MySQL and PostgreSQL alter it directly.
+    with op.batch_alter_table('traceability_logs') as batch:
+      batch.add_column(sa.Column('sequence', sa.Integer()))
+      batch.create_unique_constraint('uq_trace_livestock_sequence', ['livestock_id', 'sequence'])
+  for table, name, columns in INDEXES:
+    if name not in _indexes(sa.inspect(bind), table): op.create_index(name, table, columns)
+
+
+def downgrade():
+  bind = op.get_bind()
+  inspector = sa.inspect(bind)
+  for table, name, _ in reversed(INDEXES):
+    if name in _indexes(inspector, table): op.drop_index(name, table_name=table)
+  if 'sequence' in _columns(inspector, 'traceability_logs'):
+    with op.batch_alter_table('traceability_logs') as batch:
+      batch.drop_constraint('uq_trace_livestock_sequence', type_='unique')
+      batch.drop_column('sequence')
+  if 'region_level' in _columns(inspector, 'regional_analytics'): op.drop_column('regional_analytics', 'region_level')
+  existing = set(inspector.get_table_names())
+  for name, *_ in reversed(tables()):
+    if name in existing: op.drop_table(name)
+  if bind.dialect.name == 'postgresql':
+    for name in ENUM_TYPES: op.execute(f'DROP TYPE IF EXISTS {name}')
@@ -0,0 +1,84 @@
+"""partition antimicrobial_records and alerts by month
+
+Revision ID: a3f19c2d7b40
+Revises: 9d4f1b6e3a82
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+import logging
+from datetime import date, datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f19c2d7b40'
+down_revision = '9d4f1b6e3a82'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+MONTHS_AHEAD = 3
+TABLES = {
+  'antimicrobial_records': {
+    'column': 'start_date',
+    'indexes': [
+      ('ix_antimicrobial_records_livestock_id', 'livestock_id'), ('ix_antimicrobial_records_start_date', 'start_date'),
+      ('ix_antimicrobial_records_prescribed_by', 'prescribed_by'), ('ix_antimicrobial_records_created_at', 'created_at'),
+      ('idx_amu_livestock_withdrawal', 'livestock_id, withdrawal_end_date')
+    ],
+    'foreign_keys': [('livestock_id', 'livestock (id) ON DELETE CASCADE'), ('prescription_id', 'prescriptions (id)'), ('prescribed_by', 'veterinarians (id)'), ('recorded_by', 'users (id)')]
+  },
+  'alerts': {
+    'column': 'created_at',
+    'indexes': [('ix_alerts_livestock_id', 'livestock_id'), ('ix_alerts_farmer_id', 'farmer_id'), ('ix_alerts_status', 'status'), ('ix_alerts_created_at', 'created_at')],
+    'foreign_keys': [('livestock_id', 'livestock (id)'), ('farmer_id', 'farmers (id)'), ('veterinarian_id', 'veterinarians (id)')]
+  }
+}
+
+def add_months(month, months):
+  index = month.year * 12 + month.month - 1 + months
+  return date(index // 12, index % 12 + 1, 1)
+
+def _months(table, column):
+  first = op.get_bind().execute(sa.text(f'SELECT MIN({column}) FROM {table}')).scalar()
+  current = datetime.now(timezone.utc).date().replace(day=1)
+  first = (first.date() if isinstance(first, datetime) else first or current).replace(day=1)
+  month = min(first, current)
+  while month <= add_months(current, MONTHS_AHEAD):
+    yield month
+    month = add_months(month, 1)
+
+def _constraints(table, spec, primary_key):
+  op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})')
+  for name, columns in spec['indexes']: op.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+  for column, target in spec['foreign_keys']: op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) REFERENCES {target}')
+
+def _swap(table, old, spec, primary_key):
+  op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+  op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+  op.execute(f'DROP TABLE {old}')
+  op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+  _constraints(table, spec, primary_key)
+
+def upgrade():
+  if op.get_bind().dialect.name != 'postgresql':
+    logger.warning('Skipping monthly partitioning: only PostgreSQL is supported (MySQL partitioned tables cannot have foreign keys)')
+    return
+  for table, spec in TABLES.items():
+    column, old = spec['column'], f'{table}_unpartitioned'
+    op.execute(f'UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL')
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE ({column})')
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    for month in _months(old, column):
+      op.execute(f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+    _swap(table, old, spec, f'id, {column}')
+
+def downgrade():
+  if op.get_bind().dialect.name != 'postgresql': return
+  for table, spec in TABLES.items():
+    old = f'{table}_partitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    _swap(table, old, spec, 'id')
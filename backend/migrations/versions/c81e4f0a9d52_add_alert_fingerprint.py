@@ -0,0 +1,32 @@
+"""add alerts.fingerprint for alert coalescing
+
+Revision ID: c81e4f0a9d52
+Revises: a3f19c2d7b40
+Create Date: 2026-10-18 18:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81e4f0a9d52'
+down_revision = 'a3f19c2d7b40'
+branch_labels = None
+depends_on = None
+
+
+def _has_fingerprint():
+  return 'fingerprint' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('alerts')}
+
+
+def upgrade():
+  if _has_fingerprint(): return
+  op.add_column('alerts', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+  op.create_index('ix_alerts_fingerprint', 'alerts', ['fingerprint'])
+
+
+def downgrade():
+  if not _has_fingerprint(): return
+  op.drop_index('ix_alerts_fingerprint', table_name='alerts')
+  op.drop_column('alerts', 'fingerprint')
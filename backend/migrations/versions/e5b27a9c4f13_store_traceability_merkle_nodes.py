@@ -0,0 +1,48 @@
+"""store Merkle nodes and daily audit paths for traceability checkpoints
+
+Revision ID: e5b27a9c4f13
+Revises: c81e4f0a9d52
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b27a9c4f13'
+down_revision = 'c81e4f0a9d52'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('merkle_peaks', 'daily_index', 'daily_proof')
+
+
+def _checkpoint_columns():
+  return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('traceability_checkpoints')}
+
+
+def upgrade():
+  # Existing checkpoints keep NULL peaks; the next `flask ledger checkpoint` rebuilds their nodes once.
+  existing = _checkpoint_columns()
+  if 'merkle_peaks' not in existing: op.add_column('traceability_checkpoints', sa.Column('merkle_peaks', sa.JSON(), nullable=True))
+  if 'daily_index' not in existing: op.add_column('traceability_checkpoints', sa.Column('daily_index', sa.Integer(), nullable=True))
+  if 'daily_proof' not in existing: op.add_column('traceability_checkpoints', sa.Column('daily_proof', sa.JSON(), nullable=True))
+  if sa.inspect(op.get_bind()).has_table('traceability_merkle_nodes'): return
+  op.create_table(
+    'traceability_merkle_nodes',
+    sa.Column('livestock_id', sa.Integer(), sa.ForeignKey('livestock.id'), nullable=False),
+    sa.Column('level', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('log_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('livestock_id', 'level', 'position'),
+    sa.UniqueConstraint('log_id')
+  )
+
+
+def downgrade():
+  if sa.inspect(op.get_bind()).has_table('traceability_merkle_nodes'): op.drop_table('traceability_merkle_nodes')
+  existing = _checkpoint_columns()
+  for column in COLUMNS:
+    if column in existing: op.drop_column('traceability_checkpoints', column)
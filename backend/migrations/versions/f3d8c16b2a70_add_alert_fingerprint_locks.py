@@ -0,0 +1,29 @@
+"""add alert_fingerprint_locks to serialise alert coalescing
+
+Revision ID: f3d8c16b2a70
+Revises: e5b27a9c4f13
+Create Date: 2026-10-18 21:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3d8c16b2a70'
+down_revision = 'e5b27a9c4f13'
+branch_labels = None
+depends_on = None
+
+
+def _has_table():
+  return sa.inspect(op.get_bind()).has_table('alert_fingerprint_locks')
+
+
+def upgrade():
+  if _has_table(): return
+  op.create_table('alert_fingerprint_locks', sa.Column('fingerprint', sa.String(length=64), primary_key=True))
+
+
+def downgrade():
+  if _has_table(): op.drop_table('alert_fingerprint_locks')
@@ -1,15 +1,17 @@
 from .user import User, Farmer, Veterinarian, GovernmentOfficial, Researcher
 from .livestock import Livestock, HealthRecord
-from .amu import AntimicrobialRecord, Prescription, WithdrawalPeriod
-from .requests import Alert, ConsultationRequest, TraceabilityLog
-from .analytics import RegionalAnalytics, DataRequest, InspectionLog
+from .amu import AntimicrobialRecord, AntimicrobialUsageDaily, FarmAmuDaily, Prescription, WithdrawalPeriod
+from .requests import Alert, AlertFingerprintLock, ConsultationRequest, TraceabilityLog, TraceabilityChainHead, TraceabilitySegment, TraceabilityCheckpoint, TraceabilityMerkleNode, TraceabilityDailyRoot, ChainVerificationRun
+from .counters import OwnerCounter
+from .analytics import RegionalAnalytics, RegionalAnalyticsRun, DataRequest, DataRequestJob, InspectionLog
 
 __all__ = [
   'User', 'Farmer', 'Veterinarian', 'GovernmentOfficial', 'Researcher',
   'Livestock', 'HealthRecord',
-  'AntimicrobialRecord', 'Prescription', 'WithdrawalPeriod',
+  'AntimicrobialRecord', 'AntimicrobialUsageDaily', 'FarmAmuDaily', 'Prescription', 'WithdrawalPeriod',
   'ConsultationRequest',
-  'Alert',
-  'TraceabilityLog',
-  'RegionalAnalytics', 'DataRequest', 'InspectionLog'
+  'Alert', 'AlertFingerprintLock',
+  'TraceabilityLog', 'TraceabilityChainHead', 'TraceabilitySegment', 'TraceabilityCheckpoint', 'TraceabilityMerkleNode', 'TraceabilityDailyRoot', 'ChainVerificationRun',
+  'OwnerCounter',
+  'RegionalAnalytics', 'RegionalAnalyticsRun', 'DataRequest', 'DataRequestJob', 'InspectionLog'
 ]
\ No newline at end of file
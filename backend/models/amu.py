@@ -23,11 +23,42 @@ class AntimicrobialRecord(db.Model):
   is_verified = db.Column(db.Boolean, default=False)
   verified_at = db.Column(db.DateTime)
   withdrawal_end_date = db.Column(db.Date)
-  created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+  created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+  __table_args__ = (db.Index('idx_amu_livestock_withdrawal', 'livestock_id', 'withdrawal_end_date'),)
 
   def __repr__(self):
     return f'<AntimicrobialRecord {self.drug_name} for Livestock {self.livestock_id}>'
 
+class AntimicrobialUsageDaily(db.Model):
+  __tablename__ = 'amu_usage_daily'
+
+  livestock_id = db.Column(db.Integer, db.ForeignKey('livestock.id', ondelete='CASCADE'), primary_key=True)
+  drug_key = db.Column(db.String(255), primary_key=True)
+  usage_date = db.Column(db.Date, primary_key=True)
+  usage_count = db.Column(db.Integer, nullable=False, default=0)
+
+  def __repr__(self):
+    return f'<AntimicrobialUsageDaily {self.drug_key} for Livestock {self.livestock_id} on {self.usage_date}>'
+
+class FarmAmuDaily(db.Model):
+  __tablename__ = 'farm_amu_daily'
+
+  farmer_id = db.Column(db.Integer, db.ForeignKey('farmers.id', ondelete='CASCADE'), primary_key=True)
+  usage_date = db.Column(db.Date, primary_key=True)
+  drug_key = db.Column(db.String(255), primary_key=True)
+  category_key = db.Column(db.String(100), primary_key=True, default='')
+  unit = db.Column(db.String(20), primary_key=True)
+  drug_name = db.Column(db.String(255), nullable=False)
+  drug_category = db.Column(db.String(100))
+  record_count = db.Column(db.Integer, nullable=False, default=0)
+  total_dosage = db.Column(db.Float, nullable=False, default=0)
+
+  __table_args__ = (db.Index('idx_farm_amu_daily_date', 'usage_date'),)
+
+  def __repr__(self):
+    return f'<FarmAmuDaily {self.drug_key} for Farmer {self.farmer_id} on {self.usage_date}>'
+
 class Prescription(db.Model):
   __tablename__ = 'prescriptions'
 
@@ -62,8 +93,8 @@ class WithdrawalPeriod(db.Model):
   mrl_unit = db.Column(db.String(20))
   tissue_type = db.Column(db.Enum('meat', 'milk', 'eggs', 'honey', name='tissue_type'), nullable=False)
   reference_source = db.Column(db.String(255))
-  created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-  updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+  created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+  updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
   __table_args__ = (db.Index('idx_drug_species_tissue', 'drug_name', 'species', 'tissue_type'),)
 
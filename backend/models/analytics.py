@@ -5,6 +5,7 @@ class RegionalAnalytics(db.Model):
   __tablename__ = 'regional_analytics'
 
   id = db.Column(db.Integer, primary_key=True)
+  region_level = db.Column(db.Enum('national', 'state', 'district', name='region_level'), nullable=False, default='district')
   region = db.Column(db.String(100), nullable=False, index=True)
   state, district = db.Column(db.String(100), index=True), db.Column(db.String(100), index=True)
   analysis_date = db.Column(db.Date, nullable=False, index=True)
@@ -13,13 +14,32 @@ class RegionalAnalytics(db.Model):
   compliance_rate = db.Column(db.Float)
   analytics_data = db.Column(db.JSON)
   ai_insights = db.Column(db.Text)
-  generated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+  generated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
-  __table_args__ = (db.Index('idx_region_date', 'region', 'analysis_date'),)
+  __table_args__ = (
+    db.Index('idx_region_date', 'region', 'analysis_date'),
+    db.Index('idx_region_level_date', 'region_level', 'state', 'district', 'analysis_date')
+  )
 
   def __repr__(self):
     return f'<RegionalAnalytics {self.region} - {self.analysis_date}>'
 
+class RegionalAnalyticsRun(db.Model):
+  __tablename__ = 'regional_analytics_runs'
+
+  id = db.Column(db.Integer, primary_key=True)
+  status = db.Column(db.Enum('running', 'completed', 'failed', name='analytics_run_status'), default='running', index=True)
+  days_processed = db.Column(db.Integer, default=0)
+  rows_written = db.Column(db.Integer, default=0)
+  last_amu_record_id = db.Column(db.Integer, default=0)
+  last_alert_id = db.Column(db.Integer, default=0)
+  error = db.Column(db.Text)
+  started_at = db.Column(db.DateTime, nullable=False, index=True)
+  finished_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f'<RegionalAnalyticsRun {self.id} - {self.status}>'
+
 class DataRequest(db.Model):
   __tablename__ = 'data_requests'
 
@@ -43,6 +63,26 @@ class DataRequest(db.Model):
   def __repr__(self):
     return f'<DataRequest {self.request_title} - {self.status}>'
 
+class DataRequestJob(db.Model):
+  __tablename__ = 'data_request_jobs'
+
+  id = db.Column(db.Integer, primary_key=True)
+  data_request_id = db.Column(db.Integer, db.ForeignKey('data_requests.id', ondelete='CASCADE'), nullable=False, unique=True)
+  status = db.Column(db.Enum('running', 'completed', 'failed', name='data_request_job_status'), default='running', index=True)
+  export_format = db.Column(db.String(20), nullable=False)
+  rows_total = db.Column(db.Integer)
+  rows_written = db.Column(db.Integer, default=0)
+  bytes_written = db.Column(db.BigInteger, default=0)
+  artifact_key = db.Column(db.String(500))
+  attempts = db.Column(db.Integer, default=1)
+  error = db.Column(db.Text)
+  started_at = db.Column(db.DateTime, nullable=False)
+  heartbeat_at = db.Column(db.DateTime, index=True)
+  finished_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f'<DataRequestJob {self.data_request_id} - {self.status}>'
+
 class InspectionLog(db.Model):
   __tablename__ = 'inspection_logs'
 
@@ -0,0 +1,12 @@
+from extensions import db
+
+class OwnerCounter(db.Model):
+  __tablename__ = 'owner_counters'
+
+  owner_type = db.Column(db.Enum('farmer', 'veterinarian', 'researcher', name='counter_owner_type'), primary_key=True)
+  owner_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  counter_key = db.Column(db.String(100), primary_key=True)
+  value = db.Column(db.Integer, nullable=False, default=0)
+
+  def __repr__(self):
+    return f'<OwnerCounter {self.owner_type}:{self.owner_id} {self.counter_key}={self.value}>'
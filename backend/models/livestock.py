@@ -22,7 +22,7 @@ class Livestock(db.Model):
   egg_production_daily = db.Column(db.Integer)
   image_url = db.Column(db.String(500))
   is_active = db.Column(db.Boolean, default=True)
-  created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+  created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
   updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
 
   offspring = db.relationship('Livestock', backref=db.backref('parent', remote_side=[id]))
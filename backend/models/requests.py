@@ -32,13 +32,22 @@ class Alert(db.Model):
   message = db.Column(db.Text, nullable=False)
   status = db.Column(db.Enum('unread', 'read', 'acknowledged', 'resolved', name='alert_status'), default='unread', index=True)
   alert_metadata = db.Column(db.JSON)
+  fingerprint = db.Column(db.String(64), index=True)
   acknowledged_at = db.Column(db.DateTime)
   resolved_at = db.Column(db.DateTime)
-  created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), index=True)
+  created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
   def __repr__(self):
     return f'<Alert {self.alert_type} - {self.severity}>'
 
+class AlertFingerprintLock(db.Model):
+  __tablename__ = 'alert_fingerprint_locks'
+
+  fingerprint = db.Column(db.String(64), primary_key=True)
+
+  def __repr__(self):
+    return f'<AlertFingerprintLock {self.fingerprint}>'
+
 class TraceabilityLog(db.Model):
   __tablename__ = 'traceability_logs'
 
@@ -50,7 +59,103 @@ class TraceabilityLog(db.Model):
   timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc), nullable=False, index=True)
   hash_value = db.Column(db.String(64))
   previous_hash = db.Column(db.String(64))
+  sequence = db.Column(db.Integer)
   ip_address = db.Column(db.String(45))
 
+  __table_args__ = (db.UniqueConstraint('livestock_id', 'sequence', name='uq_trace_livestock_sequence'),)
+
+  def __repr__(self):
+    return f'<TraceabilityLog {self.event_type} for Livestock {self.livestock_id}>'
+
+class TraceabilityChainHead(db.Model):
+  __tablename__ = 'traceability_chain_heads'
+
+  livestock_id = db.Column(db.Integer, db.ForeignKey('livestock.id', ondelete='CASCADE'), primary_key=True)
+  last_hash = db.Column(db.String(64), nullable=False)
+  sequence = db.Column(db.Integer, nullable=False, default=0)
+  updated_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f'<TraceabilityChainHead Livestock {self.livestock_id} @ {self.sequence}>'
+
+class TraceabilitySegment(db.Model):
+  __tablename__ = 'traceability_segments'
+
+  id = db.Column(db.Integer, primary_key=True)
+  livestock_id = db.Column(db.Integer, db.ForeignKey('livestock.id'), nullable=False)
+  first_log_id, last_log_id = db.Column(db.Integer, nullable=False), db.Column(db.Integer, nullable=False)
+  first_sequence, last_sequence = db.Column(db.Integer), db.Column(db.Integer)
+  first_timestamp, last_timestamp = db.Column(db.DateTime, nullable=False), db.Column(db.DateTime, nullable=False)
+  first_previous_hash = db.Column(db.String(64), nullable=False)
+  last_hash = db.Column(db.String(64), nullable=False)
+  log_count = db.Column(db.Integer, nullable=False)
+  merkle_peaks = db.Column(db.JSON, nullable=False)
+  storage_key = db.Column(db.String(500), nullable=False)
+  content_hash = db.Column(db.String(64), nullable=False)
+  size_bytes = db.Column(db.Integer)
+  archived_at = db.Column(db.DateTime)
+
+  __table_args__ = (db.Index('idx_segment_livestock_last_log', 'livestock_id', 'last_log_id'),)
+
+  def __repr__(self):
+    return f'<TraceabilitySegment Livestock {self.livestock_id} logs {self.first_log_id}-{self.last_log_id}>'
+
+class TraceabilityCheckpoint(db.Model):
+  __tablename__ = 'traceability_checkpoints'
+
+  id = db.Column(db.Integer, primary_key=True)
+  livestock_id = db.Column(db.Integer, db.ForeignKey('livestock.id'), nullable=False, index=True)
+  checkpoint_date = db.Column(db.Date, nullable=False, index=True)
+  last_log_id = db.Column(db.Integer, nullable=False)
+  leaf_count = db.Column(db.Integer, nullable=False)
+  root_hash = db.Column(db.String(64), nullable=False)
+  merkle_peaks = db.Column(db.JSON)
+  daily_index = db.Column(db.Integer)
+  daily_proof = db.Column(db.JSON)
+  created_at = db.Column(db.DateTime)
+
+  __table_args__ = (db.UniqueConstraint('livestock_id', 'checkpoint_date', name='uq_checkpoint_livestock_date'),)
+
+  def __repr__(self):
+    return f'<TraceabilityCheckpoint Livestock {self.livestock_id} @ {self.checkpoint_date}>'
+
+class TraceabilityMerkleNode(db.Model):
+  __tablename__ = 'traceability_merkle_nodes'
+
+  livestock_id = db.Column(db.Integer, db.ForeignKey('livestock.id'), primary_key=True)
+  level = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  hash = db.Column(db.String(64), nullable=False)
+  log_id = db.Column(db.Integer, unique=True)
+
+  def __repr__(self):
+    return f'<TraceabilityMerkleNode Livestock {self.livestock_id} level {self.level} @ {self.position}>'
+
+class TraceabilityDailyRoot(db.Model):
+  __tablename__ = 'traceability_daily_roots'
+
+  checkpoint_date = db.Column(db.Date, primary_key=True)
+  animal_count = db.Column(db.Integer, nullable=False)
+  root_hash = db.Column(db.String(64), nullable=False)
+  created_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f'<TraceabilityDailyRoot {self.checkpoint_date}>'
+
+class ChainVerificationRun(db.Model):
+  __tablename__ = 'chain_verification_runs'
+
+  id = db.Column(db.Integer, primary_key=True)
+  state, district = db.Column(db.String(100), index=True), db.Column(db.String(100), index=True)
+  status = db.Column(db.Enum('running', 'completed', 'failed', name='verification_run_status'), default='running', index=True)
+  animals_checked = db.Column(db.Integer, default=0)
+  logs_checked = db.Column(db.Integer, default=0)
+  legacy_logs = db.Column(db.Integer, default=0)
+  broken_animals = db.Column(db.Integer, default=0)
+  broken_links = db.Column(db.JSON)
+  error = db.Column(db.Text)
+  started_at = db.Column(db.DateTime, nullable=False, index=True)
+  finished_at = db.Column(db.DateTime)
+
   def __repr__(self):
-    return f'<TraceabilityLog {self.event_type} for Livestock {self.livestock_id}>'
\ No newline at end of file
+    return f'<ChainVerificationRun {self.id} - {self.status}>'
\ No newline at end of file
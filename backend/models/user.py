@@ -42,7 +42,7 @@ class Farmer(db.Model):
   farm_size_acres = db.Column(db.Float)
   farm_type = db.Column(db.Enum('dairy', 'poultry', 'mixed', 'goat', 'sheep', 'pig', name='farm_type'))
   primary_veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarians.id'))
-  created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+  created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
   updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
 
   livestock = db.relationship('Livestock', backref='farmer', lazy='dynamic', cascade='all, delete-orphan')
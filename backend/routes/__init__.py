@@ -6,6 +6,7 @@ from routes.prescription import prescription_bp
 from routes.consultation import consultation_bp
 from routes.alerts import alerts_bp
 from routes.dashboard import dashboard_bp
+from routes.research import research_bp
 
 def register_blueprints(app):
   app.register_blueprint(auth_bp)
@@ -15,4 +16,5 @@ def register_blueprints(app):
   app.register_blueprint(prescription_bp)
   app.register_blueprint(consultation_bp)
   app.register_blueprint(alerts_bp)
-  app.register_blueprint(dashboard_bp)
\ No newline at end of file
+  app.register_blueprint(dashboard_bp)
+  app.register_blueprint(research_bp)
\ No newline at end of file
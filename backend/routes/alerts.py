@@ -2,6 +2,11 @@ from flask import Blueprint, request, jsonify, g
 from extensions import db
 from models.requests import Alert
 from models.livestock import Livestock
+from services.counters import owner_counters, open_alerts
+from utils.pagination import paginate_request
+from utils.streaming import event_stream_response
+from services.alert_stream import stream_alerts
+from services.alert_state import alert_filters, transition_alerts
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
 from datetime import datetime, timezone
 
@@ -11,26 +16,23 @@ alerts_bp = Blueprint('alerts', __name__, url_prefix='/api/alerts')
 @verify_firebase_token
 @require_profile_complete
 def list_alerts():
-  page = request.args.get('page', 1, type=int)
-  per_page = request.args.get('per_page', 20, type=int)
   status = request.args.get('status')
   alert_type = request.args.get('type')
   severity = request.args.get('severity')
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    query = Alert.query.filter_by(farmer_id=g.current_user.farmer.id)
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian: return jsonify({'error': 'Veterinary profile not found'}), 400
-    query = Alert.query.filter_by(veterinarian_id=g.current_user.veterinarian.id)
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    query = Alert.query.filter_by(farmer_id=g.principal.profile_id)
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    query = Alert.query.filter_by(veterinarian_id=g.principal.profile_id)
   else: return jsonify({'error': 'Unauthorized access'}), 403
   
   if status: query = query.filter_by(status=status)
   if alert_type: query = query.filter_by(alert_type=alert_type)
   if severity: query = query.filter_by(severity=severity)
 
-  query = query.order_by(Alert.created_at.desc())
-  pagination = query.paginate(page=page, per_page=per_page, error_out=False)  
+  items, page_info = paginate_request(query, 'alerts', Alert.created_at, Alert.id)
   alerts = [{
     'id': a.id,
     'alert_type': a.alert_type,
@@ -39,11 +41,11 @@ def list_alerts():
     'message': a.message,
     'status': a.status,
     'livestock_id': a.livestock_id,
-    'metadata': a.metadata,
+    'metadata': a.alert_metadata,
     'created_at': a.created_at.isoformat()
-  } for a in pagination.items]
+  } for a in items]
 
-  return jsonify({'alerts': alerts, 'total': pagination.total, 'page': pagination.page, 'pages': pagination.pages}), 200
+  return jsonify({'alerts': alerts, **page_info}), 200
 
 @alerts_bp.route('/<int:alert_id>', methods=['GET'])
 @verify_firebase_token
@@ -51,10 +53,10 @@ def list_alerts():
 def get_alert(alert_id):
   alert = Alert.query.get_or_404(alert_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or alert.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or alert.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or alert.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or alert.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
 
   livestock_info = None
   if alert.livestock_id:
@@ -69,7 +71,7 @@ def get_alert(alert_id):
     'message': alert.message,
     'status': alert.status,
     'livestock': livestock_info,
-    'metadata': alert.metadata,
+    'metadata': alert.alert_metadata,
     'acknowledged_at': alert.acknowledged_at.isoformat() if alert.acknowledged_at else None,
     'resolved_at': alert.resolved_at.isoformat() if alert.resolved_at else None,
     'created_at': alert.created_at.isoformat()
@@ -81,10 +83,10 @@ def get_alert(alert_id):
 def acknowledge_alert(alert_id):
   alert = Alert.query.get_or_404(alert_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or alert.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or alert.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or alert.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or alert.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
 
   alert.status = 'acknowledged'
   alert.acknowledged_at = datetime.now(timezone.utc)
@@ -97,10 +99,10 @@ def acknowledge_alert(alert_id):
 def resolve_alert(alert_id):
   alert = Alert.query.get_or_404(alert_id)
   
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or alert.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or alert.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or alert.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or alert.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
 
   alert.status = 'resolved'
   alert.resolved_at = datetime.now(timezone.utc)
@@ -113,10 +115,10 @@ def resolve_alert(alert_id):
 def mark_alert_read(alert_id):
   alert = Alert.query.get_or_404(alert_id)
   
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or alert.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or alert.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403  
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or alert.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or alert.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403  
   if alert.status == 'unread':
     alert.status = 'read'
     db.session.commit()
@@ -126,55 +128,75 @@ def mark_alert_read(alert_id):
 @verify_firebase_token
 @require_profile_complete
 def alerts_summary():
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    farmer_id = g.current_user.farmer.id
-
-    unread_count = Alert.query.filter_by(farmer_id=farmer_id, status='unread').count()
-    critical_count = Alert.query.filter_by(farmer_id=farmer_id, severity='critical').filter(Alert.status.in_(['unread', 'read'])).count()
-    high_count = Alert.query.filter_by(farmer_id=farmer_id, severity='high').filter(Alert.status.in_(['unread', 'read'])).count()
-
-    withdrawal_alerts = Alert.query.filter_by(farmer_id=farmer_id, alert_type='withdrawal_period').filter(Alert.status.in_(['unread', 'read'])).count()
-    excessive_use_alerts = Alert.query.filter_by(farmer_id=farmer_id, alert_type='excessive_use').filter(Alert.status.in_(['unread', 'read'])).count()
-
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    counters = owner_counters('farmer', g.principal.profile_id)
     return jsonify({
-      'unread_count': unread_count,
-      'critical_count': critical_count,
-      'high_count': high_count,
-      'withdrawal_alerts': withdrawal_alerts,
-      'excessive_use_alerts': excessive_use_alerts
+      'unread_count': counters.get('alerts.status.unread', 0),
+      'critical_count': open_alerts(counters, 'severity', 'critical'),
+      'high_count': open_alerts(counters, 'severity', 'high'),
+      'withdrawal_alerts': open_alerts(counters, 'type', 'withdrawal_period'),
+      'excessive_use_alerts': open_alerts(counters, 'type', 'excessive_use')
     }), 200
 
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian: return jsonify({'error': 'Veterinary profile not found'}), 400
-    vet_id = g.current_user.veterinarian.id
-
-    unread_count = Alert.query.filter_by(veterinarian_id=vet_id, status='unread').count()
-    consultation_requests = Alert.query.filter_by(veterinarian_id=vet_id, alert_type='consultation_request', status='unread').count()
-    return jsonify({'unread_count': unread_count, 'consultation_requests': consultation_requests}), 200  
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    counters = owner_counters('veterinarian', g.principal.profile_id)
+    return jsonify({'unread_count': counters.get('alerts.status.unread', 0), 'consultation_requests': counters.get('alerts.unread.type.consultation_request', 0)}), 200  
   return jsonify({'error': 'Unauthorized access'}), 403
 
-@alerts_bp.route('/bulk-acknowledge', methods=['PUT'])
+@alerts_bp.route('/stream', methods=['GET'])
 @verify_firebase_token
 @require_profile_complete
-def bulk_acknowledge_alerts():
-  data = request.get_json()
-  alert_ids = data.get('alert_ids', [])  
-  if not alert_ids: return jsonify({'error': 'No alert IDs provided'}), 400
-
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    alerts = Alert.query.filter(Alert.id.in_(alert_ids), Alert.farmer_id == g.current_user.farmer.id).all()
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian: return jsonify({'error': 'Veterinary profile not found'}), 400
-    alerts = Alert.query.filter(Alert.id.in_(alert_ids), Alert.veterinarian_id == g.current_user.veterinarian.id).all()
+def stream_new_alerts():
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    owner_type, owner_id = 'farmer', g.principal.profile_id
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    owner_type, owner_id = 'veterinarian', g.principal.profile_id
+  else: return jsonify({'error': 'Unauthorized access'}), 403
+
+  last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+  if last_event_id is not None and not last_event_id.isdigit(): return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+  return event_stream_response(stream_alerts(owner_type, owner_id, int(last_event_id) if last_event_id is not None else None))
+
+def bulk_transition(action, verb):
+  data = request.get_json() or {}
+  alert_ids, filters = data.get('alert_ids'), data.get('filter')
+  if alert_ids is not None and (not isinstance(alert_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in alert_ids)): return jsonify({'error': 'alert_ids must be a list of integers'}), 400
+  if filters is not None and not isinstance(filters, dict): return jsonify({'error': 'filter must be an object'}), 400
+  if not alert_ids and filters is None: return jsonify({'error': 'No alert IDs or filter provided'}), 400
+
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    owner_type, owner_id = 'farmer', g.principal.profile_id
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    owner_type, owner_id = 'veterinarian', g.principal.profile_id
   else: return jsonify({'error': 'Unauthorized access'}), 403
 
-  acknowledged_count = 0
-  for alert in alerts:
-    if alert.status in ['unread', 'read']:
-      alert.status = 'acknowledged'
-      alert.acknowledged_at = datetime.now(timezone.utc)
-      acknowledged_count += 1  
+  filters = filters or {}
+  try: conditions = alert_filters(filters)
+  except ValueError as e: return jsonify({'error': str(e)}), 400
+  changed = transition_alerts(action, owner_type, owner_id, alert_ids or None, conditions, filters.get('status'))
   db.session.commit()
-  return jsonify({'message': f'{acknowledged_count} alerts acknowledged'}), 200
\ No newline at end of file
+  return jsonify({'message': f'{len(changed)} alerts {verb}', 'count': len(changed), 'alert_ids': changed}), 200
+
+@alerts_bp.route('/bulk-acknowledge', methods=['PUT'])
+@verify_firebase_token
+@require_profile_complete
+def bulk_acknowledge_alerts():
+  return bulk_transition('acknowledge', 'acknowledged')
+
+@alerts_bp.route('/bulk-resolve', methods=['PUT'])
+@verify_firebase_token
+@require_profile_complete
+def bulk_resolve_alerts():
+  return bulk_transition('resolve', 'resolved')
+
+@alerts_bp.route('/bulk-mark-read', methods=['PUT'])
+@verify_firebase_token
+@require_profile_complete
+def bulk_mark_alerts_read():
+  return bulk_transition('mark_read', 'marked as read')
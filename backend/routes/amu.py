@@ -1,40 +1,40 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 from extensions import db
 from models.livestock import Livestock
-from models.amu import AntimicrobialRecord, Prescription, WithdrawalPeriod
-from models.requests import Alert, TraceabilityLog
-from models.user import Farmer
+from models.amu import AntimicrobialRecord, Prescription
+from models.user import Veterinarian
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
+from utils.helpers import create_traceability_log, create_traceability_logs, calculate_withdrawal_end_date
+from services.withdrawal_periods import withdrawal_periods
+from services.usage_window import excessive_usage
+from services.farm_rollup import record_farm_usage, farm_usage_summary
+from services.alert_pipeline import alert_candidate, raise_alerts
+from services.regional_analytics import region_window, merge_counts
+from services.amu_metrics import compute_amu_metrics, METRIC_LEVELS
+from services.residue_projection import project_residues
+from utils.streaming import wants_ndjson, ndjson_response
+from utils.pagination import paginate_request
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func, and_
-import hashlib, json
+import math
+from sqlalchemy import func, and_, insert
 
 amu_bp = Blueprint('amu', __name__, url_prefix='/api/amu')
 
-def calculate_withdrawal_end_date(drug_name, species, start_date, duration_days):
-  withdrawal_period = WithdrawalPeriod.query.filter_by(drug_name=drug_name, species=species).first()
-  if withdrawal_period:
-    end_date = start_date + timedelta(days=duration_days)
-    withdrawal_end = end_date + timedelta(days=withdrawal_period.withdrawal_period_days)
-    return withdrawal_end, withdrawal_period.withdrawal_period_days
-  return None, None
-
-def check_excessive_usage(livestock_id, drug_name):
-  thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-  usage_count = AntimicrobialRecord.query.filter(
-    AntimicrobialRecord.livestock_id == livestock_id,
-    AntimicrobialRecord.drug_name == drug_name,
-    AntimicrobialRecord.created_at >= thirty_days_ago
-  ).count()
-  return usage_count >= 3
-
-def create_traceability_log(livestock_id, event_type, event_data):
-  last_log = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc()).first()
-  previous_hash = last_log.hash_value if last_log else "0"
-  hash_data = {'livestock_id': livestock_id, 'event_type': event_type, 'event_data': event_data, 'timestamp': datetime.now(timezone.utc).isoformat(), 'previous_hash': previous_hash}
-  current_hash = hashlib.sha256(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
-  log = TraceabilityLog(livestock_id=livestock_id, event_type=event_type, event_data=event_data, performed_by=g.current_user.id, hash_value=current_hash, previous_hash=previous_hash, ip_address=request.remote_addr)
-  db.session.add(log)
+def excessive_use_message(usage, livestock):
+  return f'The drug {usage["drug_name"]} has been used {usage["threshold"]} or more times in the last {usage["window_days"]} days for livestock {livestock.rfid_tag}'
+
+def excessive_use_alert(usage, livestock):
+  return alert_candidate(
+    'excessive_use', 'high', livestock.farmer_id, livestock.id, f'Excessive use of {usage["drug_name"]}', excessive_use_message(usage, livestock),
+    drug_name=usage['drug_name'], group=livestock.species,
+    metadata={'drug_name': usage['drug_name'], 'threshold': usage['threshold'], 'window_days': usage['window_days'], 'usage_count': usage['count']}
+  )
+
+def withdrawal_alert(drug_name, withdrawal_end, withdrawal_days, livestock):
+  return alert_candidate(
+    'withdrawal_period', 'medium', livestock.farmer_id, livestock.id, f'Withdrawal period for {drug_name}', f'Withdrawal period ends on {withdrawal_end.strftime("%Y-%m-%d")}. Do not sell products until then.',
+    drug_name=drug_name, group=livestock.species, metadata={'withdrawal_by_livestock': {str(livestock.id): withdrawal_end.isoformat()}, 'withdrawal_days': withdrawal_days}
+  )
 
 @amu_bp.route('/record', methods=['POST'])
 @verify_firebase_token
@@ -44,8 +44,8 @@ def record_amu():
   data = request.get_json()
   livestock_id = data.get('livestock_id')
   livestock = Livestock.query.get_or_404(livestock_id)
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or livestock.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
 
   if not data.get('drug_name') or not data.get('dosage') or not data.get('unit'): return jsonify({'error': 'Drug name, dosage, and unit are required'}), 400
   start_date = datetime.strptime(data.get('start_date'), '%Y-%m-%d').date() if data.get('start_date') else datetime.now(timezone.utc).date()
@@ -66,33 +66,132 @@ def record_amu():
     duration_days=duration_days,
     reason=data.get('reason'),
     prescribed_by=data.get('prescribed_by'),
-    recorded_by=g.current_user.id,
+    recorded_by=g.principal.user_id,
     withdrawal_end_date=withdrawal_end
   )
   db.session.add(amu_record)
   db.session.flush()
-  if check_excessive_usage(livestock_id, data.get('drug_name')):
-    alert = Alert(livestock_id=livestock_id, farmer_id=livestock.farmer_id, alert_type='excessive_use', severity='high', title=f'Excessive use of {data.get("drug_name")}', message=f'The drug {data.get("drug_name")} has been used 3 or more times in the last 30 days for livestock {livestock.rfid_tag}')
-    db.session.add(alert)
-  if withdrawal_end:
-    alert = Alert(livestock_id=livestock_id, farmer_id=livestock.farmer_id, alert_type='withdrawal_period', severity='medium', title=f'Withdrawal period for {data.get("drug_name")}', message=f'Withdrawal period ends on {withdrawal_end.strftime("%Y-%m-%d")}. Do not sell products until then.', metadata={'withdrawal_end_date': withdrawal_end.isoformat(), 'withdrawal_days': withdrawal_days})
-    db.session.add(alert)
+  alerts = [excessive_use_alert(usage, livestock) for usage in excessive_usage([(livestock.id, data.get('drug_name'), data.get('drug_category'))]).values()]
+  if withdrawal_end: alerts.append(withdrawal_alert(data.get('drug_name'), withdrawal_end, withdrawal_days, livestock))
+  raise_alerts(alerts)
+  record_farm_usage([(livestock.farmer_id, amu_record.drug_name, amu_record.drug_category, amu_record.dosage, amu_record.unit)], amu_record.created_at.date())
   create_traceability_log(livestock_id, 'amu_recorded', {'drug_name': data.get('drug_name'), 'dosage': data.get('dosage'), 'unit': data.get('unit'), 'start_date': start_date.isoformat()})
   db.session.commit()  
   return jsonify({'message': 'AMU record created successfully', 'record_id': amu_record.id, 'withdrawal_end_date': withdrawal_end.isoformat() if withdrawal_end else None}), 201
 
+def positive_number(value):
+  if isinstance(value, bool): return None
+  try: number = float(value)
+  except (TypeError, ValueError): return None
+  return number if math.isfinite(number) and number > 0 else None
+
+def reference_id(value):
+  return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def reference_ids(items, field):
+  return list({reference_id(item.get(field)) for item in items} - {None})
+
+AMU_RECORD_FIELDS = ('prescription_id', 'drug_name', 'drug_category', 'active_ingredient', 'dosage', 'unit', 'administration_route', 'start_date', 'end_date', 'frequency', 'duration_days', 'reason', 'prescribed_by')
+
+@amu_bp.route('/records/batch', methods=['POST'])
+@verify_firebase_token
+@require_role('farmer', 'veterinary')
+@require_profile_complete
+def record_amu_batch():
+  data = request.get_json() or {}
+  defaults = data.get('defaults') or {}
+  items = data.get('records')
+  if not isinstance(items, list) or not items: return jsonify({'error': 'records must be a non-empty list'}), 400
+  max_batch = current_app.config.get('AMU_BATCH_MAX', 5000)
+  if len(items) > max_batch: return jsonify({'error': f'A batch can contain at most {max_batch} records'}), 400
+
+  if not isinstance(defaults, dict): return jsonify({'error': 'defaults must be an object'}), 400
+  invalid = [index for index, item in enumerate(items) if not isinstance(item, dict)]
+  if invalid: return jsonify({'error': 'Batch validation failed', 'details': [{'index': index, 'error': 'Record must be an object'} for index in invalid]}), 400
+
+  items = [{**defaults, **item} for item in items]
+  livestock_map = {l.id: l for l in Livestock.query.filter(Livestock.id.in_(reference_ids(items, 'livestock_id'))).all()}
+  prescription_livestock = dict(db.session.execute(db.select(Prescription.id, Prescription.livestock_id).where(Prescription.id.in_(reference_ids(items, 'prescription_id')))).all())
+  veterinarian_ids = set(db.session.scalars(db.select(Veterinarian.id).where(Veterinarian.id.in_(reference_ids(items, 'prescribed_by')))))
+  farmer_id = g.principal.profile_id if g.principal.role == 'farmer' else None
+  if g.principal.role == 'farmer' and not farmer_id: return jsonify({'error': 'Farmer profile not found'}), 400
+
+  today = datetime.now(timezone.utc).date()
+  errors, rows = [], []
+  for index, item in enumerate(items):
+    livestock = livestock_map.get(reference_id(item.get('livestock_id')))
+    if livestock is None:
+      errors.append({'index': index, 'error': 'Livestock not found'})
+      continue
+    if farmer_id and livestock.farmer_id != farmer_id:
+      errors.append({'index': index, 'error': 'Unauthorized access'})
+      continue
+    if item.get('prescription_id') is not None and prescription_livestock.get(reference_id(item['prescription_id'])) != livestock.id:
+      errors.append({'index': index, 'error': 'Prescription not found for this livestock'})
+      continue
+    if item.get('prescribed_by') is not None and reference_id(item['prescribed_by']) not in veterinarian_ids:
+      errors.append({'index': index, 'error': 'Prescribing veterinarian not found'})
+      continue
+    if not item.get('drug_name') or not item.get('dosage') or not item.get('unit'):
+      errors.append({'index': index, 'error': 'Drug name, dosage, and unit are required'})
+      continue
+    dosage = positive_number(item['dosage'])
+    if dosage is None:
+      errors.append({'index': index, 'error': 'dosage must be a positive number'})
+      continue
+    try:
+      start_date = datetime.strptime(item['start_date'], '%Y-%m-%d').date() if item.get('start_date') else today
+      end_date = datetime.strptime(item['end_date'], '%Y-%m-%d').date() if item.get('end_date') else None
+    except (TypeError, ValueError):
+      errors.append({'index': index, 'error': 'Dates must use YYYY-MM-DD'})
+      continue
+    if not isinstance(item.get('duration_days', 1), int) or isinstance(item.get('duration_days', 1), bool) or item.get('duration_days', 1) < 0:
+      errors.append({'index': index, 'error': 'duration_days must be a non-negative integer'})
+      continue
+    row = {field: item.get(field) for field in AMU_RECORD_FIELDS}
+    row.update(livestock_id=livestock.id, dosage=dosage, start_date=start_date, end_date=end_date, duration_days=item.get('duration_days', 1))
+    rows.append(row)
+  if errors: return jsonify({'error': 'Batch validation failed', 'details': errors}), 400
+
+  withdrawal_cache = {}
+  for row in rows:
+    species = livestock_map[row['livestock_id']].species
+    key = (row['drug_name'], species)
+    if key not in withdrawal_cache: withdrawal_cache[key] = withdrawal_periods.lookup(row['drug_name'], species)
+    period = withdrawal_cache[key]
+    row['withdrawal_days'] = period.withdrawal_period_days if period else None
+    row['withdrawal_end_date'] = row['start_date'] + timedelta(days=row['duration_days'] + period.withdrawal_period_days) if period else None
+
+  now = datetime.now(timezone.utc)
+  flagged = excessive_usage([(row['livestock_id'], row['drug_name'], row['drug_category']) for row in rows])
+  alerts = [excessive_use_alert(usage, livestock_map[livestock_id]) for (livestock_id, _), usage in flagged.items()]
+  alerts += [withdrawal_alert(row['drug_name'], row['withdrawal_end_date'], row['withdrawal_days'], livestock_map[row['livestock_id']]) for row in rows if row['withdrawal_end_date']]
+
+  records = [{**{k: v for k, v in row.items() if k != 'withdrawal_days'}, 'recorded_by': g.principal.user_id, 'is_verified': False, 'created_at': now} for row in rows]
+  db.session.execute(insert(AntimicrobialRecord), records)
+  alerts_created, alerts_merged = raise_alerts(alerts, now)
+  record_farm_usage([(livestock_map[row['livestock_id']].farmer_id, row['drug_name'], row['drug_category'], row['dosage'], row['unit']) for row in rows], now.date())
+  create_traceability_logs([(row['livestock_id'], 'amu_recorded', {'drug_name': row['drug_name'], 'dosage': row['dosage'], 'unit': row['unit'], 'start_date': row['start_date'].isoformat()}) for row in rows])
+  db.session.commit()
+
+  return jsonify({
+    'message': 'AMU records created successfully',
+    'created': len(rows),
+    'alerts_created': alerts_created,
+    'alerts_merged': alerts_merged,
+    'records': [{'index': index, 'livestock_id': row['livestock_id'], 'withdrawal_end_date': row['withdrawal_end_date'].isoformat() if row['withdrawal_end_date'] else None} for index, row in enumerate(rows)]
+  }), 201
+
 @amu_bp.route('/livestock/<int:livestock_id>', methods=['GET'])
 @verify_firebase_token
 @require_profile_complete
 def get_livestock_amu_history(livestock_id):
   livestock = Livestock.query.get_or_404(livestock_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or livestock.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  page = request.args.get('page', 1, type=int)
-  per_page = request.args.get('per_page', 20, type=int)  
-  amu_query = AntimicrobialRecord.query.filter_by(livestock_id=livestock_id).order_by(AntimicrobialRecord.start_date.desc())
-  pagination = amu_query.paginate(page=page, per_page=per_page, error_out=False)
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  amu_query = AntimicrobialRecord.query.filter_by(livestock_id=livestock_id)
+  items, page_info = paginate_request(amu_query, f'amu:{livestock_id}', AntimicrobialRecord.start_date, AntimicrobialRecord.id)
 
   records = [{
     'id': r.id,
@@ -109,8 +208,8 @@ def get_livestock_amu_history(livestock_id):
     'is_verified': r.is_verified,
     'withdrawal_end_date': r.withdrawal_end_date.isoformat() if r.withdrawal_end_date else None,
     'created_at': r.created_at.isoformat()
-  } for r in pagination.items]  
-  return jsonify({'livestock_id': livestock_id, 'rfid_tag': livestock.rfid_tag, 'amu_records': records, 'total': pagination.total, 'page': pagination.page, 'pages': pagination.pages}), 200
+  } for r in items]  
+  return jsonify({'livestock_id': livestock_id, 'rfid_tag': livestock.rfid_tag, 'amu_records': records, **page_info}), 200
 
 @amu_bp.route('/verify/<int:record_id>', methods=['PUT'])
 @verify_firebase_token
@@ -119,7 +218,7 @@ def get_livestock_amu_history(livestock_id):
 def verify_amu_record(record_id):
   amu_record = AntimicrobialRecord.query.get_or_404(record_id)
 
-  if amu_record.prescribed_by != g.current_user.veterinarian.id: return jsonify({'error': 'Only the prescribing veterinarian can verify this record'}), 403
+  if amu_record.prescribed_by != g.principal.profile_id: return jsonify({'error': 'Only the prescribing veterinarian can verify this record'}), 403
   amu_record.is_verified = True
   amu_record.verified_at = datetime.now(timezone.utc)
   db.session.commit()
@@ -131,20 +230,16 @@ def verify_amu_record(record_id):
 @require_role('farmer')
 @require_profile_complete
 def farmer_amu_analytics():
-  farmer = g.current_user.farmer
-  if not farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-  thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-  ninety_days_ago = datetime.now(timezone.utc) - timedelta(days=90)
-  total_amu_records = db.session.query(func.count(AntimicrobialRecord.id)).join(Livestock).filter(Livestock.farmer_id == farmer.id).scalar()
-  recent_amu = db.session.query(func.count(AntimicrobialRecord.id)).join(Livestock).filter(Livestock.farmer_id == farmer.id, AntimicrobialRecord.created_at >= thirty_days_ago).scalar()  
-  drug_usage = db.session.query(AntimicrobialRecord.drug_name, func.count(AntimicrobialRecord.id)).join(Livestock).filter(Livestock.farmer_id == farmer.id, AntimicrobialRecord.created_at >= ninety_days_ago).group_by(AntimicrobialRecord.drug_name).order_by(func.count(AntimicrobialRecord.id).desc()).limit(10).all()
-  active_withdrawal_periods = db.session.query(func.count(AntimicrobialRecord.id)).join(Livestock).filter(Livestock.farmer_id == farmer.id, AntimicrobialRecord.withdrawal_end_date >= datetime.now(timezone.utc).date()).scalar()
+  farmer_id = g.principal.profile_id
+  if not farmer_id: return jsonify({'error': 'Farmer profile not found'}), 400
+  usage = farm_usage_summary(farmer_id)
+  active_withdrawal_periods = db.session.query(func.count(AntimicrobialRecord.id)).join(Livestock).filter(Livestock.farmer_id == farmer_id, AntimicrobialRecord.withdrawal_end_date >= datetime.now(timezone.utc).date()).scalar()
 
   return jsonify({
-    'total_amu_records': total_amu_records,
-    'recent_amu_30_days': recent_amu,
+    'total_amu_records': usage['total'],
+    'recent_amu_30_days': usage['recent'],
     'active_withdrawal_periods': active_withdrawal_periods,
-    'top_drugs_used': [{'drug_name': drug, 'count': count} for drug, count in drug_usage]
+    'top_drugs_used': [{'drug_name': drug, 'count': count} for drug, count in usage['top_drugs']]
   }), 200
 
 @amu_bp.route('/analytics/regional', methods=['GET'])
@@ -152,56 +247,90 @@ def farmer_amu_analytics():
 @require_role('government')
 @require_profile_complete
 def regional_amu_analytics():
-  gov_official = g.current_user.government_official
+  gov_official = g.principal.profile
   if not gov_official: return jsonify({'error': 'Government official profile not found'}), 400
   
   district = request.args.get('district', gov_official.jurisdiction_district)
   state = request.args.get('state', gov_official.jurisdiction_state)
   days = request.args.get('days', 90, type=int)
-  date_threshold = datetime.now(timezone.utc) - timedelta(days=days)  
-  query = db.session.query(func.count(AntimicrobialRecord.id)).join(Livestock).join(Farmer)
-
-  if district: query = query.filter(Farmer.district == district)
-  elif state: query = query.filter(Farmer.state == state)
-  total_amu = query.filter(AntimicrobialRecord.created_at >= date_threshold).scalar()  
-  drug_distribution = db.session.query(AntimicrobialRecord.drug_category, func.count(AntimicrobialRecord.id)).join(Livestock).join(Farmer)
-
-  if district: drug_distribution = drug_distribution.filter(Farmer.district == district)
-  elif state: drug_distribution = drug_distribution.filter(Farmer.state == state)
-
-  drug_distribution = drug_distribution.filter(AntimicrobialRecord.created_at >= date_threshold).group_by(AntimicrobialRecord.drug_category).all()
-  species_amu = db.session.query(Livestock.species, func.count(AntimicrobialRecord.id)).join(AntimicrobialRecord).join(Farmer)
-  if district: species_amu = species_amu.filter(Farmer.district == district)
-  elif state: species_amu = species_amu.filter(Farmer.state == state)
-
-  species_amu = species_amu.filter(AntimicrobialRecord.created_at >= date_threshold).group_by(Livestock.species).all()
+  rows = region_window(district, state, days)
   return jsonify({
     'region': district or state or 'All',
     'period_days': days,
-    'total_amu_records': total_amu,
-    'drug_category_distribution': [{'category': cat or 'uncategorized', 'count': count} for cat, count in drug_distribution],
-    'species_distribution': [{'species': sp, 'count': count} for sp, count in species_amu]
+    'total_amu_records': sum(row.amu_usage_count for row in rows),
+    'drug_category_distribution': [{'category': cat, 'count': count} for cat, count in merge_counts(rows, 'drug_categories').items()],
+    'species_distribution': [{'species': sp, 'count': count} for sp, count in merge_counts(rows, 'amu_species').items()],
+    'as_of': max(row.generated_at for row in rows).isoformat() if rows else None
   }), 200
 
+@amu_bp.route('/analytics/metrics', methods=['GET'])
+@verify_firebase_token
+@require_role('government', 'farmer')
+@require_profile_complete
+def amu_metrics():
+  level = request.args.get('level', 'district')
+  days = request.args.get('days', 365, type=int)
+  limit = request.args.get('limit', 100, type=int)
+  if level not in METRIC_LEVELS: return jsonify({'error': f'level must be one of {", ".join(METRIC_LEVELS)}'}), 400
+  if days < 1: return jsonify({'error': 'days must be positive'}), 400
+
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    metrics = compute_amu_metrics(level, days, farmer_id=g.principal.profile_id)
+  else:
+    gov_official = g.principal.profile
+    if not gov_official: return jsonify({'error': 'Government official profile not found'}), 400
+    district = request.args.get('district', gov_official.jurisdiction_district)
+    state = request.args.get('state', gov_official.jurisdiction_state)
+    metrics = compute_amu_metrics(level, days, district=district, state=state)
+
+  metrics['groups'] = sorted(metrics['groups'], key=lambda group: group['mg_per_pcu'] or 0, reverse=True)[:limit]
+  return jsonify(metrics), 200
+
 @amu_bp.route('/withdrawal/active', methods=['GET'])
 @verify_firebase_token
 @require_role('farmer')
 @require_profile_complete
 def active_withdrawal_periods():
-  farmer = g.current_user.farmer
-  if not farmer: return jsonify({'error': 'Farmer profile not found'}), 400  
+  farmer_id = g.principal.profile_id
+  if not farmer_id: return jsonify({'error': 'Farmer profile not found'}), 400  
+  today = datetime.now(timezone.utc).date()
   active_withdrawals = db.session.query(AntimicrobialRecord, Livestock).join(Livestock).filter(
-    Livestock.farmer_id == farmer.id,
-    AntimicrobialRecord.withdrawal_end_date >= datetime.now(timezone.utc).date()
-  ).order_by(AntimicrobialRecord.withdrawal_end_date.asc()).all()
-
-  withdrawals_list = [{
-    'livestock_id': livestock.id,
-    'rfid_tag': livestock.rfid_tag,
-    'species': livestock.species,
-    'drug_name': record.drug_name,
-    'start_date': record.start_date.isoformat(),
-    'withdrawal_end_date': record.withdrawal_end_date.isoformat(),
-    'days_remaining': (record.withdrawal_end_date - datetime.now(timezone.utc).date()).days
-  } for record, livestock in active_withdrawals]
-  return jsonify({'active_withdrawal_periods': withdrawals_list, 'total': len(withdrawals_list)}), 200
\ No newline at end of file
+    Livestock.farmer_id == farmer_id,
+    AntimicrobialRecord.withdrawal_end_date >= today
+  ).order_by(AntimicrobialRecord.withdrawal_end_date.asc())
+
+  def withdrawal_entry(row):
+    record, livestock = row
+    return {
+      'livestock_id': livestock.id,
+      'rfid_tag': livestock.rfid_tag,
+      'species': livestock.species,
+      'drug_name': record.drug_name,
+      'start_date': record.start_date.isoformat(),
+      'withdrawal_end_date': record.withdrawal_end_date.isoformat(),
+      'days_remaining': (record.withdrawal_end_date - today).days
+    }
+
+  if wants_ndjson(): return ndjson_response(active_withdrawals, withdrawal_entry)
+  withdrawals_list = [withdrawal_entry(row) for row in active_withdrawals.all()]
+  return jsonify({'active_withdrawal_periods': withdrawals_list, 'total': len(withdrawals_list)}), 200
+
+@amu_bp.route('/withdrawal/risk', methods=['GET'])
+@verify_firebase_token
+@require_role('farmer', 'government')
+@require_profile_complete
+def withdrawal_risk():
+  days = request.args.get('days', current_app.config.get('AMU_RESIDUE_HORIZON_DAYS', 30), type=int)
+  if days < 1 or days > 365: return jsonify({'error': 'days must be between 1 and 365'}), 400
+
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    projection = project_residues(days, farmer_id=g.principal.profile_id)
+  else:
+    gov_official = g.principal.profile
+    if not gov_official: return jsonify({'error': 'Government official profile not found'}), 400
+    projection = project_residues(days, district=request.args.get('district', gov_official.jurisdiction_district), state=request.args.get('state', gov_official.jurisdiction_state))
+
+  if wants_ndjson(): return ndjson_response(projection['projections'], lambda entry: entry)
+  return jsonify({**projection, 'total': len(projection['projections'])}), 200
\ No newline at end of file
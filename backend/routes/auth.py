@@ -1,71 +1,73 @@
 from flask import Blueprint, request, jsonify, g
 from extensions import db
 from models.user import User
-from middlewares.auth import verify_firebase_token
+from middlewares.auth import verify_firebase_token, current_user, token_cache
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 @auth_bp.route('/verify', methods=['POST'])
 @verify_firebase_token
 def verify_token():
-  user_data = {'firebase_uid': g.firebase_uid, 'email': g.email, 'user_exists': g.current_user is not None}
-  if g.current_user:
+  user = current_user()
+  user_data = {'firebase_uid': g.firebase_uid, 'email': g.email, 'user_exists': user is not None}
+  if user:
     user_data.update({
-      'user_id': g.current_user.id,
-      'name': g.current_user.name,
-      'role': g.current_user.role,
-      'is_profile_complete': g.current_user.is_profile_complete,
-      'onboarding_step': g.current_user.onboarding_step
+      'user_id': user.id,
+      'name': user.name,
+      'role': user.role,
+      'is_profile_complete': user.is_profile_complete,
+      'onboarding_step': user.onboarding_step
     })
   return jsonify(user_data), 200
 
 @auth_bp.route('/profile', methods=['GET'])
 @verify_firebase_token
 def get_profile():
-  if not g.current_user:
+  user = current_user()
+  if not user:
     return jsonify({'error': 'User not found'}), 404
 
   profile_data = {
-    'id': g.current_user.id,
-    'name': g.current_user.name,
-    'email': g.current_user.email,
-    'role': g.current_user.role,
-    'phone': g.current_user.phone,
-    'profile_image_url': g.current_user.profile_image_url,
-    'is_active': g.current_user.is_active,
-    'is_profile_complete': g.current_user.is_profile_complete,
-    'onboarding_step': g.current_user.onboarding_step,
-    'created_at': g.current_user.created_at.isoformat()
+    'id': user.id,
+    'name': user.name,
+    'email': user.email,
+    'role': user.role,
+    'phone': user.phone,
+    'profile_image_url': user.profile_image_url,
+    'is_active': user.is_active,
+    'is_profile_complete': user.is_profile_complete,
+    'onboarding_step': user.onboarding_step,
+    'created_at': user.created_at.isoformat()
   }
 
-  if g.current_user.role == 'farmer' and g.current_user.farmer:
+  if user.role == 'farmer' and user.farmer:
     profile_data['farmer'] = {
-      'farm_name': g.current_user.farmer.farm_name,
-      'farm_type': g.current_user.farmer.farm_type,
-      'region': g.current_user.farmer.region,
-      'state': g.current_user.farmer.state,
-      'district': g.current_user.farmer.district
+      'farm_name': user.farmer.farm_name,
+      'farm_type': user.farmer.farm_type,
+      'region': user.farmer.region,
+      'state': user.farmer.state,
+      'district': user.farmer.district
     }
-  elif g.current_user.role == 'veterinary' and g.current_user.veterinarian:
+  elif user.role == 'veterinary' and user.veterinarian:
     profile_data['veterinarian'] = {
-      'license_number': g.current_user.veterinarian.license_number,
-      'specialization': g.current_user.veterinarian.specialization,
-      'clinic_name': g.current_user.veterinarian.clinic_hospital_name,
-      'verification_status': g.current_user.veterinarian.verification_status
+      'license_number': user.veterinarian.license_number,
+      'specialization': user.veterinarian.specialization,
+      'clinic_name': user.veterinarian.clinic_hospital_name,
+      'verification_status': user.veterinarian.verification_status
     }
-  elif g.current_user.role == 'government' and g.current_user.government_official:
+  elif user.role == 'government' and user.government_official:
     profile_data['government'] = {
-      'government_id': g.current_user.government_official.government_id,
-      'department': g.current_user.government_official.department_name,
-      'designation': g.current_user.government_official.designation,
-      'jurisdiction_state': g.current_user.government_official.jurisdiction_state,
-      'jurisdiction_district': g.current_user.government_official.jurisdiction_district
+      'government_id': user.government_official.government_id,
+      'department': user.government_official.department_name,
+      'designation': user.government_official.designation,
+      'jurisdiction_state': user.government_official.jurisdiction_state,
+      'jurisdiction_district': user.government_official.jurisdiction_district
     }
-  elif g.current_user.role == 'researcher' and g.current_user.researcher:
+  elif user.role == 'researcher' and user.researcher:
     profile_data['researcher'] = {
-      'institution': g.current_user.researcher.institution_name,
-      'project': g.current_user.researcher.project_name,
-      'research_area': g.current_user.researcher.research_area
+      'institution': user.researcher.institution_name,
+      'project': user.researcher.project_name,
+      'research_area': user.researcher.research_area
     }
 
   return jsonify(profile_data), 200
@@ -73,14 +75,15 @@ def get_profile():
 @auth_bp.route('/profile', methods=['PUT'])
 @verify_firebase_token
 def update_profile():
-  if not g.current_user:
+  user = current_user()
+  if not user:
     return jsonify({'error': 'User not found'}), 404
 
   data = request.get_json()
 
-  if 'name' in data: g.current_user.name = data['name']
-  if 'phone' in data: g.current_user.phone = data['phone']
-  if 'profile_image_url' in data: g.current_user.profile_image_url = data['profile_image_url']
+  if 'name' in data: user.name = data['name']
+  if 'phone' in data: user.phone = data['phone']
+  if 'profile_image_url' in data: user.profile_image_url = data['profile_image_url']
 
   db.session.commit()
   return jsonify({'message': 'Profile updated successfully'}), 200
@@ -88,4 +91,5 @@ def update_profile():
 @auth_bp.route('/logout', methods=['POST'])
 @verify_firebase_token
 def logout():
+  token_cache.invalidate(g.token_key)
   return jsonify({'message': 'Logged out successfully'}), 200
\ No newline at end of file
@@ -4,6 +4,7 @@ from models.livestock import Livestock
 from models.user import Veterinarian, Farmer
 from models.requests import Alert, ConsultationRequest
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
+from utils.pagination import paginate_request
 from datetime import datetime, timezone
 
 consultation_bp = Blueprint('consultation', __name__, url_prefix='/api/consultation')
@@ -13,8 +14,8 @@ consultation_bp = Blueprint('consultation', __name__, url_prefix='/api/consultat
 @require_role('farmer')
 @require_profile_complete
 def create_consultation_request():
-  farmer = g.current_user.farmer
-  if not farmer: return jsonify({'error': 'Farmer profile not found'}), 400
+  farmer_id = g.principal.profile_id
+  if not farmer_id: return jsonify({'error': 'Farmer profile not found'}), 400
 
   data = request.get_json()
   veterinarian_id = data.get('veterinarian_id')
@@ -25,10 +26,10 @@ def create_consultation_request():
   
   if livestock_id:
     livestock = Livestock.query.get(livestock_id)
-    if not livestock or livestock.farmer_id != farmer.id: return jsonify({'error': 'Livestock not found or unauthorized'}), 404
+    if not livestock or livestock.farmer_id != farmer_id: return jsonify({'error': 'Livestock not found or unauthorized'}), 404
   
   consultation = ConsultationRequest(
-    farmer_id=farmer.id,
+    farmer_id=farmer_id,
     veterinarian_id=veterinarian_id,
     livestock_id=livestock_id,
     request_type=data.get('request_type', 'other'),
@@ -38,7 +39,7 @@ def create_consultation_request():
   db.session.add(consultation)
   db.session.flush()
   if veterinarian_id:
-    alert = Alert(farmer_id=farmer.id, veterinarian_id=veterinarian_id, livestock_id=livestock_id, alert_type='consultation_request', severity='medium', title='New Consultation Request', message=f'Farmer {g.current_user.name} has requested a consultation')
+    alert = Alert(farmer_id=farmer_id, veterinarian_id=veterinarian_id, livestock_id=livestock_id, alert_type='consultation_request', severity='medium', title='New Consultation Request', message=f'Farmer {g.principal.user.name} has requested a consultation')
     db.session.add(alert)
   db.session.commit()
   return jsonify({'message': 'Consultation request created', 'request_id': consultation.id}), 201
@@ -47,21 +48,18 @@ def create_consultation_request():
 @verify_firebase_token
 @require_profile_complete
 def list_consultations():
-  page = request.args.get('page', 1, type=int)
-  per_page = request.args.get('per_page', 20, type=int)
   status = request.args.get('status')
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    query = ConsultationRequest.query.filter_by(farmer_id=g.current_user.farmer.id)
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian: return jsonify({'error': 'Veterinary profile not found'}), 400
-    query = ConsultationRequest.query.filter_by(veterinarian_id=g.current_user.veterinarian.id)
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    query = ConsultationRequest.query.filter_by(farmer_id=g.principal.profile_id)
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    query = ConsultationRequest.query.filter_by(veterinarian_id=g.principal.profile_id)
   else: return jsonify({'error': 'Unauthorized access'}), 403
   
   if status: query = query.filter_by(status=status)
-  query = query.order_by(ConsultationRequest.created_at.desc())
-  pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+  items, page_info = paginate_request(query, 'consultations', ConsultationRequest.created_at, ConsultationRequest.id)
 
   consultations = [{
     'id': c.id,
@@ -71,8 +69,8 @@ def list_consultations():
     'status': c.status,
     'livestock_id': c.livestock_id,
     'created_at': c.created_at.isoformat()
-  } for c in pagination.items]  
-  return jsonify({'consultations': consultations, 'total': pagination.total, 'page': pagination.page, 'pages': pagination.pages}), 200
+  } for c in items]  
+  return jsonify({'consultations': consultations, **page_info}), 200
 
 @consultation_bp.route('/<int:consultation_id>', methods=['GET'])
 @verify_firebase_token
@@ -80,10 +78,10 @@ def list_consultations():
 def get_consultation(consultation_id):
   consultation = ConsultationRequest.query.get_or_404(consultation_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or consultation.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or consultation.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or consultation.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or consultation.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   farmer = Farmer.query.get(consultation.farmer_id)
   livestock_info = None
   if consultation.livestock_id:
@@ -109,7 +107,7 @@ def get_consultation(consultation_id):
 @require_profile_complete
 def accept_consultation(consultation_id):
   consultation = ConsultationRequest.query.get_or_404(consultation_id)
-  if consultation.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if consultation.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   if consultation.status != 'pending': return jsonify({'error': 'Consultation already processed'}), 400
   data = request.get_json()
   consultation.status = 'accepted'
@@ -124,7 +122,7 @@ def accept_consultation(consultation_id):
 @require_profile_complete
 def complete_consultation(consultation_id):
   consultation = ConsultationRequest.query.get_or_404(consultation_id)
-  if consultation.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if consultation.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   data = request.get_json()
   consultation.status = 'completed'
   consultation.response_notes = data.get('response_notes', consultation.response_notes)
@@ -137,10 +135,10 @@ def complete_consultation(consultation_id):
 @require_profile_complete
 def cancel_consultation(consultation_id):
   consultation = ConsultationRequest.query.get_or_404(consultation_id)
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or consultation.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or consultation.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or consultation.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or consultation.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   consultation.status = 'cancelled'
   consultation.updated_at = datetime.now(timezone.utc)
   db.session.commit()
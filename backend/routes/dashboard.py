@@ -1,14 +1,13 @@
-from flask import Blueprint, request, jsonify, g
-from extensions import db
-from models.user import User, Farmer, Veterinarian, GovernmentOfficial, Researcher
-from models.livestock import Livestock
-from models.amu import AntimicrobialRecord
-from models.requests import Alert, ConsultationRequest
-from models.analytics import RegionalAnalytics, DataRequest
+from flask import Blueprint, jsonify, g
+from extensions import db, gemini
+from models.user import Farmer
+from models.requests import ConsultationRequest
+from models.analytics import DataRequest
+from services.farm_rollup import farm_usage_summary
+from services.counters import owner_counters
+from services.regional_analytics import latest_region_snapshot, region_window, merge_counts, compute_compliance_rate
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
-from services.gemini import gemini_service
 from sqlalchemy import func, and_
-from datetime import datetime, timedelta, timezone
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
@@ -17,19 +16,15 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 @require_role('farmer')
 @require_profile_complete
 def farmer_dashboard():
-  farmer = g.current_user.farmer
+  farmer = g.principal.profile
   if not farmer: return jsonify({'error': 'Farmer profile not found'}), 400
   
-  total_livestock = Livestock.query.filter_by(farmer_id=farmer.id, is_active=True).count()
-  healthy_livestock = Livestock.query.filter_by(farmer_id=farmer.id, is_active=True, health_status='healthy').count()
-  under_treatment = Livestock.query.filter_by(farmer_id=farmer.id, is_active=True, health_status='under_treatment').count()
-
-  active_alerts = Alert.query.filter_by(farmer_id=farmer.id, status='unread').count()
-  thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-  recent_amu = AntimicrobialRecord.query.join(Livestock).filter(
-    Livestock.farmer_id == farmer.id,
-    AntimicrobialRecord.created_at >= thirty_days_ago
-  ).count()
+  counters = owner_counters('farmer', farmer.id)
+  total_livestock = counters.get('livestock.active', 0)
+  healthy_livestock = counters.get('livestock.health.healthy', 0)
+  under_treatment = counters.get('livestock.health.under_treatment', 0)
+  active_alerts = counters.get('alerts.status.unread', 0)
+  recent_amu = farm_usage_summary(farmer.id)['recent']
 
   ai_insights = None
   if total_livestock > 0:
@@ -39,7 +34,7 @@ def farmer_dashboard():
       'active_alerts': active_alerts,
       'recent_amu_count': recent_amu
     }
-    insights_result = gemini_service.farmer_dashboard_insights(farmer_data)
+    insights_result = gemini.farmer_dashboard_insights(farmer_data)
     if insights_result.get('success'): ai_insights = insights_result.get('insights')
   
   return jsonify({
@@ -58,7 +53,7 @@ def farmer_dashboard():
 @require_role('veterinary')
 @require_profile_complete
 def veterinary_dashboard():
-  vet = g.current_user.veterinarian
+  vet = g.principal.profile
   if not vet: return jsonify({'error': 'Veterinary profile not found'}), 400
 
   assigned_farms = Farmer.query.filter_by(primary_veterinarian_id=vet.id).count()
@@ -98,45 +93,31 @@ def veterinary_dashboard():
 @require_role('government')
 @require_profile_complete
 def government_dashboard():
-  gov_official = g.current_user.government_official
+  gov_official = g.principal.profile
   if not gov_official: return jsonify({'error': 'Government official profile not found'}), 400
   jurisdiction = gov_official.jurisdiction_district or gov_official.jurisdiction_state  
-  if gov_official.jurisdiction_district:
-    total_farms = Farmer.query.filter_by(district=gov_official.jurisdiction_district).count()
-    total_livestock = db.session.query(func.count(Livestock.id)).join(Farmer).filter(Farmer.district == gov_official.jurisdiction_district).scalar()
-  elif gov_official.jurisdiction_state:
-    total_farms = Farmer.query.filter_by(state=gov_official.jurisdiction_state).count()
-    total_livestock = db.session.query(func.count(Livestock.id)).join(Farmer).filter(Farmer.state == gov_official.jurisdiction_state).scalar()
-  else:
-    total_farms = Farmer.query.count()
-    total_livestock = Livestock.query.count()
-
-  thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-  recent_violations = Alert.query.filter(Alert.alert_type == 'mrl_breach', Alert.created_at >= thirty_days_ago).count()
-  compliance_rate = 95.0
-  if total_farms > 0:
-    farms_with_violations = db.session.query(func.count(func.distinct(Alert.farmer_id))).filter(Alert.alert_type == 'mrl_breach', Alert.created_at >= thirty_days_ago).scalar() or 0
-    compliance_rate = ((total_farms - farms_with_violations) / total_farms) * 100
+  snapshot = latest_region_snapshot(gov_official.jurisdiction_district, gov_official.jurisdiction_state)
+  recent = region_window(gov_official.jurisdiction_district, gov_official.jurisdiction_state, 30)
+  total_farms = sum(row.total_farms for row in snapshot)
+  total_livestock = sum(row.total_livestock for row in snapshot)
+  recent_violations = sum(row.mrl_violations_count for row in recent)
+  farms_with_violations = {farmer_id for row in recent for farmer_id in (row.analytics_data or {}).get('violating_farms', [])}
+  compliance_rate = compute_compliance_rate(total_farms, len(farms_with_violations))
 
   regional_data = {
     'total_farms': total_farms,
     'total_livestock': total_livestock,
-    'amu_usage_count': 0,
+    'amu_usage_count': sum(row.amu_usage_count for row in recent),
     'mrl_violations_count': recent_violations,
     'compliance_rate': round(compliance_rate, 2)
   }
 
   ai_insights = None
   if total_farms > 0:
-    insights_result = gemini_service.analyze_amu_trends(regional_data)
+    insights_result = gemini.analyze_amu_trends(regional_data)
     if insights_result.get('success'): ai_insights = insights_result.get('insights')
 
-  species_distribution = db.session.query(
-    Livestock.species,
-    func.count(Livestock.id)
-  ).filter(Livestock.is_active == True).group_by(Livestock.species).all()
-
-  species_data = {species: count for species, count in species_distribution}
+  species_data = merge_counts(snapshot, 'livestock_species')
 
   return jsonify({
     'jurisdiction': jurisdiction,
@@ -146,6 +127,7 @@ def government_dashboard():
     'recent_violations': recent_violations,
     'compliance_rate': round(compliance_rate, 2),
     'species_distribution': species_data,
+    'as_of': max(row.generated_at for row in snapshot).isoformat() if snapshot else None,
     'ai_insights': ai_insights
   }), 200
 
@@ -154,12 +136,13 @@ def government_dashboard():
 @require_role('researcher')
 @require_profile_complete
 def researcher_dashboard():
-  researcher = g.current_user.researcher
+  researcher = g.principal.profile
   if not researcher: return jsonify({'error': 'Researcher profile not found'}), 400
 
-  pending_requests = DataRequest.query.filter_by( researcher_id=researcher.id, status='pending' ).count()
-  approved_requests = DataRequest.query.filter_by( researcher_id=researcher.id, status='approved' ).count()
-  fulfilled_requests = DataRequest.query.filter_by( researcher_id=researcher.id, status='fulfilled' ).count()
+  counters = owner_counters('researcher', researcher.id)
+  pending_requests = counters.get('data_requests.status.pending', 0)
+  approved_requests = counters.get('data_requests.status.approved', 0)
+  fulfilled_requests = counters.get('data_requests.status.fulfilled', 0)
   recent_requests = DataRequest.query.filter_by( researcher_id=researcher.id ).order_by(DataRequest.created_at.desc()).limit(5).all()
   requests_list = [{
     'id': req.id,
@@ -1,47 +1,23 @@
 from flask import Blueprint, request, jsonify, g
 from extensions import db
 from models.livestock import Livestock
-from models.requests import TraceabilityLog
+from models.requests import ChainVerificationRun
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
+from utils.helpers import create_traceability_log
+from utils.streaming import wants_ndjson, ndjson_response
+from utils.pagination import paginate_request
+from services.archive import iter_trace_logs, find_log
+from services.checkpoints import build_inclusion_proof, ProofUnavailable
 from datetime import datetime
-import hashlib, json
 
 livestock_bp = Blueprint('livestock', __name__, url_prefix='/api/livestock')
 
-def generate_hash(data_dict):
-  data_string = json.dumps(data_dict, sort_keys=True)
-  return hashlib.sha256(data_string.encode()).hexdigest()
-
-def create_traceability_log(livestock_id, event_type, event_data):
-  last_log = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc()).first()
-  previous_hash = last_log.hash_value if last_log else "0"
-
-  hash_data = {
-    'livestock_id': livestock_id,
-    'event_type': event_type,
-    'event_data': event_data,
-    'timestamp': datetime.utcnow().isoformat(),
-    'previous_hash': previous_hash
-  }
-  current_hash = generate_hash(hash_data)
-
-  log = TraceabilityLog(
-    livestock_id=livestock_id,
-    event_type=event_type,
-    event_data=event_data,
-    performed_by=g.current_user.id,
-    hash_value=current_hash,
-    previous_hash=previous_hash,
-    ip_address=request.remote_addr
-  )
-  db.session.add(log)
-
 @livestock_bp.route('/add', methods=['POST'])
 @verify_firebase_token
 @require_role('farmer')
 @require_profile_complete
 def add_livestock():
-  if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
+  if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
   data = request.get_json()
 
   if not data.get('rfid_tag') or not data.get('species'): return jsonify({'error': 'RFID tag and species are required'}), 400
@@ -50,7 +26,7 @@ def add_livestock():
 
   livestock = Livestock(
     rfid_tag=data.get('rfid_tag'),
-    farmer_id=g.current_user.farmer.id,
+    farmer_id=g.principal.profile_id,
     species=data.get('species'),
     breed=data.get('breed'),
     name=data.get('name'),
@@ -85,20 +61,18 @@ def add_livestock():
 @verify_firebase_token
 @require_profile_complete
 def list_livestock():
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    livestock_query = Livestock.query.filter_by(farmer_id=g.current_user.farmer.id, is_active=True)
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    livestock_query = Livestock.query.filter_by(farmer_id=g.principal.profile_id, is_active=True)
 
-  elif g.current_user.role == 'veterinary':
+  elif g.principal.role == 'veterinary':
     farmer_id = request.args.get('farmer_id')
     if not farmer_id: return jsonify({'error': 'Farmer ID required for veterinary access'}), 400
     livestock_query = Livestock.query.filter_by(farmer_id=farmer_id, is_active=True)
-  elif g.current_user.role == 'government': livestock_query = Livestock.query.filter_by(is_active=True)
+  elif g.principal.role == 'government': livestock_query = Livestock.query.filter_by(is_active=True)
 
   else: return jsonify({'error': 'Unauthorized access'}), 403
-  page = request.args.get('page', 1, type=int)
-  per_page = request.args.get('per_page', 20, type=int)
-  pagination = livestock_query.paginate(page=page, per_page=per_page, error_out=False)
+  items, page_info = paginate_request(livestock_query, 'livestock', Livestock.id, Livestock.id, descending=False)
 
   livestock_list = [{
     'id': l.id,
@@ -113,14 +87,9 @@ def list_livestock():
     'production_type': l.production_type,
     'milk_production_liters_daily': l.milk_production_liters_daily,
     'image_url': l.image_url
-  } for l in pagination.items]
+  } for l in items]
 
-  return jsonify({
-    'livestock': livestock_list,
-    'total': pagination.total,
-    'page': pagination.page,
-    'pages': pagination.pages
-  }), 200
+  return jsonify({'livestock': livestock_list, **page_info}), 200
 
 @livestock_bp.route('/<int:livestock_id>', methods=['GET'])
 @verify_firebase_token
@@ -128,8 +97,8 @@ def list_livestock():
 def get_livestock_details(livestock_id):
   livestock = Livestock.query.get_or_404(livestock_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or livestock.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   return jsonify({
     'id': livestock.id,
     'rfid_tag': livestock.rfid_tag,
@@ -157,8 +126,8 @@ def get_livestock_details(livestock_id):
 def update_livestock(livestock_id):
   livestock = Livestock.query.get_or_404(livestock_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or livestock.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   
   data = request.get_json()
   changes = {}
@@ -178,22 +147,71 @@ def update_livestock(livestock_id):
     return jsonify({'message': 'Livestock updated successfully', 'changes': changes}), 200
   return jsonify({'message': 'No changes detected'}), 200
 
-@livestock_bp.route('/<int:livestock_id>/trace', methods=['GET'])
-@verify_firebase_token
-def trace_livestock(livestock_id):
-  livestock = Livestock.query.get_or_404(livestock_id)
-  logs = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc()).all()  
-  trace_data = [{
+def trace_entry(log):
+  return {
     'id': log.id,
     'event_type': log.event_type,
     'event_data': log.event_data,
     'timestamp': log.timestamp.isoformat(),
     'hash': log.hash_value
-  } for log in logs]
+  }
+
+@livestock_bp.route('/<int:livestock_id>/trace', methods=['GET'])
+@verify_firebase_token
+def trace_livestock(livestock_id):
+  livestock = Livestock.query.get_or_404(livestock_id)
+  if wants_ndjson(): return ndjson_response(iter_trace_logs(livestock_id), trace_entry)
+  trace_data = [trace_entry(log) for log in iter_trace_logs(livestock_id)]
 
   return jsonify({
     'livestock_id': livestock.id,
     'rfid_tag': livestock.rfid_tag,
     'species': livestock.species,
     'trace_log': trace_data
-  }), 200
\ No newline at end of file
+  }), 200
+
+@livestock_bp.route('/trace/verification', methods=['GET'])
+@verify_firebase_token
+@require_role('government')
+@require_profile_complete
+def trace_verification_runs():
+  official = g.principal.profile
+  if not official: return jsonify({'error': 'Government official profile not found'}), 400
+  state, district = official.jurisdiction_state, official.jurisdiction_district
+  if request.args.get('state', state) != state: return jsonify({'error': 'Unauthorized access'}), 403
+  if district and request.args.get('district', district) != district: return jsonify({'error': 'Unauthorized access'}), 403
+  district = district or request.args.get('district')
+  limit = min(request.args.get('limit', 10, type=int), 100)
+
+  runs = ChainVerificationRun.query.filter_by(state=state, district=district).order_by(ChainVerificationRun.started_at.desc()).limit(limit).all()
+  return jsonify({
+    'state': state,
+    'district': district,
+    'runs': [{
+      'id': r.id,
+      'status': r.status,
+      'animals_checked': r.animals_checked,
+      'logs_checked': r.logs_checked,
+      'legacy_logs': r.legacy_logs,
+      'broken_animals': r.broken_animals,
+      'broken_links': r.broken_links or [],
+      'error': r.error,
+      'started_at': r.started_at.isoformat(),
+      'finished_at': r.finished_at.isoformat() if r.finished_at else None
+    } for r in runs]
+  }), 200
+
+
+@livestock_bp.route('/trace/proof/<int:log_id>', methods=['GET'])
+@verify_firebase_token
+@require_profile_complete
+def trace_inclusion_proof(log_id):
+  log = find_log(log_id)
+  if log is None: return jsonify({'error': 'Log not found'}), 404
+  if g.principal.role == 'farmer':
+    livestock = db.session.get(Livestock, log.livestock_id)
+    if not g.principal.profile_id or livestock is None or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  try:
+    proof = build_inclusion_proof(log)
+  except ProofUnavailable as e: return jsonify({'error': str(e)}), e.status_code
+  return jsonify(proof), 200
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from extensions import db
 from models.user import User, Farmer, Veterinarian, GovernmentOfficial, Researcher
-from middlewares.auth import verify_firebase_token
+from middlewares.auth import verify_firebase_token, current_user
 from utils.encryption import encrypt_aadhaar
 
 onboarding_bp = Blueprint('onboarding', __name__, url_prefix='/api/onboarding')
@@ -10,7 +10,7 @@ onboarding_bp = Blueprint('onboarding', __name__, url_prefix='/api/onboarding')
 @verify_firebase_token
 def initial_profile():
   data = request.get_json()
-  if g.current_user:
+  if g.principal:
     return jsonify({'error': 'User profile already exists'}), 400
 
   name, role = data.get('name'), data.get('role')
@@ -52,14 +52,15 @@ def initial_profile():
 @onboarding_bp.route('/farmer', methods=['POST'])
 @verify_firebase_token
 def complete_farmer_profile():
-  if not g.current_user or g.current_user.role != 'farmer':
+  user = current_user()
+  if not user or user.role != 'farmer':
     return jsonify({'error': 'Invalid access'}), 403
-  if g.current_user.farmer:
+  if user.farmer:
     return jsonify({'error': 'Farmer profile already exists'}), 400
 
   data = request.get_json()
   farmer = Farmer(
-    user_id=g.current_user.id,
+    user_id=user.id,
     farm_name=data.get('farm_name'),
     farm_address=data.get('farm_address'),
     region=data.get('region'),
@@ -72,22 +73,23 @@ def complete_farmer_profile():
     farm_size_acres=data.get('farm_size_acres'),
     farm_type=data.get('farm_type')
   )
-  g.current_user.onboarding_step = 2
+  user.onboarding_step = 2
   db.session.add(farmer)
   db.session.commit()
 
   return jsonify({
     'message': 'Farmer profile created',
     'farmer_id': farmer.id,
-    'onboarding_step': g.current_user.onboarding_step
+    'onboarding_step': user.onboarding_step
   }), 201
 
 @onboarding_bp.route('/veterinary', methods=['POST'])
 @verify_firebase_token
 def complete_veterinary_profile():
-  if not g.current_user or g.current_user.role != 'veterinary':
+  user = current_user()
+  if not user or user.role != 'veterinary':
     return jsonify({'error': 'Invalid access'}), 403
-  if g.current_user.veterinarian:
+  if user.veterinarian:
     return jsonify({'error': 'Veterinary profile already exists'}), 400
 
   data = request.get_json()
@@ -95,7 +97,7 @@ def complete_veterinary_profile():
     return jsonify({'error': 'License number is required'}), 400
 
   veterinarian = Veterinarian(
-    user_id=g.current_user.id,
+    user_id=user.id,
     license_number=data.get('license_number'),
     specialization=data.get('specialization'),
     qualification=data.get('qualification'),
@@ -110,8 +112,8 @@ def complete_veterinary_profile():
     consultation_fee=data.get('consultation_fee'),
     available_for_emergency=data.get('available_for_emergency', True)
   )
-  g.current_user.is_profile_complete = True
-  g.current_user.onboarding_step = 3
+  user.is_profile_complete = True
+  user.onboarding_step = 3
   db.session.add(veterinarian)
   db.session.commit()
 
@@ -124,9 +126,10 @@ def complete_veterinary_profile():
 @onboarding_bp.route('/government', methods=['POST'])
 @verify_firebase_token
 def complete_government_profile():
-  if not g.current_user or g.current_user.role != 'government':
+  user = current_user()
+  if not user or user.role != 'government':
     return jsonify({'error': 'Invalid access'}), 403
-  if g.current_user.government_official:
+  if user.government_official:
     return jsonify({'error': 'Government profile already exists'}), 400
 
   data = request.get_json()
@@ -134,7 +137,7 @@ def complete_government_profile():
     return jsonify({'error': 'Government ID and department name are required'}), 400
 
   gov_official = GovernmentOfficial(
-    user_id=g.current_user.id,
+    user_id=user.id,
     government_id=data.get('government_id'),
     department_name=data.get('department_name'),
     department_id=data.get('department_id'),
@@ -144,8 +147,8 @@ def complete_government_profile():
     jurisdiction_regions=data.get('jurisdiction_regions'),
     office_address=data.get('office_address')
   )
-  g.current_user.is_profile_complete = True
-  g.current_user.onboarding_step = 3
+  user.is_profile_complete = True
+  user.onboarding_step = 3
   db.session.add(gov_official)
   db.session.commit()
 
@@ -158,9 +161,10 @@ def complete_government_profile():
 @onboarding_bp.route('/researcher', methods=['POST'])
 @verify_firebase_token
 def complete_researcher_profile():
-  if not g.current_user or g.current_user.role != 'researcher':
+  user = current_user()
+  if not user or user.role != 'researcher':
     return jsonify({'error': 'Invalid access'}), 403
-  if g.current_user.researcher:
+  if user.researcher:
     return jsonify({'error': 'Researcher profile already exists'}), 400
 
   data = request.get_json()
@@ -168,15 +172,15 @@ def complete_researcher_profile():
     return jsonify({'error': 'Institution name and project name are required'}), 400
 
   researcher = Researcher(
-    user_id=g.current_user.id,
+    user_id=user.id,
     institution_name=data.get('institution_name'),
     institution_type=data.get('institution_type'),
     role_designation=data.get('role_designation'),
     project_name=data.get('project_name'),
     research_area=data.get('research_area')
   )
-  g.current_user.is_profile_complete = True
-  g.current_user.onboarding_step = 3
+  user.is_profile_complete = True
+  user.onboarding_step = 3
   db.session.add(researcher)
   db.session.commit()
 
@@ -189,20 +193,22 @@ def complete_researcher_profile():
 @onboarding_bp.route('/complete-livestock', methods=['POST'])
 @verify_firebase_token
 def complete_farmer_onboarding():
-  if not g.current_user or g.current_user.role != 'farmer':
+  user = current_user()
+  if not user or user.role != 'farmer':
     return jsonify({'error': 'Invalid access'}), 403
-  if not g.current_user.farmer:
+  if not user.farmer:
     return jsonify({'error': 'Complete farmer profile first'}), 400
 
-  g.current_user.is_profile_complete = True
-  g.current_user.onboarding_step = 3
+  user.is_profile_complete = True
+  user.onboarding_step = 3
   db.session.commit()
   return jsonify({'message': 'Onboarding completed'}), 200
 
 @onboarding_bp.route('/status', methods=['GET'])
 @verify_firebase_token
 def onboarding_status():
-  if not g.current_user:
+  principal = g.principal
+  if not principal:
     return jsonify({
       'is_profile_complete': False,
       'onboarding_step': 0,
@@ -210,8 +216,8 @@ def onboarding_status():
     }), 200
 
   return jsonify({
-    'is_profile_complete': g.current_user.is_profile_complete,
-    'onboarding_step': g.current_user.onboarding_step,
-    'role': g.current_user.role,
-    'user_id': g.current_user.id
+    'is_profile_complete': principal.is_profile_complete,
+    'onboarding_step': principal.onboarding_step,
+    'role': principal.role,
+    'user_id': principal.user_id
   }), 200
\ No newline at end of file
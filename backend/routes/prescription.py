@@ -2,11 +2,14 @@ from flask import Blueprint, request, jsonify, g
 from extensions import db
 from models.livestock import Livestock
 from models.amu import AntimicrobialRecord, Prescription
-from models.requests import Alert, TraceabilityLog
 from models.user import Farmer
 from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
+from utils.helpers import create_traceability_log
+from services.alert_pipeline import alert_candidate, raise_alerts
+from utils.streaming import wants_ndjson, ndjson_response
+from utils.pagination import paginate_request
 from datetime import datetime, timezone
-import random, string, hashlib, json
+import random, string
 
 prescription_bp = Blueprint('prescription', __name__, url_prefix='/api/prescription')
 
@@ -16,21 +19,13 @@ def generate_prescription_number():
   random_suffix = ''.join(random.choices(string.digits, k=6))
   return f"{prefix}{timestamp}{random_suffix}"
 
-def create_traceability_log(livestock_id, event_type, event_data):
-  last_log = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc()).first()
-  previous_hash = last_log.hash_value if last_log else "0"
-  hash_data = {'livestock_id': livestock_id, 'event_type': event_type, 'event_data': event_data, 'timestamp': datetime.now(timezone.utc).isoformat(), 'previous_hash': previous_hash}
-  current_hash = hashlib.sha256(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
-  log = TraceabilityLog(livestock_id=livestock_id, event_type=event_type, event_data=event_data, performed_by=g.current_user.id, hash_value=current_hash, previous_hash=previous_hash, ip_address=request.remote_addr)
-  db.session.add(log)
-
 @prescription_bp.route('/create', methods=['POST'])
 @verify_firebase_token
 @require_role('veterinary')
 @require_profile_complete
 def create_prescription():
-  vet = g.current_user.veterinarian
-  if not vet: return jsonify({'error': 'Veterinary profile not found'}), 400
+  vet_id = g.principal.profile_id
+  if not vet_id: return jsonify({'error': 'Veterinary profile not found'}), 400
 
   data = request.get_json()
   livestock_id = data.get('livestock_id')  
@@ -41,7 +36,7 @@ def create_prescription():
   prescription_number = generate_prescription_number()
 
   prescription = Prescription(
-    veterinarian_id=vet.id,
+    veterinarian_id=vet_id,
     farmer_id=farmer.id,
     livestock_id=livestock_id,
     prescription_number=prescription_number,
@@ -55,9 +50,12 @@ def create_prescription():
 
   db.session.add(prescription)
   db.session.flush()  
-  create_traceability_log(livestock_id, 'prescription_created', {'prescription_number': prescription_number, 'diagnosis': data.get('diagnosis'), 'veterinarian_id': vet.id})  
-  alert = Alert(livestock_id=livestock_id, farmer_id=farmer.id, veterinarian_id=vet.id, alert_type='prescription_expired', severity='low', title='New Prescription Created', message=f'Prescription {prescription_number} created by Dr. {g.current_user.name}', metadata={'prescription_id': prescription.id})
-  db.session.add(alert)
+  create_traceability_log(livestock_id, 'prescription_created', {'prescription_number': prescription_number, 'diagnosis': data.get('diagnosis'), 'veterinarian_id': vet_id})  
+  raise_alerts([alert_candidate(
+    'prescription_expired', 'low', farmer.id, livestock_id, 'New Prescription Created', f'Prescription {prescription_number} created by Dr. {g.principal.user.name}',
+    veterinarian_id=vet_id, group=livestock.species,
+    metadata={'prescription_ids': [prescription.id], 'prescription_numbers': [prescription_number], 'veterinarian_name': g.principal.user.name}
+  )])
   db.session.commit()
 
   return jsonify({'message': 'Prescription created successfully', 'prescription_id': prescription.id, 'prescription_number': prescription_number}), 201
@@ -68,10 +66,10 @@ def create_prescription():
 def get_prescription(prescription_id):
   prescription = Prescription.query.get_or_404(prescription_id)
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or prescription.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or prescription.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or prescription.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or prescription.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
   livestock = Livestock.query.get(prescription.livestock_id)
   
   return jsonify({
@@ -91,20 +89,17 @@ def get_prescription(prescription_id):
 @verify_firebase_token
 @require_profile_complete
 def list_prescriptions():
-  page = request.args.get('page', 1, type=int)
-  per_page = request.args.get('per_page', 20, type=int)
   status = request.args.get('status')
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer: return jsonify({'error': 'Farmer profile not found'}), 400
-    query = Prescription.query.filter_by(farmer_id=g.current_user.farmer.id)
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian: return jsonify({'error': 'Veterinary profile not found'}), 400
-    query = Prescription.query.filter_by(veterinarian_id=g.current_user.veterinarian.id)
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id: return jsonify({'error': 'Farmer profile not found'}), 400
+    query = Prescription.query.filter_by(farmer_id=g.principal.profile_id)
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id: return jsonify({'error': 'Veterinary profile not found'}), 400
+    query = Prescription.query.filter_by(veterinarian_id=g.principal.profile_id)
   else: return jsonify({'error': 'Unauthorized access'}), 403
   if status: query = query.filter_by(status=status)
-  query = query.order_by(Prescription.prescription_date.desc())
-  pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+  items, page_info = paginate_request(query, 'prescriptions', Prescription.prescription_date, Prescription.id)
 
   prescriptions = [{
     'id': p.id,
@@ -114,9 +109,9 @@ def list_prescriptions():
     'diagnosis': p.diagnosis,
     'status': p.status,
     'follow_up_date': p.follow_up_date.isoformat() if p.follow_up_date else None
-  } for p in pagination.items]
+  } for p in items]
 
-  return jsonify({'prescriptions': prescriptions, 'total': pagination.total, 'page': pagination.page, 'pages': pagination.pages}), 200
+  return jsonify({'prescriptions': prescriptions, **page_info}), 200
 
 @prescription_bp.route('/<int:prescription_id>/update-status', methods=['PUT'])
 @verify_firebase_token
@@ -125,7 +120,7 @@ def list_prescriptions():
 def update_prescription_status(prescription_id):
   prescription = Prescription.query.get_or_404(prescription_id)
 
-  if prescription.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403  
+  if prescription.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403  
   data = request.get_json()
   new_status = data.get('status')
 
@@ -134,19 +129,8 @@ def update_prescription_status(prescription_id):
   db.session.commit()
   return jsonify({'message': 'Prescription status updated', 'status': prescription.status}), 200
 
-@prescription_bp.route('/<int:prescription_id>/amu-records', methods=['GET'])
-@verify_firebase_token
-@require_profile_complete
-def get_prescription_amu_records(prescription_id):
-  prescription = Prescription.query.get_or_404(prescription_id)
-
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or prescription.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403
-  elif g.current_user.role == 'veterinary':
-    if not g.current_user.veterinarian or prescription.veterinarian_id != g.current_user.veterinarian.id: return jsonify({'error': 'Unauthorized access'}), 403
-
-  amu_records = AntimicrobialRecord.query.filter_by(prescription_id=prescription_id).order_by(AntimicrobialRecord.start_date.desc()).all()  
-  records = [{
+def prescription_amu_entry(r):
+  return {
     'id': r.id,
     'drug_name': r.drug_name,
     'dosage': r.dosage,
@@ -154,25 +138,44 @@ def get_prescription_amu_records(prescription_id):
     'start_date': r.start_date.isoformat(),
     'duration_days': r.duration_days,
     'is_verified': r.is_verified
-  } for r in amu_records]
-  return jsonify({'prescription_id': prescription_id, 'amu_records': records, 'total': len(records)}), 200
+  }
 
-@prescription_bp.route('/livestock/<int:livestock_id>', methods=['GET'])
+@prescription_bp.route('/<int:prescription_id>/amu-records', methods=['GET'])
 @verify_firebase_token
 @require_profile_complete
-def get_livestock_prescriptions(livestock_id):
-  livestock = Livestock.query.get_or_404(livestock_id)
+def get_prescription_amu_records(prescription_id):
+  prescription = Prescription.query.get_or_404(prescription_id)
+
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or prescription.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
+  elif g.principal.role == 'veterinary':
+    if not g.principal.profile_id or prescription.veterinarian_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403
 
-  if g.current_user.role == 'farmer':
-    if not g.current_user.farmer or livestock.farmer_id != g.current_user.farmer.id: return jsonify({'error': 'Unauthorized access'}), 403  
-  prescriptions = Prescription.query.filter_by(livestock_id=livestock_id).order_by(Prescription.prescription_date.desc()).all()
-  prescription_list = [{
+  amu_records = AntimicrobialRecord.query.filter_by(prescription_id=prescription_id).order_by(AntimicrobialRecord.start_date.desc())
+  if wants_ndjson(): return ndjson_response(amu_records, prescription_amu_entry)
+  records = [prescription_amu_entry(r) for r in amu_records.all()]
+  return jsonify({'prescription_id': prescription_id, 'amu_records': records, 'total': len(records)}), 200
+
+def livestock_prescription_entry(p):
+  return {
     'id': p.id,
     'prescription_number': p.prescription_number,
     'prescription_date': p.prescription_date.isoformat(),
     'diagnosis': p.diagnosis,
     'status': p.status,
     'drugs_count': len(p.drugs_prescribed) if isinstance(p.drugs_prescribed, list) else 0
-  } for p in prescriptions]
+  }
+
+@prescription_bp.route('/livestock/<int:livestock_id>', methods=['GET'])
+@verify_firebase_token
+@require_profile_complete
+def get_livestock_prescriptions(livestock_id):
+  livestock = Livestock.query.get_or_404(livestock_id)
+
+  if g.principal.role == 'farmer':
+    if not g.principal.profile_id or livestock.farmer_id != g.principal.profile_id: return jsonify({'error': 'Unauthorized access'}), 403  
+  prescriptions = Prescription.query.filter_by(livestock_id=livestock_id).order_by(Prescription.prescription_date.desc())
+  if wants_ndjson(): return ndjson_response(prescriptions, livestock_prescription_entry)
+  prescription_list = [livestock_prescription_entry(p) for p in prescriptions.all()]
 
   return jsonify({'livestock_id': livestock_id, 'rfid_tag': livestock.rfid_tag, 'prescriptions': prescription_list, 'total': len(prescription_list)}), 200
\ No newline at end of file
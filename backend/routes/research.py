@@ -0,0 +1,148 @@
+from flask import Blueprint, request, jsonify, g, current_app
+from extensions import db, export_store
+from models.analytics import DataRequest, DataRequestJob
+from middlewares.auth import verify_firebase_token, require_role, require_profile_complete
+from services.amu_metrics import SPECIES
+from services.dataset_export import EXPORT_FORMATS, parquet_available
+from services.data_fulfilment import artifact_filename, job_progress, anonymised_export
+from utils.streaming import attachment_response
+from utils.pagination import paginate_request
+from datetime import datetime, timezone
+
+research_bp = Blueprint('research', __name__, url_prefix='/api/research')
+
+def data_request_entry(data_request, job=None):
+  return {
+    'id': data_request.id,
+    'researcher_id': data_request.researcher_id,
+    'title': data_request.request_title,
+    'description': data_request.request_description,
+    'data_type_requested': data_request.data_type_requested,
+    'regions_requested': data_request.regions_requested,
+    'species_requested': data_request.species_requested,
+    'date_range_start': data_request.date_range_start.isoformat() if data_request.date_range_start else None,
+    'date_range_end': data_request.date_range_end.isoformat() if data_request.date_range_end else None,
+    'justification': data_request.justification,
+    'status': data_request.status,
+    'review_notes': data_request.review_notes,
+    'approved_at': data_request.approved_at.isoformat() if data_request.approved_at else None,
+    'data_access_url': data_request.data_access_url,
+    'created_at': data_request.created_at.isoformat() if data_request.created_at else None,
+    'fulfilment': job_progress(job)
+  }
+
+def visible_request(request_id):
+  data_request = db.session.get(DataRequest, request_id)
+  if not data_request: return None, (jsonify({'error': 'Data request not found'}), 404)
+  if g.principal.role == 'researcher':
+    if not g.principal.profile_id or data_request.researcher_id != g.principal.profile_id: return None, (jsonify({'error': 'Data request not found'}), 404)
+  return data_request, None
+
+@research_bp.route('/data-requests', methods=['POST'])
+@verify_firebase_token
+@require_role('researcher')
+@require_profile_complete
+def create_data_request():
+  researcher_id = g.principal.profile_id
+  if not researcher_id: return jsonify({'error': 'Researcher profile not found'}), 400
+
+  data = request.get_json() or {}
+  if not data.get('request_title'): return jsonify({'error': 'request_title is required'}), 400
+  species = data.get('species_requested') or []
+  regions = data.get('regions_requested') or []
+  if not isinstance(species, list) or any(s not in SPECIES for s in species): return jsonify({'error': f'species_requested must be a list of: {", ".join(SPECIES)}'}), 400
+  if not isinstance(regions, list) or not all(isinstance(r, str) for r in regions): return jsonify({'error': 'regions_requested must be a list of state or district names'}), 400
+  try:
+    date_range_start = datetime.strptime(data['date_range_start'], '%Y-%m-%d').date() if data.get('date_range_start') else None
+    date_range_end = datetime.strptime(data['date_range_end'], '%Y-%m-%d').date() if data.get('date_range_end') else None
+  except ValueError: return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+  if date_range_start and date_range_end and date_range_start > date_range_end: return jsonify({'error': 'date_range_start must be on or before date_range_end'}), 400
+
+  data_request = DataRequest(
+    researcher_id=researcher_id,
+    request_title=data['request_title'],
+    request_description=data.get('request_description'),
+    data_type_requested=data.get('data_type_requested'),
+    regions_requested=regions,
+    species_requested=species,
+    date_range_start=date_range_start,
+    date_range_end=date_range_end,
+    justification=data.get('justification')
+  )
+  db.session.add(data_request)
+  db.session.commit()
+  return jsonify({'message': 'Data request submitted', 'data_request_id': data_request.id, 'status': data_request.status}), 201
+
+@research_bp.route('/data-requests', methods=['GET'])
+@verify_firebase_token
+@require_role('researcher', 'government')
+@require_profile_complete
+def list_data_requests():
+  status = request.args.get('status')
+
+  query = DataRequest.query
+  if g.principal.role == 'researcher':
+    if not g.principal.profile_id: return jsonify({'error': 'Researcher profile not found'}), 400
+    query = query.filter_by(researcher_id=g.principal.profile_id)
+  if status: query = query.filter_by(status=status)
+
+  items, page_info = paginate_request(query, 'data_requests', DataRequest.created_at, DataRequest.id)
+  jobs = {job.data_request_id: job for job in DataRequestJob.query.filter(DataRequestJob.data_request_id.in_([r.id for r in items])).all()} if items else {}
+  return jsonify({'data_requests': [data_request_entry(r, jobs.get(r.id)) for r in items], **page_info}), 200
+
+@research_bp.route('/data-requests/<int:request_id>', methods=['GET'])
+@verify_firebase_token
+@require_role('researcher', 'government')
+@require_profile_complete
+def get_data_request(request_id):
+  data_request, error = visible_request(request_id)
+  if error: return error
+  return jsonify(data_request_entry(data_request, DataRequestJob.query.filter_by(data_request_id=data_request.id).first())), 200
+
+@research_bp.route('/data-requests/<int:request_id>/review', methods=['PUT'])
+@verify_firebase_token
+@require_role('government')
+@require_profile_complete
+def review_data_request(request_id):
+  data_request = db.session.get(DataRequest, request_id)
+  if not data_request: return jsonify({'error': 'Data request not found'}), 404
+  if data_request.status != 'pending': return jsonify({'error': f'Data request is already {data_request.status}'}), 409
+
+  data = request.get_json() or {}
+  decision = data.get('decision')
+  if decision not in ('approved', 'rejected'): return jsonify({'error': 'decision must be approved or rejected'}), 400
+
+  data_request.status, data_request.reviewed_by, data_request.review_notes = decision, g.principal.user_id, data.get('review_notes')
+  if decision == 'approved': data_request.approved_at = datetime.now(timezone.utc)
+  db.session.commit()
+  return jsonify({'message': f'Data request {decision}', 'status': data_request.status}), 200
+
+@research_bp.route('/data-requests/<int:request_id>/download', methods=['GET'])
+@verify_firebase_token
+@require_role('researcher', 'government')
+@require_profile_complete
+def download_data_request(request_id):
+  data_request, error = visible_request(request_id)
+  if error: return error
+  job = DataRequestJob.query.filter_by(data_request_id=data_request.id, status='completed').first()
+  if data_request.status != 'fulfilled' or not job: return jsonify({'error': 'Data request has not been fulfilled yet'}), 409
+  return export_store.download(job.artifact_key, artifact_filename(data_request.id, job.export_format), EXPORT_FORMATS[job.export_format][0])
+
+@research_bp.route('/data-requests/<int:request_id>/export', methods=['GET'])
+@verify_firebase_token
+@require_role('researcher')
+@require_profile_complete
+def export_data_request(request_id):
+  researcher_id = g.principal.profile_id
+  if not researcher_id: return jsonify({'error': 'Researcher profile not found'}), 400
+
+  data_request = DataRequest.query.filter_by(id=request_id, researcher_id=researcher_id).first()
+  if not data_request: return jsonify({'error': 'Data request not found'}), 404
+  if data_request.status not in ('approved', 'fulfilled'): return jsonify({'error': 'Data request has not been approved'}), 403
+
+  export_format = request.args.get('format', 'csv').lower()
+  if export_format not in EXPORT_FORMATS: return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+  if export_format == 'parquet' and not parquet_available(): return jsonify({'error': 'Parquet export is not available on this server'}), 501
+  if not current_app.config.get('DATA_PSEUDONYM_KEY'): return jsonify({'error': 'Data exports are not configured on this server'}), 503
+
+  return attachment_response(anonymised_export(data_request, export_format), EXPORT_FORMATS[export_format][0], artifact_filename(data_request.id, export_format))
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from flask import current_app
+from sqlalchemy import insert, select
+from extensions import db
+from models.requests import Alert, AlertFingerprintLock
+from services.withdrawal_periods import normalize_drug
+from services.counters import count_inserted
+from services.alert_stream import announce_inserted, announce_updated
+from utils.upsert import insert_ignore
+
+OPEN_STATUSES = ('unread', 'read')
+SUM_FIELDS = ('occurrences',)
+MIN_FIELDS = ('first_seen_at',)
+MAX_FIELDS = ('last_seen_at', 'withdrawal_end_date', 'withdrawal_days', 'usage_count')
+
+def _animals(metadata):
+  count = len(metadata.get('livestock_ids') or ())
+  return f' for {count} animals' if count > 1 else ''
+
+def _withdrawal_summary(metadata):
+  dates = sorted(set((metadata.get('withdrawal_by_livestock') or {}).values())) or [metadata['withdrawal_end_date']]
+  ends = f'period ends on {dates[0]}' if len(dates) == 1 else f'periods end between {dates[0]} and {dates[-1]}'
+  return f'Withdrawal {ends}{_animals(metadata)}. Do not sell products until then.'
+
+def _merge_maps(maps):
+  merged = {}
+  for mapping in maps:
+    for key, value in mapping.items(): merged[key] = value if merged.get(key) is None else max(merged[key], value)
+  return merged
+
+ALERT_SUMMARIES = {
+  'withdrawal_period': _withdrawal_summary,
+  'excessive_use': lambda m: f'The drug {m["drug_name"]} has been used {m["threshold"]} or more times in the last {m["window_days"]} days{_animals(m)}' if _animals(m) else None,
+  'prescription_expired': lambda m: f'{len(m["prescription_ids"])} prescriptions created by Dr. {m["veterinarian_name"]}' if len(m.get('prescription_ids') or ()) > 1 else None
+}
+
+def alert_fingerprint(alert_type, farmer_id, veterinarian_id=None, drug_name=None, group=None):
+  parts = (alert_type, farmer_id, veterinarian_id, normalize_drug(drug_name) if drug_name else None, group)
+  return hashlib.sha256('\x1f'.join('' if part is None else str(part) for part in parts).encode()).hexdigest()
+
+def alert_candidate(alert_type, severity, farmer_id, livestock_id, title, message, veterinarian_id=None, drug_name=None, group=None, metadata=None):
+  return {
+    'livestock_id': livestock_id, 'farmer_id': farmer_id, 'veterinarian_id': veterinarian_id,
+    'alert_type': alert_type, 'severity': severity, 'status': 'unread', 'title': title, 'message': message,
+    'fingerprint': alert_fingerprint(alert_type, farmer_id, veterinarian_id, drug_name, group),
+    'alert_metadata': {**(metadata or {}), 'livestock_ids': [livestock_id] if livestock_id else [], 'occurrences': 1}
+  }
+
+def combine_metadata(items):
+  merged = {}
+  for key in dict.fromkeys(chain.from_iterable(items)):
+    values = [item[key] for item in items if item.get(key) is not None]
+    if not values: merged[key] = None
+    elif key in SUM_FIELDS: merged[key] = sum(values)
+    elif key in MIN_FIELDS: merged[key] = min(values)
+    elif key in MAX_FIELDS: merged[key] = max(values)
+    elif isinstance(values[0], list): merged[key] = sorted(set(chain.from_iterable(values)))
+    elif isinstance(values[0], dict): merged[key] = _merge_maps(values)
+    else: merged[key] = values[-1]
+  if merged.get('withdrawal_by_livestock'): merged['withdrawal_end_date'] = max(filter(None, (merged.get('withdrawal_end_date'), *merged['withdrawal_by_livestock'].values())))
+  return merged
+
+def summarize(alert_type, metadata, message):
+  summary = ALERT_SUMMARIES.get(alert_type)
+  return (summary(metadata) if summary else None) or message
+
+def coalesce_candidates(candidates, now):
+  stamp = now.replace(tzinfo=None).isoformat()
+  groups = {}
+  for candidate in candidates: groups.setdefault(candidate['fingerprint'], []).append(candidate)
+  coalesced = {}
+  for fingerprint, group in groups.items():
+    metadata = combine_metadata([{**candidate['alert_metadata'], 'first_seen_at': stamp, 'last_seen_at': stamp} for candidate in group])
+    coalesced[fingerprint] = {**group[0], 'alert_metadata': metadata, 'message': summarize(group[0]['alert_type'], metadata, group[-1]['message'])}
+  return coalesced
+
+def lock_fingerprints(fingerprints):
+  # Row locks serialise raises of the same fingerprint, including the first one when no open alert exists yet to lock.
+  fingerprints = sorted(fingerprints)
+  insert_ignore(AlertFingerprintLock.__table__, [{'fingerprint': fingerprint} for fingerprint in fingerprints], ('fingerprint',))
+  db.session.execute(select(AlertFingerprintLock.fingerprint).where(AlertFingerprintLock.fingerprint.in_(fingerprints)).order_by(AlertFingerprintLock.fingerprint).with_for_update()).all()
+
+def raise_alerts(candidates, now=None):
+  now = now or datetime.now(timezone.utc)
+  coalesced = coalesce_candidates(candidates, now)
+  if not coalesced: return 0, 0
+  lock_fingerprints(coalesced)
+  since = now - timedelta(hours=current_app.config.get('ALERT_COALESCE_WINDOW_HOURS', 24))
+  open_alerts = Alert.query.filter(Alert.fingerprint.in_(list(coalesced)), Alert.status.in_(OPEN_STATUSES), Alert.created_at >= since).order_by(Alert.id).with_for_update().all()
+  existing = {alert.fingerprint: alert for alert in open_alerts}
+
+  for fingerprint, alert in existing.items():
+    candidate = coalesced[fingerprint]
+    alert.alert_metadata = combine_metadata([alert.alert_metadata or {}, candidate['alert_metadata']])
+    alert.message = summarize(alert.alert_type, alert.alert_metadata, candidate['message'])
+    alert.status = 'unread'
+  announce_updated(existing.values())
+  rows = [{**candidate, 'created_at': now} for fingerprint, candidate in coalesced.items() if fingerprint not in existing]
+  if rows:
+    db.session.execute(insert(Alert), rows)
+    count_inserted(Alert, rows)
+    announce_inserted(rows)
+  return len(rows), len(existing)
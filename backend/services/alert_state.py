@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import select, update
+from extensions import db
+from models.requests import Alert
+from services.counters import count_status_change
+
+ALERTS = Alert.__table__
+OWNER_COLUMNS = {'farmer': ALERTS.c.farmer_id, 'veterinarian': ALERTS.c.veterinarian_id}
+ALERT_TRANSITIONS = {
+  'acknowledge': ('acknowledged', ('unread', 'read'), 'acknowledged_at'),
+  'resolve': ('resolved', ('unread', 'read', 'acknowledged'), 'resolved_at'),
+  'mark_read': ('read', ('unread',), None)
+}
+RETURNED_COLUMNS = (ALERTS.c.id, ALERTS.c.farmer_id, ALERTS.c.veterinarian_id, ALERTS.c.severity, ALERTS.c.alert_type)
+# Counters need each row's previous status. Only PostgreSQL can return it from the UPDATE itself (RETURNING over an
+# UPDATE ... FROM); SQLite's RETURNING cannot reference FROM tables and MySQL has no UPDATE ... RETURNING.
+RETURNING_DIALECTS = ('postgresql',)
+
+def _choice(column, value):
+  if not isinstance(value, str) or value not in column.type.enums: raise ValueError(f'Invalid {column.name}: {value}')
+  return column == value
+
+def _livestock_id(value):
+  if isinstance(value, bool) or not (isinstance(value, int) or (isinstance(value, str) and value.isdigit())): raise ValueError('livestock_id must be an integer')
+  return int(value)
+
+def _date(value):
+  try: return datetime.strptime(value, '%Y-%m-%d')
+  except (TypeError, ValueError): raise ValueError('created_before must use YYYY-MM-DD') from None
+
+def alert_filters(filters):
+  conditions = []
+  if filters.get('type'): conditions.append(_choice(ALERTS.c.alert_type, filters['type']))
+  if filters.get('severity'): conditions.append(_choice(ALERTS.c.severity, filters['severity']))
+  if filters.get('livestock_id'): conditions.append(ALERTS.c.livestock_id == _livestock_id(filters['livestock_id']))
+  if filters.get('created_before'): conditions.append(ALERTS.c.created_at < _date(filters['created_before']))
+  if filters.get('status'): _choice(ALERTS.c.status, filters['status'])
+  return conditions
+
+def transition_alerts(action, owner_type, owner_id, alert_ids=None, conditions=(), status=None):
+  target, sources, stamp = ALERT_TRANSITIONS[action]
+  if status: sources = tuple(source for source in sources if source == status)
+  if not sources: return []
+  values = {'status': target}
+  if stamp: values[stamp] = datetime.now(timezone.utc)
+  scope = [OWNER_COLUMNS[owner_type] == owner_id, ALERTS.c.status.in_(sources), *conditions]
+  if alert_ids is not None: scope.append(ALERTS.c.id.in_(alert_ids))
+
+  if db.session.get_bind().dialect.name in RETURNING_DIALECTS:
+    locked = select(ALERTS.c.id, ALERTS.c.status).where(*scope).order_by(ALERTS.c.id).with_for_update().subquery()
+    rows = db.session.execute(update(ALERTS).where(ALERTS.c.id == locked.c.id).values(**values).returning(*RETURNED_COLUMNS, locked.c.status)).all()
+  else:
+    rows = db.session.execute(select(*RETURNED_COLUMNS, ALERTS.c.status).where(*scope).order_by(ALERTS.c.id).with_for_update()).all()
+    if rows: db.session.execute(update(ALERTS).where(ALERTS.c.id.in_([row[0] for row in rows])).values(**values))
+  if not rows: return []
+  for previous, group in groupby(sorted(rows, key=itemgetter(5)), key=itemgetter(5)):
+    count_status_change([row[1:5] for row in group], previous, target)
+  return sorted(row[0] for row in rows)
@@ -0,0 +1,183 @@
+import json, threading, time
+from urllib.parse import urlparse
+from flask import current_app
+from sqlalchemy import event, select, func
+from extensions import db, alert_broker
+from models.requests import Alert
+from utils.streaming import sse_event
+from utils.log import get_logger
+
+logger = get_logger('alerts.stream')
+OWNER_COLUMNS = {'farmer': Alert.farmer_id, 'veterinarian': Alert.veterinarian_id}
+
+def alert_channel(owner_type, owner_id):
+  return f'alerts:{owner_type}:{owner_id}'
+
+def alert_channels(farmer_id, veterinarian_id):
+  return [alert_channel(owner_type, owner_id) for owner_type, owner_id in (('farmer', farmer_id), ('veterinarian', veterinarian_id)) if owner_id]
+
+class MemorySubscription:
+  def __init__(self, broker, channels):
+    self.broker = broker
+    self.channels = channels
+    self._event = threading.Event()
+    self._lock = threading.Lock()
+    self._updated = set()
+
+  def notify(self, alert_ids):
+    with self._lock: self._updated.update(alert_ids)
+    self._event.set()
+
+  def wait(self, timeout):
+    if not self._event.wait(timeout): return None
+    with self._lock:
+      self._event.clear()
+      updated, self._updated = self._updated, set()
+    return updated
+
+  def close(self):
+    self.broker.unsubscribe(self)
+
+class MemoryBroker:
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._subscriptions = {}
+
+  def subscribe(self, channels):
+    subscription = MemorySubscription(self, channels)
+    with self._lock:
+      for channel in channels: self._subscriptions.setdefault(channel, set()).add(subscription)
+    return subscription
+
+  def unsubscribe(self, subscription):
+    with self._lock:
+      for channel in subscription.channels:
+        subscribers = self._subscriptions.get(channel)
+        if subscribers is None: continue
+        subscribers.discard(subscription)
+        if not subscribers: del self._subscriptions[channel]
+
+  def publish(self, messages):
+    with self._lock: targets = [(subscription, alert_ids) for channel, alert_ids in messages.items() for subscription in self._subscriptions.get(channel, ())]
+    for subscription, alert_ids in targets: subscription.notify(alert_ids)
+
+class RedisSubscription:
+  def __init__(self, pubsub):
+    self.pubsub = pubsub
+
+  def wait(self, timeout):
+    message = self.pubsub.get_message(timeout=timeout)
+    if message is None: return None
+    updated = set()
+    while message is not None:
+      updated.update(json.loads(message['data']))
+      message = self.pubsub.get_message(timeout=0)
+    return updated
+
+  def close(self):
+    self.pubsub.close()
+
+class RedisBroker:
+  def __init__(self, url):
+    try: import redis
+    except ImportError: raise RuntimeError('ALERT_BROKER_URL=redis://... requires redis (pip install redis)') from None
+    self.client = redis.Redis.from_url(url)
+
+  def subscribe(self, channels):
+    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(*channels)
+    return RedisSubscription(pubsub)
+
+  def publish(self, messages):
+    with self.client.pipeline(transaction=False) as pipe:
+      for channel, alert_ids in messages.items(): pipe.publish(channel, json.dumps(alert_ids))
+      pipe.execute()
+
+def create_alert_broker(config):
+  url = config.get('ALERT_BROKER_URL') or 'memory://'
+  scheme = urlparse(url).scheme
+  if scheme == 'memory': return MemoryBroker()
+  if scheme in ('redis', 'rediss'): return RedisBroker(url)
+  raise ValueError(f'Unsupported alert broker URL: {url}')
+
+def _pending(session):
+  return session.info.setdefault('alert_channels', {})
+
+def announce_inserted(rows):
+  pending = _pending(db.session)
+  for row in rows:
+    for channel in alert_channels(row.get('farmer_id'), row.get('veterinarian_id')): pending.setdefault(channel, set())
+
+def announce_updated(alerts):
+  pending = _pending(db.session)
+  for alert in alerts:
+    for channel in alert_channels(alert.farmer_id, alert.veterinarian_id): pending.setdefault(channel, set()).add(alert.id)
+
+def _collect(session, flush_context):
+  channels = [channel for obj in session.new if isinstance(obj, Alert) for channel in alert_channels(obj.farmer_id, obj.veterinarian_id)]
+  if not channels: return
+  pending = _pending(session)
+  for channel in channels: pending.setdefault(channel, set())
+
+def _publish(session):
+  pending = session.info.pop('alert_channels', None)
+  if not pending: return
+  try: alert_broker.publish({channel: sorted(alert_ids) for channel, alert_ids in sorted(pending.items())})
+  except Exception: logger.exception('Alert broadcast failed', extra={'fields': {'channels': len(pending)}})
+
+def _discard(session, previous_transaction):
+  session.info.pop('alert_channels', None)
+
+def init_alert_stream(app):
+  for name, listener in (('after_flush', _collect), ('after_commit', _publish), ('after_soft_rollback', _discard)):
+    if not event.contains(db.session, name, listener): event.listen(db.session, name, listener)
+
+def alert_entry(alert):
+  return {
+    'id': alert.id,
+    'alert_type': alert.alert_type,
+    'severity': alert.severity,
+    'title': alert.title,
+    'message': alert.message,
+    'status': alert.status,
+    'livestock_id': alert.livestock_id,
+    'metadata': alert.alert_metadata,
+    'created_at': alert.created_at.isoformat()
+  }
+
+def latest_alert_id(owner_type, owner_id):
+  return db.session.execute(select(func.coalesce(func.max(Alert.id), 0)).where(OWNER_COLUMNS[owner_type] == owner_id)).scalar()
+
+def _entries(query):
+  entries = [alert_entry(alert) for alert in query.all()]
+  db.session.close()
+  return entries
+
+def alerts_after(owner_type, owner_id, last_id, limit):
+  return _entries(Alert.query.filter(OWNER_COLUMNS[owner_type] == owner_id, Alert.id > last_id).order_by(Alert.id).limit(limit))
+
+def alerts_by_id(owner_type, owner_id, alert_ids):
+  return _entries(Alert.query.filter(OWNER_COLUMNS[owner_type] == owner_id, Alert.id.in_(alert_ids)).order_by(Alert.id))
+
+def stream_alerts(owner_type, owner_id, last_id=None):
+  config = current_app.config
+  heartbeat, batch = config.get('ALERT_STREAM_HEARTBEAT_SECONDS', 15), config.get('ALERT_STREAM_BATCH', 100)
+  deadline = time.monotonic() + config.get('ALERT_STREAM_MAX_SECONDS', 300)
+  subscription = alert_broker.subscribe([alert_channel(owner_type, owner_id)])
+  try:
+    if last_id is None: last_id = latest_alert_id(owner_type, owner_id)
+    yield f'retry: {config.get("ALERT_STREAM_RETRY_MS", 3000)}\nid: {last_id}\n\n'
+    updated = set()
+    while time.monotonic() < deadline:
+      changed = [alert_id for alert_id in updated if alert_id <= last_id]
+      for alert in (alerts_by_id(owner_type, owner_id, changed) if changed else ()): yield sse_event(alert, 'alert_updated')
+      alerts = alerts_after(owner_type, owner_id, last_id, batch)
+      for alert in alerts: yield sse_event(alert, 'alert', alert['id'])
+      if alerts: last_id = alerts[-1]['id']
+      updated = set()
+      if len(alerts) == batch: continue
+      while (updated := subscription.wait(max(min(heartbeat, deadline - time.monotonic()), 0))) is None:
+        if time.monotonic() >= deadline: return
+        yield ': heartbeat\n\n'
+  finally:
+    subscription.close()
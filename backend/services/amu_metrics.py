@@ -0,0 +1,154 @@
+import re
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, func
+from extensions import db
+from models.amu import AntimicrobialRecord
+from models.livestock import Livestock
+from models.user import Farmer
+
+SPECIES = ('cattle', 'buffalo', 'goat', 'sheep', 'pig', 'poultry')
+STANDARD_WEIGHTS = {'cattle': 425.0, 'buffalo': 425.0, 'goat': 20.0, 'sheep': 20.0, 'pig': 65.0, 'poultry': 1.0}
+MASS_UNITS = {'mcg': 0.001, 'ug': 0.001, 'µg': 0.001, 'mg': 1.0, 'g': 1000.0, 'gm': 1000.0, 'kg': 1000000.0}
+FREQUENCY_WORDS = (('qid', 4), ('tid', 3), ('thrice', 3), ('bid', 2), ('bd', 2), ('twice', 2), ('sid', 1), ('od', 1), ('once', 1), ('daily', 1))
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+METRIC_LEVELS = ('farm', 'district', 'species', 'national')
+
+def unit_factor(unit):
+  unit = (unit or '').strip().lower().replace(' ', '')
+  base, per_kg = (unit[:-3], True) if unit.endswith('/kg') else (unit, False)
+  return MASS_UNITS.get(base, np.nan), per_kg
+
+def parse_frequency(frequency):
+  text = (frequency or '').strip().lower()
+  if not text: return 1.0, False
+  if re.search(r'\b(single|stat|one[- ]time|once only)\b', text): return 1.0, True
+  hours = re.search(r'(?:every|q)\s*(\d+(?:\.\d+)?)\s*(?:h|hr|hrs|hours?)\b', text)
+  if hours and float(hours.group(1)) > 0: return 24.0 / float(hours.group(1)), False
+  if re.search(r'\b(weekly|once a week)\b', text): return 1.0 / 7, False
+  if re.search(r'\b(alternate|every other day|eod)\b', text): return 0.5, False
+  times = re.search(r'(\d+|one|two|three|four|five|six)\s*(?:x|times)\b', text)
+  if times: return float(NUMBER_WORDS.get(times.group(1)) or times.group(1)), False
+  for word, count in FREQUENCY_WORDS:
+    if re.search(rf'\b{word}\b', text): return float(count), False
+  return 1.0, False
+
+def administered_mg(dosage, factor, per_kg, weight, per_day, single, duration):
+  duration = np.where(np.isnan(duration) | (duration < 1), 1.0, duration)
+  administrations = np.where(single, 1.0, per_day * duration)
+  return dosage * factor * np.where(per_kg, weight, 1.0) * administrations
+
+def _factorize(values):
+  index = {}
+  codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+  return list(index), codes
+
+def _lookup(values, resolve):
+  uniques, inverse = _factorize(values)
+  resolved = [resolve(value) for value in uniques]
+  if resolved and isinstance(resolved[0], tuple): return tuple(np.array(column)[inverse] for column in zip(*resolved))
+  return np.array(resolved)[inverse]
+
+def _species_codes(values):
+  index = {name: i for i, name in enumerate(SPECIES)}
+  return _lookup(values, lambda name: index.get(name, -1))
+
+def standard_weights():
+  weights = {**STANDARD_WEIGHTS, **current_app.config.get('AMU_STANDARD_WEIGHTS', {})}
+  return np.array([float(weights[name]) for name in SPECIES])
+
+def ddd_matrix(ingredients):
+  table = current_app.config.get('AMU_DDDVET', {})
+  matrix = np.full((len(ingredients), len(SPECIES)), np.nan)
+  for i, ingredient in enumerate(ingredients):
+    doses = table.get(ingredient) or {}
+    for j, name in enumerate(SPECIES):
+      dose = doses.get(name, doses.get('*'))
+      if dose: matrix[i, j] = float(dose)
+  return matrix
+
+def _farm_index(farm_ids, farmer_ids):
+  farmer_ids = np.array(farmer_ids, dtype=np.int64)
+  farm = np.minimum(np.searchsorted(farm_ids, farmer_ids), len(farm_ids) - 1)
+  return farm, farm_ids[farm] == farmer_ids
+
+def _animal_weights(weight, species, standard):
+  weight = np.array(weight, dtype=float)
+  return np.where(np.isnan(weight) | (weight <= 0), standard[np.maximum(species, 0)], weight)
+
+def _chunks(stmt, size):
+  result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=size))
+  for partition in result.partitions(size): yield list(zip(*partition))
+
+def _scoped(stmt, district=None, state=None, farmer_id=None):
+  if farmer_id is not None: stmt = stmt.where(Farmer.id == farmer_id)
+  if district: stmt = stmt.where(Farmer.district == district)
+  if state: stmt = stmt.where(Farmer.state == state)
+  return stmt
+
+def compute_amu_metrics(level='district', days=365, district=None, state=None, farmer_id=None):
+  chunk = current_app.config.get('AMU_METRICS_CHUNK', 100000)
+  since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+  farms = db.session.execute(_scoped(select(Farmer.id, Farmer.state, Farmer.district), district, state, farmer_id).order_by(Farmer.id)).all()
+  farm_ids = np.array([farm[0] for farm in farms], dtype=np.int64)
+  shape = (len(farms), len(SPECIES))
+  totals = {name: np.zeros(shape) for name in ('animals', 'pcu_kg', 'records', 'mg', 'unconverted_records', 'ddd_vet', 'ddd_records')}
+
+  def accumulate(name, farm, species, weights=None):
+    totals[name] += np.bincount(farm * len(SPECIES) + species, weights=weights, minlength=totals[name].size).reshape(shape)
+
+  if len(farms):
+    weights = standard_weights()
+    population = _scoped(select(Livestock.farmer_id, Livestock.species, Livestock.weight_kg).join(Farmer, Farmer.id == Livestock.farmer_id).where(Livestock.is_active == True), district, state, farmer_id)
+    for farmer_ids, species_names, weight in _chunks(population, chunk):
+      (farm, known), species = _farm_index(farm_ids, farmer_ids), _species_codes(species_names)
+      weight, keep = _animal_weights(weight, species, weights), known & (species >= 0)
+      accumulate('animals', farm[keep], species[keep])
+      accumulate('pcu_kg', farm[keep], species[keep], weight[keep])
+
+    usage = _scoped(select(
+      Livestock.farmer_id, Livestock.species, Livestock.weight_kg, AntimicrobialRecord.dosage,
+      func.coalesce(AntimicrobialRecord.unit, ''), func.coalesce(AntimicrobialRecord.frequency, ''), AntimicrobialRecord.duration_days,
+      func.lower(func.trim(func.coalesce(AntimicrobialRecord.active_ingredient, AntimicrobialRecord.drug_name)))
+    ).join(Livestock, Livestock.id == AntimicrobialRecord.livestock_id).join(Farmer, Farmer.id == Livestock.farmer_id).where(AntimicrobialRecord.start_date >= since), district, state, farmer_id)
+    for farmer_ids, species_names, weight, dosage, units, frequencies, duration, ingredients in _chunks(usage, chunk):
+      (farm, known), species = _farm_index(farm_ids, farmer_ids), _species_codes(species_names)
+      weight, keep = _animal_weights(weight, species, weights), known & (species >= 0)
+      factor, per_kg = _lookup(units, unit_factor)
+      per_day, single = _lookup(frequencies, parse_frequency)
+      mg = administered_mg(np.array(dosage, dtype=float), factor.astype(float), per_kg.astype(bool), weight, per_day.astype(float), single.astype(bool), np.array(duration, dtype=float))
+      unique_ingredients, ingredient = _factorize(ingredients)
+      ddd = ddd_matrix(unique_ingredients)[ingredient, np.maximum(species, 0)]
+      converted, dosed = keep & ~np.isnan(mg), keep & ~np.isnan(mg) & ~np.isnan(ddd)
+      accumulate('records', farm[keep], species[keep])
+      accumulate('unconverted_records', farm[keep & np.isnan(mg)], species[keep & np.isnan(mg)])
+      accumulate('mg', farm[converted], species[converted], mg[converted])
+      accumulate('ddd_vet', farm[dosed], species[dosed], mg[dosed] / ddd[dosed])
+      accumulate('ddd_records', farm[dosed], species[dosed])
+
+  groups = _group(level, farms, totals)
+  return {'level': level, 'period_days': days, 'since': since.isoformat(), 'groups': groups, 'totals': _metrics({name: values.sum() for name, values in totals.items()})}
+
+def _group(level, farms, totals):
+  if level == 'species': return [{'species': name, **_metrics({k: v[:, j].sum() for k, v in totals.items()})} for j, name in enumerate(SPECIES)]
+  if level == 'national': return [_metrics({k: v.sum() for k, v in totals.items()})]
+  by_farm = {k: v.sum(axis=1) for k, v in totals.items()}
+  if level == 'farm': return [{'farmer_id': farm[0], 'state': farm[1], 'district': farm[2], **_metrics({k: v[i] for k, v in by_farm.items()})} for i, farm in enumerate(farms)]
+  regions, region = np.unique(np.array([f'{farm[1] or ""}\x1f{farm[2] or ""}' for farm in farms], dtype=str), return_inverse=True)
+  summed = {k: np.bincount(region, weights=v, minlength=len(regions)) for k, v in by_farm.items()}
+  return [{'state': key.split('\x1f')[0] or None, 'district': key.split('\x1f')[1] or None, **_metrics({k: v[i] for k, v in summed.items()})} for i, key in enumerate(regions)]
+
+def _metrics(sums):
+  pcu = float(sums['pcu_kg'])
+  return {
+    'animals': int(sums['animals']),
+    'pcu_kg': round(pcu, 2),
+    'records': int(sums['records']),
+    'unconverted_records': int(sums['unconverted_records']),
+    'mg': round(float(sums['mg']), 3),
+    'mg_per_pcu': round(float(sums['mg']) / pcu, 4) if pcu else None,
+    'ddd_vet': round(float(sums['ddd_vet']), 3),
+    'ddd_vet_per_pcu': round(float(sums['ddd_vet']) / pcu, 6) if pcu else None,
+    'ddd_assigned_records': int(sums['ddd_records'])
+  }
@@ -0,0 +1,160 @@
+import gzip, hashlib, json, os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from flask import current_app
+from sqlalchemy import select, func, and_
+from extensions import db, segment_store
+from models.requests import TraceabilityLog, TraceabilitySegment, TraceabilityCheckpoint, TraceabilityMerkleNode
+from services.ledger import lock_chain_head, ledger_timestamp
+from services.merkle import animal_leaf, extend_peaks
+from utils.log import get_logger
+
+logger = get_logger('ledger.archive')
+LOG_FIELDS = ('id', 'livestock_id', 'event_type', 'event_data', 'performed_by', 'timestamp', 'hash_value', 'previous_hash', 'sequence', 'ip_address')
+
+class LocalSegmentStore:
+  def __init__(self, root):
+    self.root = root
+
+  def write(self, key, data):
+    path = os.path.join(self.root, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f: f.write(data)
+    os.replace(path + '.tmp', path)
+
+  def read(self, key):
+    with open(os.path.join(self.root, key), 'rb') as f: return f.read()
+
+class S3SegmentStore:
+  def __init__(self, bucket, prefix=''):
+    try: import boto3
+    except ImportError: raise RuntimeError('TRACE_ARCHIVE_URL=s3://... requires boto3 (pip install boto3)') from None
+    self.client = boto3.client('s3')
+    self.bucket = bucket
+    self.prefix = prefix
+
+  def write(self, key, data):
+    self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, ContentType='application/x-ndjson', ContentEncoding='gzip')
+
+  def read(self, key):
+    return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+
+def create_segment_store(config):
+  url = urlparse(config.get('TRACE_ARCHIVE_URL') or 'archive/traceability')
+  if url.scheme == 's3':
+    prefix = url.path.strip('/')
+    return S3SegmentStore(url.netloc, prefix + '/' if prefix else '')
+  if url.scheme in ('', 'file'): return LocalSegmentStore(url.netloc + url.path)
+  raise ValueError(f'Unsupported traceability archive URL: {url.geturl()}')
+
+def encode_segment(logs):
+  lines = [json.dumps({field: getattr(log, field) for field in LOG_FIELDS} | {'timestamp': log.timestamp.isoformat()}, sort_keys=True) for log in logs]
+  return gzip.compress(('\n'.join(lines) + '\n').encode(), mtime=0)
+
+def read_segment(segment):
+  data = segment_store.read(segment.storage_key)
+  if hashlib.sha256(data).hexdigest() != segment.content_hash: raise ValueError(f'Traceability segment {segment.id} does not match its content hash')
+  logs = []
+  for line in gzip.decompress(data).decode().splitlines():
+    record = json.loads(line)
+    record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+    logs.append(SimpleNamespace(**record))
+  return logs
+
+def latest_segments():
+  latest = select(TraceabilitySegment.livestock_id, func.max(TraceabilitySegment.last_log_id).label('last_log_id')).group_by(TraceabilitySegment.livestock_id).subquery()
+  return select(
+    TraceabilitySegment.livestock_id, TraceabilitySegment.last_hash, TraceabilitySegment.last_sequence, TraceabilitySegment.merkle_peaks
+  ).join(latest, and_(TraceabilitySegment.livestock_id == latest.c.livestock_id, TraceabilitySegment.last_log_id == latest.c.last_log_id)).subquery()
+
+def iter_trace_logs(livestock_id):
+  segments = TraceabilitySegment.query.filter_by(livestock_id=livestock_id).order_by(TraceabilitySegment.last_log_id.desc()).all()
+  hot = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc(), TraceabilityLog.id.desc())
+  yield from hot.yield_per(current_app.config.get('STREAM_BATCH_SIZE', 500))
+  for segment in segments: yield from reversed(read_segment(segment))
+
+def find_log(log_id):
+  log = db.session.get(TraceabilityLog, log_id)
+  if log is not None: return log
+  # Only checkpointed logs are archived, so the leaf node names the one animal whose segment can hold this id.
+  livestock_id = db.session.scalar(select(TraceabilityMerkleNode.livestock_id).where(TraceabilityMerkleNode.log_id == log_id))
+  if livestock_id is None: return None
+  segment = TraceabilitySegment.query.filter(
+    TraceabilitySegment.livestock_id == livestock_id, TraceabilitySegment.first_log_id <= log_id, TraceabilitySegment.last_log_id >= log_id
+  ).first()
+  if segment is None: return None
+  return next((archived for archived in read_segment(segment) if archived.id == log_id), None)
+
+def iter_chain_hashes(livestock_id, last_log_id, after_log_id=0):
+  segments = TraceabilitySegment.query.filter(
+    TraceabilitySegment.livestock_id == livestock_id, TraceabilitySegment.first_log_id <= last_log_id, TraceabilitySegment.last_log_id > after_log_id
+  ).order_by(TraceabilitySegment.last_log_id).all()
+  for segment in segments:
+    for log in read_segment(segment):
+      if after_log_id < log.id <= last_log_id: yield log.id, log.hash_value
+  yield from db.session.execute(
+    select(TraceabilityLog.id, TraceabilityLog.hash_value).where(TraceabilityLog.livestock_id == livestock_id, TraceabilityLog.id > after_log_id, TraceabilityLog.id <= last_log_id).order_by(TraceabilityLog.id)
+  )
+
+def archive_chain(livestock_id, last_log_id):
+  lock_chain_head(livestock_id)
+  logs = TraceabilityLog.query.filter(TraceabilityLog.livestock_id == livestock_id, TraceabilityLog.id <= last_log_id).order_by(TraceabilityLog.id).all()
+  if not logs:
+    db.session.rollback()
+    return None
+  previous = TraceabilitySegment.query.filter_by(livestock_id=livestock_id).order_by(TraceabilitySegment.last_log_id.desc()).first()
+  data = encode_segment(logs)
+  content_hash = hashlib.sha256(data).hexdigest()
+  storage_key = f'{livestock_id}/{content_hash}.ndjson.gz'
+  segment_store.write(storage_key, data)
+
+  segment = TraceabilitySegment(
+    livestock_id=livestock_id,
+    first_log_id=logs[0].id,
+    last_log_id=logs[-1].id,
+    first_sequence=logs[0].sequence,
+    last_sequence=logs[-1].sequence,
+    first_timestamp=logs[0].timestamp,
+    last_timestamp=logs[-1].timestamp,
+    first_previous_hash=logs[0].previous_hash,
+    last_hash=logs[-1].hash_value,
+    log_count=len(logs),
+    merkle_peaks=extend_peaks(previous.merkle_peaks if previous else [], [animal_leaf(log.hash_value) for log in logs]),
+    storage_key=storage_key,
+    content_hash=content_hash,
+    size_bytes=len(data),
+    archived_at=ledger_timestamp()
+  )
+  db.session.add(segment)
+  TraceabilityLog.query.filter(TraceabilityLog.livestock_id == livestock_id, TraceabilityLog.id <= last_log_id).delete(synchronize_session=False)
+  db.session.commit()
+  return segment
+
+def archive_segments(older_than_days=None):
+  days = older_than_days if older_than_days is not None else current_app.config.get('TRACE_ARCHIVE_AFTER_DAYS', 365)
+  cutoff = ledger_timestamp() - timedelta(days=days)
+  sealed = select(TraceabilityCheckpoint.livestock_id, func.max(TraceabilityCheckpoint.last_log_id).label('last_log_id')).group_by(TraceabilityCheckpoint.livestock_id).subquery()
+  tips = select(TraceabilityLog.livestock_id, func.max(TraceabilityLog.id).label('tip_id')).group_by(TraceabilityLog.livestock_id).subquery()
+  candidates = db.session.execute(
+    select(TraceabilityLog.livestock_id, func.max(TraceabilityLog.id)).join(sealed, sealed.c.livestock_id == TraceabilityLog.livestock_id).join(
+      tips, tips.c.livestock_id == TraceabilityLog.livestock_id
+    ).where(
+      TraceabilityLog.timestamp < cutoff, TraceabilityLog.id <= sealed.c.last_log_id, TraceabilityLog.id < tips.c.tip_id
+    ).group_by(TraceabilityLog.livestock_id)
+  ).all()
+
+  summary = {'segments': 0, 'logs': 0, 'bytes': 0}
+  for livestock_id, last_log_id in candidates:
+    try:
+      segment = archive_chain(livestock_id, last_log_id)
+    except Exception:
+      db.session.rollback()
+      logger.exception('Traceability archival failed', extra={'fields': {'livestock_id': livestock_id}})
+      continue
+    if segment is None: continue
+    summary['segments'] += 1
+    summary['logs'] += segment.log_count
+    summary['bytes'] += segment.size_bytes
+  logger.info('Traceability segments archived', extra={'fields': {'cutoff': cutoff.isoformat(), **summary}})
+  return summary
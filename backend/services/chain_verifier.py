@@ -0,0 +1,130 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import select
+from extensions import db
+from models.livestock import Livestock
+from models.user import Farmer
+from models.requests import TraceabilityLog, TraceabilitySegment, ChainVerificationRun
+from services.archive import latest_segments
+from services.ledger import GENESIS_HASH, compute_hash, ledger_timestamp
+from utils.log import get_logger
+
+logger = get_logger('ledger.verify')
+MAX_REPORTED_ANIMALS = 1000
+
+def verify_chain(livestock_id, rows, anchor=None):
+  report = {'livestock_id': livestock_id, 'logs': 0, 'legacy_logs': 0, 'breaks': []}
+  expected_previous, expected_sequence = anchor or (GENESIS_HASH, None)
+  if expected_sequence is not None: expected_sequence += 1
+  for log_id, event_type, event_data, timestamp, hash_value, previous_hash, sequence in rows:
+    report['logs'] += 1
+    if previous_hash != expected_previous: report['breaks'].append({'log_id': log_id, 'reason': 'previous_hash_mismatch'})
+    if sequence is None: report['legacy_logs'] += 1
+    else:
+      if expected_sequence is not None and sequence != expected_sequence: report['breaks'].append({'log_id': log_id, 'reason': 'sequence_gap'})
+      if compute_hash(livestock_id, event_type, event_data, timestamp, previous_hash) != hash_value: report['breaks'].append({'log_id': log_id, 'reason': 'hash_mismatch'})
+      expected_sequence = sequence + 1
+    expected_previous = hash_value
+  return report
+
+def verify_batch(batch):
+  return [verify_chain(livestock_id, rows, anchor) for livestock_id, rows, anchor in batch]
+
+def stream_chains(district=None, state=None, yield_per=5000):
+  archived = latest_segments()
+  stmt = select(
+    TraceabilityLog.livestock_id, TraceabilityLog.id, TraceabilityLog.event_type, TraceabilityLog.event_data,
+    TraceabilityLog.timestamp, TraceabilityLog.hash_value, TraceabilityLog.previous_hash, TraceabilityLog.sequence,
+    archived.c.last_hash, archived.c.last_sequence
+  ).outerjoin(archived, archived.c.livestock_id == TraceabilityLog.livestock_id)
+  stmt = stmt.order_by(TraceabilityLog.livestock_id, TraceabilityLog.id).execution_options(stream_results=True, yield_per=yield_per)
+  for livestock_id, rows in groupby(db.session.execute(_in_region(stmt, TraceabilityLog.livestock_id, district, state)), key=itemgetter(0)):
+    rows = list(rows)
+    anchor = (rows[0][8], rows[0][9]) if rows[0][8] is not None else None
+    yield livestock_id, [tuple(row[1:8]) for row in rows], anchor
+
+def _in_region(stmt, livestock_column, district=None, state=None):
+  if not district and not state: return stmt
+  stmt = stmt.join(Livestock, Livestock.id == livestock_column).join(Farmer, Farmer.id == Livestock.farmer_id)
+  if district: stmt = stmt.where(Farmer.district == district)
+  if state: stmt = stmt.where(Farmer.state == state)
+  return stmt
+
+def verify_segment_links(district=None, state=None):
+  stmt = select(
+    TraceabilitySegment.livestock_id, TraceabilitySegment.id, TraceabilitySegment.first_previous_hash, TraceabilitySegment.last_hash,
+    TraceabilitySegment.first_sequence, TraceabilitySegment.last_sequence
+  ).order_by(TraceabilitySegment.livestock_id, TraceabilitySegment.last_log_id)
+  breaks = {}
+  for livestock_id, segments in groupby(db.session.execute(_in_region(stmt, TraceabilitySegment.livestock_id, district, state)), key=itemgetter(0)):
+    expected_previous, expected_sequence = GENESIS_HASH, None
+    for _, segment_id, first_previous_hash, last_hash, first_sequence, last_sequence in segments:
+      if first_previous_hash != expected_previous: breaks.setdefault(livestock_id, []).append({'segment_id': segment_id, 'reason': 'segment_link_mismatch'})
+      if expected_sequence is not None and first_sequence is not None and first_sequence != expected_sequence: breaks.setdefault(livestock_id, []).append({'segment_id': segment_id, 'reason': 'sequence_gap'})
+      expected_previous = last_hash
+      expected_sequence = last_sequence + 1 if last_sequence is not None else None
+  return breaks
+
+def batch_chains(chains, batch_rows):
+  batch, size = [], 0
+  for livestock_id, rows, anchor in chains:
+    batch.append((livestock_id, rows, anchor))
+    size += len(rows)
+    if size >= batch_rows:
+      yield batch
+      batch, size = [], 0
+  if batch: yield batch
+
+def verify_chains(district=None, state=None, workers=4, batch_rows=20000):
+  totals = {'animals_checked': 0, 'logs_checked': 0, 'legacy_logs': 0, 'broken_animals': 0, 'broken_links': []}
+  segment_breaks = verify_segment_links(district, state)
+
+  def collect(reports):
+    for report in reports:
+      totals['animals_checked'] += 1
+      totals['logs_checked'] += report['logs']
+      totals['legacy_logs'] += report['legacy_logs']
+      report['breaks'] = segment_breaks.pop(report['livestock_id'], []) + report['breaks']
+      if report['breaks']:
+        totals['broken_animals'] += 1
+        if len(totals['broken_links']) < MAX_REPORTED_ANIMALS: totals['broken_links'].append({'livestock_id': report['livestock_id'], 'breaks': report['breaks']})
+
+  def collect_archived_only():
+    collect([{'livestock_id': livestock_id, 'logs': 0, 'legacy_logs': 0, 'breaks': breaks} for livestock_id, breaks in list(segment_breaks.items())])
+
+  batches = batch_chains(stream_chains(district, state), batch_rows)
+  if workers <= 1:
+    for batch in batches: collect(verify_batch(batch))
+    collect_archived_only()
+    return totals
+
+  with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+    pending = set()
+    for batch in batches:
+      pending.add(pool.submit(verify_batch, batch))
+      if len(pending) >= workers * 2:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done: collect(future.result())
+    for future in pending: collect(future.result())
+  collect_archived_only()
+  return totals
+
+def run_verification(district=None, state=None, workers=4, batch_rows=20000):
+  run = ChainVerificationRun(district=district, state=state, status='running', started_at=ledger_timestamp())
+  db.session.add(run)
+  db.session.commit()
+  try:
+    totals = verify_chains(district, state, workers, batch_rows)
+  except Exception as e:
+    db.session.rollback()
+    run.status, run.error, run.finished_at = 'failed', str(e), ledger_timestamp()
+    db.session.commit()
+    logger.exception('Chain verification failed', extra={'fields': {'run_id': run.id}})
+    raise
+  for field, value in totals.items(): setattr(run, field, value)
+  run.status, run.finished_at = 'completed', ledger_timestamp()
+  db.session.commit()
+  logger.info('Chain verification completed', extra={'fields': {'run_id': run.id, 'animals_checked': run.animals_checked, 'logs_checked': run.logs_checked, 'broken_animals': run.broken_animals}})
+  return run
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import select, insert, update, func, and_, or_
+from extensions import db
+from models.requests import TraceabilityLog, TraceabilityCheckpoint, TraceabilityMerkleNode, TraceabilityDailyRoot
+from services.ledger import ledger_timestamp
+from services.archive import iter_chain_hashes
+from services.merkle import animal_leaf, daily_leaf, merkle_levels, audit_path, verify_inclusion, extend_peaks, root_from_peaks, find_peak, peak_siblings, bagged_proof
+from utils.log import get_logger
+
+logger = get_logger('ledger.checkpoint')
+
+def default_checkpoint_date():
+  return datetime.now(timezone.utc).date() - timedelta(days=1)
+
+def _latest_checkpoints():
+  latest = select(TraceabilityCheckpoint.livestock_id, func.max(TraceabilityCheckpoint.last_log_id).label('last_log_id')).group_by(TraceabilityCheckpoint.livestock_id).subquery()
+  return select(TraceabilityCheckpoint.livestock_id, TraceabilityCheckpoint.last_log_id, TraceabilityCheckpoint.merkle_peaks).join(
+    latest, and_(TraceabilityCheckpoint.livestock_id == latest.c.livestock_id, TraceabilityCheckpoint.last_log_id == latest.c.last_log_id)
+  ).subquery()
+
+def _dirty_chains(cutoff, covered):
+  latest = select(TraceabilityLog.livestock_id, func.max(TraceabilityLog.id).label('last_log_id')).where(TraceabilityLog.timestamp < cutoff).group_by(TraceabilityLog.livestock_id).subquery()
+  return select(latest.c.livestock_id, latest.c.last_log_id).outerjoin(covered, covered.c.livestock_id == latest.c.livestock_id).where(or_(
+    latest.c.last_log_id > func.coalesce(covered.c.last_log_id, 0), and_(covered.c.livestock_id.is_not(None), covered.c.merkle_peaks.is_(None))
+  )).subquery()
+
+def _store_nodes(nodes, batch_size):
+  for start in range(0, len(nodes), batch_size): db.session.execute(insert(TraceabilityMerkleNode), nodes[start:start + batch_size])
+
+def _extend_chain(livestock_id, peaks, rows, nodes):
+  start, added = sum(size for size, _ in peaks or []), []
+  peaks = extend_peaks(peaks, [animal_leaf(hash_value) for _, hash_value in rows], added)
+  nodes.extend({'livestock_id': livestock_id, 'level': level, 'position': position, 'hash': hash_value, 'log_id': rows[position - start][0] if level == 0 else None} for level, position, hash_value in added)
+  return rows[-1][0], peaks
+
+def create_checkpoints(checkpoint_date=None, yield_per=5000):
+  checkpoint_date = checkpoint_date or default_checkpoint_date()
+  cutoff = datetime.combine(checkpoint_date + timedelta(days=1), datetime.min.time())
+  covered = _latest_checkpoints()
+  dirty = _dirty_chains(cutoff, covered)
+  # Checkpoints written before peaks were stored have no Merkle nodes yet; rebuild those chains once from the start.
+  rebuild = db.session.execute(select(dirty.c.livestock_id, dirty.c.last_log_id).join(covered, covered.c.livestock_id == dirty.c.livestock_id).where(covered.c.merkle_peaks.is_(None))).all()
+  stmt = select(TraceabilityLog.livestock_id, TraceabilityLog.id, TraceabilityLog.hash_value, covered.c.merkle_peaks).join(
+    dirty, dirty.c.livestock_id == TraceabilityLog.livestock_id
+  ).outerjoin(covered, covered.c.livestock_id == TraceabilityLog.livestock_id).where(
+    TraceabilityLog.id <= dirty.c.last_log_id, TraceabilityLog.id > func.coalesce(covered.c.last_log_id, 0),
+    or_(covered.c.livestock_id.is_(None), covered.c.merkle_peaks.is_not(None))
+  ).order_by(TraceabilityLog.livestock_id, TraceabilityLog.id).execution_options(stream_results=True, yield_per=yield_per)
+
+  roots, nodes = {}, []
+  for livestock_id, rows in groupby(db.session.execute(stmt), key=itemgetter(0)):
+    rows = list(rows)
+    roots[livestock_id] = _extend_chain(livestock_id, rows[0][3], [(r[1], r[2]) for r in rows], nodes)
+  for livestock_id, last_log_id in rebuild:
+    roots[livestock_id] = _extend_chain(livestock_id, [], list(iter_chain_hashes(livestock_id, last_log_id)), nodes)
+  _store_nodes(nodes, yield_per)
+
+  now = ledger_timestamp()
+  existing = {c.livestock_id: c for c in TraceabilityCheckpoint.query.filter(TraceabilityCheckpoint.checkpoint_date == checkpoint_date, TraceabilityCheckpoint.livestock_id.in_(roots)).all()} if roots else {}
+  for livestock_id, (last_log_id, peaks) in roots.items():
+    checkpoint = existing.get(livestock_id) or TraceabilityCheckpoint(livestock_id=livestock_id, checkpoint_date=checkpoint_date)
+    checkpoint.last_log_id, checkpoint.leaf_count, checkpoint.root_hash, checkpoint.merkle_peaks, checkpoint.created_at = last_log_id, sum(size for size, _ in peaks), root_from_peaks(peaks), peaks, now
+    db.session.add(checkpoint)
+  db.session.flush()
+
+  daily = build_daily_root(checkpoint_date)
+  if daily is not None: daily.created_at = now
+  db.session.commit()
+  logger.info('Traceability checkpoints created', extra={'fields': {'checkpoint_date': checkpoint_date.isoformat(), 'animals': len(roots), 'daily_root': daily.root_hash if daily else None}})
+  return daily
+
+def build_daily_root(checkpoint_date):
+  checkpoints = db.session.execute(
+    select(TraceabilityCheckpoint.id, TraceabilityCheckpoint.livestock_id, TraceabilityCheckpoint.root_hash).where(TraceabilityCheckpoint.checkpoint_date == checkpoint_date).order_by(TraceabilityCheckpoint.livestock_id)
+  ).all()
+  if not checkpoints: return None
+  levels = merkle_levels([daily_leaf(livestock_id, root_hash) for _, livestock_id, root_hash in checkpoints])
+  db.session.execute(update(TraceabilityCheckpoint), [{'id': checkpoint_id, 'daily_index': index, 'daily_proof': audit_path(levels, index)} for index, (checkpoint_id, _, _) in enumerate(checkpoints)])
+  daily = db.session.get(TraceabilityDailyRoot, checkpoint_date) or TraceabilityDailyRoot(checkpoint_date=checkpoint_date)
+  daily.animal_count = len(checkpoints)
+  daily.root_hash = levels[-1][0]
+  db.session.add(daily)
+  return daily
+
+class ProofUnavailable(Exception):
+  def __init__(self, message, status_code):
+    super().__init__(message)
+    self.status_code = status_code
+
+def build_inclusion_proof(log):
+  checkpoint = TraceabilityCheckpoint.query.filter(
+    TraceabilityCheckpoint.livestock_id == log.livestock_id, TraceabilityCheckpoint.last_log_id >= log.id
+  ).order_by(TraceabilityCheckpoint.checkpoint_date.desc()).first()
+  if checkpoint is None or checkpoint.merkle_peaks is None: raise ProofUnavailable('Log has not been checkpointed yet', 404)
+  daily = db.session.get(TraceabilityDailyRoot, checkpoint.checkpoint_date)
+  if daily is None or checkpoint.daily_proof is None: raise ProofUnavailable('Daily root for checkpoint is missing', 404)
+
+  stale = ProofUnavailable('Stored logs no longer match the checkpoint', 409)
+  leaf = TraceabilityMerkleNode.query.filter_by(log_id=log.id).first()
+  peaks = checkpoint.merkle_peaks
+  if leaf is None or leaf.livestock_id != log.livestock_id or leaf.position >= checkpoint.leaf_count or leaf.hash != animal_leaf(log.hash_value): raise stale
+  peak_index, _ = find_peak(peaks, leaf.position)
+  siblings = peak_siblings(leaf.position, peaks[peak_index][0])
+  stored = dict(((level, position), hash_value) for level, position, hash_value in db.session.execute(
+    select(TraceabilityMerkleNode.level, TraceabilityMerkleNode.position, TraceabilityMerkleNode.hash).where(
+      TraceabilityMerkleNode.livestock_id == log.livestock_id, or_(*(and_(TraceabilityMerkleNode.level == level, TraceabilityMerkleNode.position == position) for level, position, _ in siblings))
+    )
+  )) if siblings else {}
+  if len(stored) != len(siblings): raise stale
+  peak_proof = [{'position': side, 'hash': stored[(level, position)]} for level, position, side in siblings]
+  if not verify_inclusion(leaf.hash, peak_proof, peaks[peak_index][1]) or root_from_peaks(peaks) != checkpoint.root_hash: raise stale
+  daily_leaf_hash = daily_leaf(log.livestock_id, checkpoint.root_hash)
+  if not verify_inclusion(daily_leaf_hash, checkpoint.daily_proof, daily.root_hash): raise stale
+
+  return {
+    'log_id': log.id,
+    'livestock_id': log.livestock_id,
+    'hash': log.hash_value,
+    'leaf': leaf.hash,
+    'leaf_index': leaf.position,
+    'animal_checkpoint': {
+      'id': checkpoint.id,
+      'checkpoint_date': checkpoint.checkpoint_date.isoformat(),
+      'last_log_id': checkpoint.last_log_id,
+      'leaf_count': checkpoint.leaf_count,
+      'root_hash': checkpoint.root_hash,
+      'proof': bagged_proof(peaks, peak_index, peak_proof)
+    },
+    'daily_root': {
+      'checkpoint_date': daily.checkpoint_date.isoformat(),
+      'animal_count': daily.animal_count,
+      'root_hash': daily.root_hash,
+      'leaf': daily_leaf_hash,
+      'leaf_index': checkpoint.daily_index,
+      'proof': checkpoint.daily_proof
+    }
+  }
@@ -0,0 +1,112 @@
+from sqlalchemy import event, inspect, select, func
+from extensions import db
+from models.counters import OwnerCounter
+from models.livestock import Livestock
+from models.requests import Alert
+from models.analytics import DataRequest
+from utils.upsert import upsert_increment
+from utils.log import get_logger
+
+logger = get_logger('counters')
+COUNTER_KEY = ('owner_type', 'owner_id', 'counter_key')
+OPEN_ALERT_STATUSES = ('unread', 'read')
+
+def alert_keys(farmer_id, veterinarian_id, status, severity, alert_type):
+  keys = (f'alerts.status.{status}', f'alerts.{status}.severity.{severity}', f'alerts.{status}.type.{alert_type}')
+  return [(owner_type, owner_id, key) for owner_type, owner_id in (('farmer', farmer_id), ('veterinarian', veterinarian_id)) if owner_id for key in keys]
+
+def livestock_keys(farmer_id, is_active, health_status):
+  if not farmer_id or not is_active: return []
+  return [('farmer', farmer_id, 'livestock.active'), ('farmer', farmer_id, f'livestock.health.{health_status}')]
+
+def data_request_keys(researcher_id, status):
+  return [('researcher', researcher_id, f'data_requests.status.{status}')] if researcher_id else []
+
+COUNTED_MODELS = {
+  Alert: (('farmer_id', 'veterinarian_id', 'status', 'severity', 'alert_type'), alert_keys),
+  Livestock: (('farmer_id', 'is_active', 'health_status'), livestock_keys),
+  DataRequest: (('researcher_id', 'status'), data_request_keys)
+}
+
+def _column_default(model, field):
+  default = model.__table__.c[field].default
+  return default.arg if default is not None and default.is_scalar else None
+
+def _current(obj, field):
+  value = getattr(obj, field)
+  return _column_default(type(obj), field) if value is None else value
+
+def _previous(obj, field):
+  history = inspect(obj).attrs[field].history
+  return history.deleted[0] if history.deleted else _current(obj, field)
+
+def _add(deltas, keys, amount):
+  for key in keys: deltas[key] = deltas.get(key, 0) + amount
+
+def apply_deltas(deltas):
+  rows = [{'owner_type': owner_type, 'owner_id': owner_id, 'counter_key': key, 'value': amount} for (owner_type, owner_id, key), amount in sorted(deltas.items()) if amount]
+  if rows: upsert_increment(OwnerCounter.__table__, rows, COUNTER_KEY, ('value',))
+  return len(rows)
+
+def count_inserted(model, rows):
+  fields, keys = COUNTED_MODELS[model]
+  deltas = {}
+  for row in rows: _add(deltas, keys(*(row.get(field, _column_default(model, field)) for field in fields)), 1)
+  apply_deltas(deltas)
+
+def count_status_change(rows, previous, status):
+  deltas = {}
+  for farmer_id, veterinarian_id, severity, alert_type in rows:
+    _add(deltas, alert_keys(farmer_id, veterinarian_id, previous, severity, alert_type), -1)
+    _add(deltas, alert_keys(farmer_id, veterinarian_id, status, severity, alert_type), 1)
+  apply_deltas(deltas)
+
+def _track_flush(session, flush_context):
+  deltas = {}
+  for obj in session.new:
+    if type(obj) in COUNTED_MODELS:
+      fields, keys = COUNTED_MODELS[type(obj)]
+      _add(deltas, keys(*(_current(obj, field) for field in fields)), 1)
+  for obj in session.deleted:
+    if type(obj) in COUNTED_MODELS:
+      fields, keys = COUNTED_MODELS[type(obj)]
+      _add(deltas, keys(*(_previous(obj, field) for field in fields)), -1)
+  for obj in session.dirty:
+    if type(obj) not in COUNTED_MODELS: continue
+    fields, keys = COUNTED_MODELS[type(obj)]
+    state = inspect(obj)
+    if not any(state.attrs[field].history.has_changes() for field in fields): continue
+    _add(deltas, keys(*(_previous(obj, field) for field in fields)), -1)
+    _add(deltas, keys(*(_current(obj, field) for field in fields)), 1)
+  apply_deltas(deltas)
+
+def init_counters(app):
+  if not event.contains(db.session, 'after_flush', _track_flush): event.listen(db.session, 'after_flush', _track_flush)
+
+def owner_counters(owner_type, owner_id):
+  rows = db.session.execute(select(OwnerCounter.counter_key, OwnerCounter.value).where(OwnerCounter.owner_type == owner_type, OwnerCounter.owner_id == owner_id))
+  return {key: value for key, value in rows}
+
+def open_alerts(counters, dimension, value):
+  return sum(counters.get(f'alerts.{status}.{dimension}.{value}', 0) for status in OPEN_ALERT_STATUSES)
+
+def expected_counters():
+  expected = {}
+  alerts = select(Alert.farmer_id, Alert.veterinarian_id, Alert.status, Alert.severity, Alert.alert_type, func.count()).group_by(
+    Alert.farmer_id, Alert.veterinarian_id, Alert.status, Alert.severity, Alert.alert_type
+  )
+  for *values, count in db.session.execute(alerts): _add(expected, alert_keys(*values), count)
+  livestock = select(Livestock.farmer_id, Livestock.health_status, func.count()).where(Livestock.is_active == True).group_by(Livestock.farmer_id, Livestock.health_status)
+  for farmer_id, health_status, count in db.session.execute(livestock): _add(expected, livestock_keys(farmer_id, True, health_status), count)
+  data_requests = select(DataRequest.researcher_id, DataRequest.status, func.count()).group_by(DataRequest.researcher_id, DataRequest.status)
+  for researcher_id, status, count in db.session.execute(data_requests): _add(expected, data_request_keys(researcher_id, status), count)
+  return expected
+
+def reconcile_counters():
+  expected = expected_counters()
+  stored = {(owner_type, owner_id, key): value for owner_type, owner_id, key, value in db.session.execute(select(OwnerCounter.owner_type, OwnerCounter.owner_id, OwnerCounter.counter_key, OwnerCounter.value))}
+  drift = {key: expected.get(key, 0) - stored.get(key, 0) for key in expected.keys() | stored.keys()}
+  fixed = apply_deltas(drift)
+  db.session.commit()
+  logger.info('Owner counters reconciled', extra={'fields': {'counters': len(expected), 'fixed': fixed}})
+  return len(expected), fixed
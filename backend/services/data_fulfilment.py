@@ -0,0 +1,190 @@
+import hashlib, hmac, os, shutil, tempfile, time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from flask import current_app, redirect, send_file
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from extensions import db, export_store
+from models.analytics import DataRequest, DataRequestJob
+from services.dataset_export import EXPORT_COLUMNS, EXPORT_FORMATS, parquet_available, request_statement, iter_chunks, encode_csv, encode_parquet
+from utils.log import get_logger
+
+logger = get_logger('research.fulfilment')
+PSEUDONYMS = {'farmer_id': ('farm_ref', 'farm'), 'livestock_id': ('animal_ref', 'animal')}
+DROPPED_COLUMNS = {'record_id'}
+
+class LocalExportStore:
+  def __init__(self, root):
+    self.root = os.path.abspath(root)
+
+  def put_file(self, key, path, mimetype):
+    target = os.path.join(self.root, key)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)
+
+  def download(self, key, filename, mimetype):
+    return send_file(os.path.join(self.root, key), mimetype=mimetype, as_attachment=True, download_name=filename)
+
+class S3ExportStore:
+  def __init__(self, bucket, prefix='', expires_seconds=3600):
+    try: import boto3
+    except ImportError: raise RuntimeError('DATA_EXPORT_URL=s3://... requires boto3 (pip install boto3)') from None
+    self.client = boto3.client('s3')
+    self.bucket = bucket
+    self.prefix = prefix
+    self.expires_seconds = expires_seconds
+
+  def put_file(self, key, path, mimetype):
+    self.client.upload_file(path, self.bucket, self.prefix + key, ExtraArgs={'ContentType': mimetype})
+    os.remove(path)
+
+  def download(self, key, filename, mimetype):
+    return redirect(self.client.generate_presigned_url('get_object', Params={
+      'Bucket': self.bucket, 'Key': self.prefix + key, 'ResponseContentDisposition': f'attachment; filename="{filename}"'
+    }, ExpiresIn=self.expires_seconds))
+
+def create_export_store(config):
+  url = urlparse(config.get('DATA_EXPORT_URL') or 'exports/data-requests')
+  if url.scheme == 's3':
+    prefix = url.path.strip('/')
+    return S3ExportStore(url.netloc, prefix + '/' if prefix else '', int(config.get('DATA_EXPORT_URL_EXPIRES', 3600)))
+  if url.scheme in ('', 'file'): return LocalExportStore(url.netloc + url.path)
+  raise ValueError(f'Unsupported data export URL: {url.geturl()}')
+
+def _anonymised_layout():
+  layout, columns = [], []
+  for index, (name, column, type_name) in enumerate(EXPORT_COLUMNS):
+    if name in DROPPED_COLUMNS: continue
+    if name in PSEUDONYMS:
+      ref, kind = PSEUDONYMS[name]
+      layout.append((index, kind))
+      columns.append((ref, None, 'string'))
+    else:
+      layout.append((index, None))
+      columns.append((name, column, type_name))
+  return tuple(layout), tuple(columns)
+
+ANONYMISED_LAYOUT, ANONYMISED_COLUMNS = _anonymised_layout()
+ANONYMISED_FIELDS = tuple(name for name, _, _ in ANONYMISED_COLUMNS)
+
+def pseudonymiser(secret, data_request_id):
+  key = hmac.new(secret.encode(), f'data-request:{data_request_id}'.encode(), hashlib.sha256).digest()
+  def pseudonym(kind, value):
+    if value is None: return None
+    return hmac.new(key, f'{kind}:{value}'.encode(), hashlib.sha256).hexdigest()[:24]
+  return pseudonym
+
+def anonymise(chunks, pseudonym, layout=ANONYMISED_LAYOUT):
+  for rows in chunks:
+    yield [tuple(pseudonym(kind, row[index]) if kind else row[index] for index, kind in layout) for row in rows]
+
+def artifact_filename(data_request_id, export_format):
+  return f'data-request-{data_request_id}.{EXPORT_FORMATS[export_format][1]}'
+
+def fulfilment_format():
+  export_format = current_app.config.get('DATA_FULFILMENT_FORMAT', 'parquet')
+  return 'csv' if export_format == 'parquet' and not parquet_available() else export_format
+
+def _now():
+  return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _progress(job_id, **values):
+  with db.engine.begin() as conn: conn.execute(update(DataRequestJob).where(DataRequestJob.id == job_id).values(heartbeat_at=_now(), **values))
+
+def _claim(data_request_id, export_format, stale_before, max_attempts):
+  now = _now()
+  try:
+    job = DataRequestJob(data_request_id=data_request_id, export_format=export_format, started_at=now, heartbeat_at=now)
+    db.session.add(job)
+    db.session.commit()
+    return job
+  except IntegrityError:
+    db.session.rollback()
+  claimed = db.session.execute(update(DataRequestJob).where(
+    DataRequestJob.data_request_id == data_request_id,
+    or_(and_(DataRequestJob.status == 'running', DataRequestJob.heartbeat_at < stale_before), and_(DataRequestJob.status == 'failed', DataRequestJob.attempts < max_attempts))
+  ).values(
+    status='running', export_format=export_format, attempts=DataRequestJob.attempts + 1, rows_total=None, rows_written=0, bytes_written=0,
+    error=None, started_at=now, heartbeat_at=now, finished_at=None
+  )).rowcount
+  db.session.commit()
+  return DataRequestJob.query.filter_by(data_request_id=data_request_id).first() if claimed else None
+
+def claim_next_job():
+  stale_before = _now() - timedelta(minutes=current_app.config.get('DATA_FULFILMENT_STALE_MINUTES', 30))
+  max_attempts = current_app.config.get('DATA_FULFILMENT_MAX_ATTEMPTS', 3)
+  candidates = select(DataRequest.id).outerjoin(DataRequestJob, DataRequestJob.data_request_id == DataRequest.id).where(
+    DataRequest.status == 'approved',
+    or_(DataRequestJob.id.is_(None), and_(DataRequestJob.status == 'running', DataRequestJob.heartbeat_at < stale_before), and_(DataRequestJob.status == 'failed', DataRequestJob.attempts < max_attempts))
+  ).order_by(DataRequest.approved_at, DataRequest.id).limit(10)
+  for data_request_id in db.session.scalars(candidates).all():
+    job = _claim(data_request_id, fulfilment_format(), stale_before, max_attempts)
+    if job: return job
+  return None
+
+def anonymised_export(data_request, export_format, chunks=None):
+  secret = current_app.config.get('DATA_PSEUDONYM_KEY')
+  if not secret: raise RuntimeError('DATA_PSEUDONYM_KEY is not configured')
+  chunks = anonymise(chunks if chunks is not None else iter_chunks(request_statement(data_request)), pseudonymiser(secret, data_request.id))
+  if export_format == 'parquet': return encode_parquet(chunks, ANONYMISED_COLUMNS)
+  return encode_csv(chunks, ANONYMISED_FIELDS)
+
+def _write_artifact(job, data_request, path):
+  progress = {'rows_written': 0}
+
+  def tracked(chunks):
+    for rows in chunks:
+      progress['rows_written'] += len(rows)
+      yield rows
+
+  written = 0
+  with open(path, 'wb') as f:
+    for data in anonymised_export(data_request, job.export_format, tracked(iter_chunks(request_statement(data_request)))):
+      written += f.write(data)
+      _progress(job.id, rows_written=progress['rows_written'], bytes_written=written)
+  return progress['rows_written'], written
+
+def fulfil(job):
+  data_request = db.session.get(DataRequest, job.data_request_id)
+  stmt = request_statement(data_request)
+  rows_total = db.session.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar()
+  _progress(job.id, rows_total=rows_total)
+  mimetype, extension = EXPORT_FORMATS[job.export_format]
+  fd, path = tempfile.mkstemp(suffix='.' + extension)
+  os.close(fd)
+  try:
+    rows_written, bytes_written = _write_artifact(job, data_request, path)
+    key = f'{data_request.id}/{artifact_filename(data_request.id, job.export_format)}'
+    export_store.put_file(key, path, mimetype)
+  except Exception as e:
+    db.session.rollback()
+    if os.path.exists(path): os.remove(path)
+    job.status, job.error, job.finished_at = 'failed', str(e), _now()
+    db.session.commit()
+    logger.exception('Data request fulfilment failed', extra={'fields': {'data_request_id': data_request.id, 'attempt': job.attempts}})
+    return job
+
+  job.status, job.artifact_key, job.finished_at = 'completed', key, _now()
+  job.rows_total, job.rows_written, job.bytes_written = rows_total, rows_written, bytes_written
+  data_request.status, data_request.data_access_url = 'fulfilled', f'/api/research/data-requests/{data_request.id}/download'
+  db.session.commit()
+  logger.info('Data request fulfilled', extra={'fields': {'data_request_id': data_request.id, 'rows': rows_written, 'bytes': bytes_written, 'format': job.export_format}})
+  return job
+
+def run_fulfilment(watch=False, poll_seconds=30):
+  while True:
+    job = claim_next_job()
+    if job:
+      yield fulfil(job)
+      continue
+    if not watch: return
+    time.sleep(poll_seconds)
+
+def job_progress(job):
+  if not job: return None
+  percent = round(job.rows_written / job.rows_total * 100, 1) if job.rows_total else (100.0 if job.status == 'completed' else 0.0)
+  return {
+    'status': job.status, 'format': job.export_format, 'rows_total': job.rows_total, 'rows_written': job.rows_written, 'bytes_written': job.bytes_written,
+    'percent': percent, 'attempts': job.attempts, 'error': job.error,
+    'started_at': job.started_at.isoformat() if job.started_at else None, 'finished_at': job.finished_at.isoformat() if job.finished_at else None
+  }
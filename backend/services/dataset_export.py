@@ -0,0 +1,100 @@
+import csv, io, importlib.util, os
+from flask import current_app
+from sqlalchemy import select, or_
+from extensions import db
+from models.amu import AntimicrobialRecord
+from models.livestock import Livestock
+from models.user import Farmer
+
+EXPORT_FORMATS = {'csv': ('text/csv', 'csv'), 'parquet': ('application/vnd.apache.parquet', 'parquet')}
+EXPORT_COLUMNS = (
+  ('record_id', AntimicrobialRecord.id, 'int64'), ('livestock_id', Livestock.id, 'int64'), ('farmer_id', Farmer.id, 'int64'),
+  ('species', Livestock.species, 'string'), ('breed', Livestock.breed, 'string'), ('gender', Livestock.gender, 'string'),
+  ('age_months', Livestock.age_months, 'int64'), ('weight_kg', Livestock.weight_kg, 'float64'), ('production_type', Livestock.production_type, 'string'),
+  ('state', Farmer.state, 'string'), ('district', Farmer.district, 'string'), ('farm_type', Farmer.farm_type, 'string'),
+  ('drug_name', AntimicrobialRecord.drug_name, 'string'), ('drug_category', AntimicrobialRecord.drug_category, 'string'),
+  ('active_ingredient', AntimicrobialRecord.active_ingredient, 'string'), ('dosage', AntimicrobialRecord.dosage, 'float64'),
+  ('unit', AntimicrobialRecord.unit, 'string'), ('administration_route', AntimicrobialRecord.administration_route, 'string'),
+  ('frequency', AntimicrobialRecord.frequency, 'string'), ('duration_days', AntimicrobialRecord.duration_days, 'int64'),
+  ('start_date', AntimicrobialRecord.start_date, 'date32'), ('end_date', AntimicrobialRecord.end_date, 'date32'),
+  ('withdrawal_end_date', AntimicrobialRecord.withdrawal_end_date, 'date32'), ('is_verified', AntimicrobialRecord.is_verified, 'bool_')
+)
+EXPORT_FIELDS = tuple(name for name, _, _ in EXPORT_COLUMNS)
+
+def parquet_available():
+  return importlib.util.find_spec('pyarrow') is not None
+
+def export_statement(species=None, regions=None, date_start=None, date_end=None):
+  stmt = select(*(column for _, column, _ in EXPORT_COLUMNS)).join(Livestock, Livestock.id == AntimicrobialRecord.livestock_id).join(Farmer, Farmer.id == Livestock.farmer_id)
+  if species: stmt = stmt.where(Livestock.species.in_(species))
+  if regions: stmt = stmt.where(or_(Farmer.state.in_(regions), Farmer.district.in_(regions)))
+  if date_start: stmt = stmt.where(AntimicrobialRecord.start_date >= date_start)
+  if date_end: stmt = stmt.where(AntimicrobialRecord.start_date <= date_end)
+  return stmt.order_by(AntimicrobialRecord.id)
+
+def request_statement(data_request):
+  return export_statement(data_request.species_requested, data_request.regions_requested, data_request.date_range_start, data_request.date_range_end)
+
+def iter_chunks(stmt, chunk_size=None):
+  chunk_size = chunk_size or current_app.config.get('DATA_EXPORT_CHUNK', 50000)
+  result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+  yield from result.partitions(chunk_size)
+
+def encode_csv(chunks, fields=EXPORT_FIELDS):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(fields)
+  for rows in chunks:
+    writer.writerows(rows)
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+  if buffer.tell(): yield buffer.getvalue().encode()
+
+class _ChunkSink:
+  def __init__(self):
+    self.buffer, self.position, self.closed = bytearray(), 0, False
+
+  def write(self, data):
+    self.buffer += data
+    self.position += len(data)
+    return len(data)
+
+  def tell(self):
+    return self.position
+
+  def flush(self):
+    pass
+
+  def close(self):
+    self.closed = True
+
+  def drain(self):
+    data = bytes(self.buffer)
+    self.buffer.clear()
+    return data
+
+def encode_parquet(chunks, columns=EXPORT_COLUMNS):
+  if not parquet_available(): raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+  schema = pa.schema([(name, getattr(pa, type_name)()) for name, _, type_name in columns])
+  sink = _ChunkSink()
+  with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+    for rows in chunks:
+      values = list(zip(*rows))
+      writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema))
+      yield sink.drain()
+  yield sink.drain()
+
+def iter_export(stmt, export_format='csv', chunk_size=None):
+  encode = encode_parquet if export_format == 'parquet' else encode_csv
+  for data in encode(iter_chunks(stmt, chunk_size)):
+    if data: yield data
+
+def write_export(stmt, path, export_format='csv', chunk_size=None):
+  written = 0
+  with open(path + '.tmp', 'wb') as f:
+    for data in iter_export(stmt, export_format, chunk_size): written += f.write(data)
+  os.replace(path + '.tmp', path)
+  return written
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func, case, delete
+from extensions import db
+from models.amu import AntimicrobialRecord, FarmAmuDaily
+from models.livestock import Livestock
+from services.withdrawal_periods import normalize_drug
+from utils.upsert import upsert_increment
+from utils.log import get_logger
+
+logger = get_logger('amu.rollup')
+ROLLUP_KEY = ('farmer_id', 'usage_date', 'drug_key', 'category_key', 'unit')
+
+def normalize_category(drug_category):
+  return (drug_category or '').strip().lower()
+
+def _bucket(buckets, farmer_id, usage_date, drug_name, drug_category, unit, count, dosage):
+  key = (farmer_id, usage_date, normalize_drug(drug_name), normalize_category(drug_category), unit)
+  bucket = buckets.setdefault(key, {'drug_name': drug_name.strip(), 'drug_category': drug_category, 'record_count': 0, 'total_dosage': 0.0})
+  bucket['record_count'] += count
+  bucket['total_dosage'] += float(dosage or 0)
+
+def _upsert(buckets):
+  rows = [{**dict(zip(ROLLUP_KEY, key)), **values} for key, values in buckets.items()]
+  upsert_increment(FarmAmuDaily.__table__, rows, ROLLUP_KEY, ('record_count', 'total_dosage'))
+
+def record_farm_usage(records, usage_date=None):
+  usage_date = usage_date or datetime.now(timezone.utc).date()
+  buckets = {}
+  for farmer_id, drug_name, drug_category, dosage, unit in records: _bucket(buckets, farmer_id, usage_date, drug_name, drug_category, unit, 1, dosage)
+  if buckets: _upsert(buckets)
+  return len(buckets)
+
+def farm_usage_summary(farmer_id, today=None, recent_days=30, top_days=90, top_limit=10):
+  today = today or datetime.now(timezone.utc).date()
+  recent_since, top_since = today - timedelta(days=recent_days - 1), today - timedelta(days=top_days - 1)
+  total, recent = db.session.execute(
+    select(func.coalesce(func.sum(FarmAmuDaily.record_count), 0), func.coalesce(func.sum(case((FarmAmuDaily.usage_date >= recent_since, FarmAmuDaily.record_count), else_=0)), 0)).where(FarmAmuDaily.farmer_id == farmer_id)
+  ).one()
+  top_drugs = db.session.execute(
+    select(func.max(FarmAmuDaily.drug_name), func.sum(FarmAmuDaily.record_count)).where(
+      FarmAmuDaily.farmer_id == farmer_id, FarmAmuDaily.usage_date >= top_since
+    ).group_by(FarmAmuDaily.drug_key).order_by(func.sum(FarmAmuDaily.record_count).desc()).limit(top_limit)
+  ).all()
+  return {'total': int(total), 'recent': int(recent), 'top_drugs': [(drug_name, int(count)) for drug_name, count in top_drugs]}
+
+def rebuild_farm_usage(since=None):
+  usage_date = func.date(AntimicrobialRecord.created_at)
+  stmt = select(
+    Livestock.farmer_id, usage_date, AntimicrobialRecord.drug_name, AntimicrobialRecord.drug_category, AntimicrobialRecord.unit,
+    func.count(AntimicrobialRecord.id), func.sum(AntimicrobialRecord.dosage)
+  ).join(Livestock, Livestock.id == AntimicrobialRecord.livestock_id).group_by(
+    Livestock.farmer_id, usage_date, AntimicrobialRecord.drug_name, AntimicrobialRecord.drug_category, AntimicrobialRecord.unit
+  )
+  clear = delete(FarmAmuDaily)
+  if since:
+    stmt = stmt.where(AntimicrobialRecord.created_at >= datetime.combine(since, datetime.min.time()))
+    clear = clear.where(FarmAmuDaily.usage_date >= since)
+
+  buckets = {}
+  for farmer_id, day, drug_name, drug_category, unit, count, dosage in db.session.execute(stmt):
+    day = day if not isinstance(day, str) else datetime.strptime(day, '%Y-%m-%d').date()
+    _bucket(buckets, farmer_id, day, drug_name, drug_category, unit, count, dosage)
+  db.session.execute(clear)
+  if buckets: _upsert(buckets)
+  db.session.commit()
+  logger.info('Farm AMU rollup rebuilt', extra={'fields': {'since': since.isoformat() if since else None, 'buckets': len(buckets)}})
+  return len(buckets)
@@ -1,13 +1,10 @@
-import os
 import requests
-from dotenv import load_dotenv
-
-load_dotenv()
 
 class GeminiAIService:
-  def __init__(self):
-    self.api_key = os.getenv('GEMINI_API_KEY')
+  def __init__(self, api_key=None):
+    self.api_key = api_key
     self.base_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent'
+    self.session = requests.Session()
 
   def generate_insights(self, prompt, context_data=None):
     if not self.api_key: return {'error': 'Gemini API key not configured'}
@@ -22,7 +19,7 @@ class GeminiAIService:
     }
 
     try:
-      response = requests.post(
+      response = self.session.post(
         f"{self.base_url}?key={self.api_key}",
         headers=headers,
         json=payload,
@@ -92,4 +89,5 @@ class GeminiAIService:
     """
     return self.generate_insights(prompt)
 
-gemini_service = GeminiAIService()
\ No newline at end of file
+def create_gemini_service(config):
+  return GeminiAIService(api_key=config.get('GEMINI_API_KEY'))
\ No newline at end of file
@@ -0,0 +1,83 @@
+import hashlib, json
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.requests import TraceabilityLog, TraceabilityChainHead
+
+GENESIS_HASH = "0"
+
+def compute_hash(livestock_id, event_type, event_data, timestamp, previous_hash):
+  hash_data = {
+    'livestock_id': livestock_id,
+    'event_type': event_type,
+    'event_data': event_data,
+    'timestamp': timestamp.isoformat(),
+    'previous_hash': previous_hash
+  }
+  return hashlib.sha256(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
+
+def ledger_timestamp():
+  return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+def lock_chain_head(livestock_id):
+  head = TraceabilityChainHead.query.filter_by(livestock_id=livestock_id).with_for_update().first()
+  if head is not None: return head
+
+  last_log = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.id.desc()).first()
+  sequence = TraceabilityLog.query.filter_by(livestock_id=livestock_id).count()
+  try:
+    with db.session.begin_nested():
+      head = TraceabilityChainHead(livestock_id=livestock_id, last_hash=last_log.hash_value if last_log else GENESIS_HASH, sequence=sequence, updated_at=ledger_timestamp())
+      db.session.add(head)
+  except IntegrityError:
+    head = None
+  return head or TraceabilityChainHead.query.filter_by(livestock_id=livestock_id).with_for_update().populate_existing().first()
+
+def append_event(livestock_id, event_type, event_data, performed_by, ip_address=None):
+  head = lock_chain_head(livestock_id)
+  timestamp = ledger_timestamp()
+  previous_hash = head.last_hash
+  current_hash = compute_hash(livestock_id, event_type, event_data, timestamp, previous_hash)
+  log = TraceabilityLog(
+    livestock_id=livestock_id,
+    event_type=event_type,
+    event_data=event_data,
+    performed_by=performed_by,
+    timestamp=timestamp,
+    hash_value=current_hash,
+    previous_hash=previous_hash,
+    sequence=head.sequence + 1,
+    ip_address=ip_address
+  )
+  head.last_hash = current_hash
+  head.sequence = log.sequence
+  head.updated_at = timestamp
+  db.session.add(log)
+  return log
+
+def append_events(events, performed_by, ip_address=None):
+  livestock_ids = sorted({livestock_id for livestock_id, _, _ in events})
+  heads = {head.livestock_id: head for head in TraceabilityChainHead.query.filter(TraceabilityChainHead.livestock_id.in_(livestock_ids)).order_by(TraceabilityChainHead.livestock_id).with_for_update().all()}
+  for livestock_id in livestock_ids:
+    if livestock_id not in heads: heads[livestock_id] = lock_chain_head(livestock_id)
+
+  timestamp = ledger_timestamp()
+  logs = []
+  for livestock_id, event_type, event_data in events:
+    head = heads[livestock_id]
+    current_hash = compute_hash(livestock_id, event_type, event_data, timestamp, head.last_hash)
+    logs.append({
+      'livestock_id': livestock_id,
+      'event_type': event_type,
+      'event_data': event_data,
+      'performed_by': performed_by,
+      'timestamp': timestamp,
+      'hash_value': current_hash,
+      'previous_hash': head.last_hash,
+      'sequence': head.sequence + 1,
+      'ip_address': ip_address
+    })
+    head.last_hash, head.sequence, head.updated_at = current_hash, head.sequence + 1, timestamp
+  if logs: db.session.execute(insert(TraceabilityLog), logs)
+  return logs
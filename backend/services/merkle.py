@@ -0,0 +1,80 @@
+import hashlib
+
+def leaf_hash(data):
+  return hashlib.sha256(b'\x00' + data.encode()).hexdigest()
+
+def animal_leaf(hash_value):
+  return leaf_hash(hash_value)
+
+def daily_leaf(livestock_id, root_hash):
+  return leaf_hash(f'{livestock_id}:{root_hash}')
+
+def node_hash(left, right):
+  return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+def merkle_levels(leaves):
+  levels = [list(leaves)]
+  while len(levels[-1]) > 1:
+    level = levels[-1]
+    parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2: parents.append(level[-1])
+    levels.append(parents)
+  return levels
+
+def merkle_root(leaves):
+  if not leaves: raise ValueError('Cannot build a Merkle tree without leaves')
+  return merkle_levels(leaves)[-1][0]
+
+def audit_path(levels, index):
+  proof = []
+  for level in levels[:-1]:
+    sibling = index ^ 1
+    if sibling < len(level): proof.append({'position': 'left' if sibling < index else 'right', 'hash': level[sibling]})
+    index //= 2
+  return proof
+
+def inclusion_proof(leaves, index):
+  if not 0 <= index < len(leaves): raise IndexError('Leaf index out of range')
+  return audit_path(merkle_levels(leaves), index)
+
+def verify_inclusion(leaf, proof, root):
+  current = leaf
+  for step in proof:
+    current = node_hash(step['hash'], current) if step['position'] == 'left' else node_hash(current, step['hash'])
+  return current == root
+
+def extend_peaks(peaks, leaves, nodes=None):
+  peaks = [list(p) for p in peaks or []]
+  total = sum(size for size, _ in peaks)
+  for leaf in leaves:
+    peaks.append([1, leaf])
+    total += 1
+    if nodes is not None: nodes.append((0, total - 1, leaf))
+    while len(peaks) > 1 and peaks[-1][0] == peaks[-2][0]:
+      right = peaks.pop()
+      size = peaks[-1][0] * 2
+      peaks[-1] = [size, node_hash(peaks[-1][1], right[1])]
+      if nodes is not None: nodes.append((size.bit_length() - 1, total // size - 1, peaks[-1][1]))
+  return peaks
+
+def root_from_peaks(peaks):
+  if not peaks: raise ValueError('Cannot build a Merkle tree without leaves')
+  root = peaks[-1][1]
+  for _, peak in reversed(peaks[:-1]): root = node_hash(peak, root)
+  return root
+
+def find_peak(peaks, index):
+  start = 0
+  for position, (size, _) in enumerate(peaks):
+    if index < start + size: return position, start
+    start += size
+  raise IndexError('Leaf index out of range')
+
+def peak_siblings(index, size):
+  return [(level, (index >> level) ^ 1, 'left' if (index >> level) & 1 else 'right') for level in range(size.bit_length() - 1)]
+
+def bagged_proof(peaks, position, peak_proof):
+  proof = list(peak_proof)
+  if position < len(peaks) - 1: proof.append({'position': 'right', 'hash': root_from_peaks(peaks[position + 1:])})
+  proof.extend({'position': 'left', 'hash': peak} for _, peak in reversed(peaks[:position]))
+  return proof
@@ -0,0 +1,52 @@
+from datetime import date, datetime, timezone
+from flask import current_app
+from sqlalchemy import text
+from extensions import db
+from utils.log import get_logger
+
+logger = get_logger('db.partitions')
+PARTITIONED_TABLES = {'antimicrobial_records': 'start_date', 'alerts': 'created_at'}
+
+def month_start(day):
+  return day.replace(day=1)
+
+def add_months(month, months):
+  index = month.year * 12 + month.month - 1 + months
+  return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+  return f'{table}_p{month:%Y_%m}'
+
+def partitioning_supported():
+  return db.engine.dialect.name == 'postgresql'
+
+def is_partitioned(table):
+  return db.session.execute(text('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)'), {'table': table}).first() is not None
+
+def existing_partitions(table):
+  rows = db.session.execute(text('SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)'), {'table': table})
+  return {name for (name,) in rows}
+
+def create_partition(table, column, month):
+  name, lower, upper = partition_name(table, month), month, add_months(month, 1)
+  db.session.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+  moved = db.session.execute(text(
+    f'WITH moved AS (DELETE FROM {table}_default WHERE {column} >= :lower AND {column} < :upper RETURNING *) INSERT INTO {name} SELECT * FROM moved'
+  ), {'lower': lower, 'upper': upper}).rowcount
+  db.session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+  db.session.commit()
+  logger.info('Partition created', extra={'fields': {'table': table, 'partition': name, 'moved_rows': moved}})
+  return name
+
+def ensure_partitions(months_ahead=None):
+  if not partitioning_supported(): return []
+  months_ahead = current_app.config.get('PARTITION_MONTHS_AHEAD', 3) if months_ahead is None else months_ahead
+  current = month_start(datetime.now(timezone.utc).date())
+  created = []
+  for table, column in PARTITIONED_TABLES.items():
+    if not is_partitioned(table): continue
+    existing = existing_partitions(table)
+    for offset in range(months_ahead + 1):
+      month = add_months(current, offset)
+      if partition_name(table, month) not in existing: created.append(create_partition(table, column, month))
+  return created
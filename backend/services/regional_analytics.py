@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, func, delete, insert, or_
+from extensions import db
+from models.amu import AntimicrobialRecord
+from models.livestock import Livestock
+from models.user import Farmer
+from models.requests import Alert
+from models.analytics import RegionalAnalytics, RegionalAnalyticsRun
+from utils.log import get_logger
+
+logger = get_logger('analytics.regional')
+NATIONAL = 'All'
+DEFAULT_COMPLIANCE_RATE = 95.0
+
+def analytics_today():
+  return datetime.now(timezone.utc).date()
+
+def _now():
+  return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _as_date(value):
+  return value if not isinstance(value, str) else datetime.strptime(value, '%Y-%m-%d').date()
+
+def _regions(state, district):
+  yield 'national', NATIONAL, None, None
+  if state: yield 'state', state, state, None
+  if district: yield 'district', district, state, district
+
+def compute_compliance_rate(total_farms, violating_farms):
+  if not total_farms: return DEFAULT_COMPLIANCE_RATE
+  return round((total_farms - violating_farms) / total_farms * 100, 2)
+
+def aggregate_day(day):
+  start = datetime.combine(day, datetime.min.time())
+  end = start + timedelta(days=1)
+  buckets = {}
+
+  def bucket(state, district):
+    for level, region, row_state, row_district in _regions(state, district):
+      yield buckets.setdefault((level, row_state, row_district), {
+        'region_level': level, 'region': region, 'state': row_state, 'district': row_district,
+        'total_farms': 0, 'total_livestock': 0, 'amu_usage_count': 0, 'mrl_violations_count': 0,
+        'violating_farms': set(), 'drug_categories': {}, 'amu_species': {}, 'livestock_species': {}
+      })
+
+  farms = db.session.execute(
+    select(Farmer.state, Farmer.district, func.count(Farmer.id)).where(Farmer.created_at < end).group_by(Farmer.state, Farmer.district)
+  )
+  for state, district, count in farms:
+    for b in bucket(state, district): b['total_farms'] += count
+
+  livestock = db.session.execute(
+    select(Farmer.state, Farmer.district, Livestock.species, func.count(Livestock.id)).join(Farmer, Farmer.id == Livestock.farmer_id).where(
+      Livestock.is_active == True, Livestock.created_at < end
+    ).group_by(Farmer.state, Farmer.district, Livestock.species)
+  )
+  for state, district, species, count in livestock:
+    for b in bucket(state, district):
+      b['total_livestock'] += count
+      b['livestock_species'][species] = b['livestock_species'].get(species, 0) + count
+
+  usage = db.session.execute(
+    select(Farmer.state, Farmer.district, AntimicrobialRecord.drug_category, Livestock.species, func.count(AntimicrobialRecord.id)).join(
+      Livestock, Livestock.id == AntimicrobialRecord.livestock_id
+    ).join(Farmer, Farmer.id == Livestock.farmer_id).where(AntimicrobialRecord.start_date == day).group_by(Farmer.state, Farmer.district, AntimicrobialRecord.drug_category, Livestock.species)
+  )
+  for state, district, category, species, count in usage:
+    category = category or 'uncategorized'
+    for b in bucket(state, district):
+      b['amu_usage_count'] += count
+      b['drug_categories'][category] = b['drug_categories'].get(category, 0) + count
+      b['amu_species'][species] = b['amu_species'].get(species, 0) + count
+
+  violations = db.session.execute(
+    select(Farmer.state, Farmer.district, Alert.farmer_id, func.count(Alert.id)).join(Farmer, Farmer.id == Alert.farmer_id).where(
+      Alert.alert_type == 'mrl_breach', Alert.created_at >= start, Alert.created_at < end
+    ).group_by(Farmer.state, Farmer.district, Alert.farmer_id)
+  )
+  for state, district, farmer_id, count in violations:
+    for b in bucket(state, district):
+      b['mrl_violations_count'] += count
+      b['violating_farms'].add(farmer_id)
+
+  generated_at = _now()
+  rows = []
+  for b in buckets.values():
+    rows.append({
+      'region_level': b['region_level'], 'region': b['region'], 'state': b['state'], 'district': b['district'], 'analysis_date': day,
+      'total_farms': b['total_farms'], 'total_livestock': b['total_livestock'],
+      'amu_usage_count': b['amu_usage_count'], 'mrl_violations_count': b['mrl_violations_count'],
+      'compliance_rate': compute_compliance_rate(b['total_farms'], len(b['violating_farms'])),
+      'analytics_data': {
+        'drug_categories': b['drug_categories'], 'amu_species': b['amu_species'],
+        'livestock_species': b['livestock_species'], 'violating_farms': sorted(b['violating_farms'])
+      },
+      'generated_at': generated_at
+    })
+  return rows
+
+def refresh_day(day):
+  rows = aggregate_day(day)
+  db.session.execute(delete(RegionalAnalytics).where(RegionalAnalytics.analysis_date == day))
+  if rows: db.session.execute(insert(RegionalAnalytics), rows)
+  db.session.commit()
+  return len(rows)
+
+def _since_mark(model, last_id, lagged_from):
+  # Ids are allocated at insert but become visible at commit, so a row below the last run's max id can still have been
+  # in flight then. Rows created within the commit lag before that run started are rescanned as well.
+  if lagged_from is None: return model.id > last_id
+  return or_(model.id > last_id, model.created_at >= lagged_from)
+
+def changed_days(last_run):
+  today = analytics_today()
+  days = {today, today - timedelta(days=1)}
+  last_amu_record_id, last_alert_id = (last_run.last_amu_record_id, last_run.last_alert_id) if last_run else (0, 0)
+  lagged_from = last_run.started_at - timedelta(seconds=current_app.config.get('ANALYTICS_COMMIT_LAG_SECONDS', 300)) if last_run else None
+  amu_days = select(AntimicrobialRecord.start_date).where(_since_mark(AntimicrobialRecord, last_amu_record_id, lagged_from)).distinct()
+  alert_days = select(func.date(Alert.created_at)).where(_since_mark(Alert, last_alert_id, lagged_from), Alert.alert_type == 'mrl_breach').distinct()
+  for stmt in (amu_days, alert_days): days.update(_as_date(day) for (day,) in db.session.execute(stmt) if day is not None)
+  return sorted(day for day in days if day <= today)
+
+def refresh_regional_analytics(since=None):
+  last_run = RegionalAnalyticsRun.query.filter_by(status='completed').order_by(RegionalAnalyticsRun.id.desc()).first()
+  run = RegionalAnalyticsRun(
+    status='running', started_at=_now(),
+    last_amu_record_id=db.session.query(func.coalesce(func.max(AntimicrobialRecord.id), 0)).scalar(),
+    last_alert_id=db.session.query(func.coalesce(func.max(Alert.id), 0)).scalar()
+  )
+  db.session.add(run)
+  db.session.commit()
+  try:
+    if since: days = [since + timedelta(days=offset) for offset in range((analytics_today() - since).days + 1)]
+    else: days = changed_days(last_run)
+    for day in days:
+      run.rows_written += refresh_day(day)
+      run.days_processed += 1
+  except Exception as e:
+    db.session.rollback()
+    run.status, run.error, run.finished_at = 'failed', str(e), _now()
+    db.session.commit()
+    logger.exception('Regional analytics refresh failed', extra={'fields': {'run_id': run.id}})
+    raise
+  run.status, run.finished_at = 'completed', _now()
+  db.session.commit()
+  logger.info('Regional analytics refreshed', extra={'fields': {'run_id': run.id, 'days': run.days_processed, 'rows': run.rows_written}})
+  return run
+
+def region_filters(district=None, state=None):
+  if district:
+    filters = [RegionalAnalytics.region_level == 'district', RegionalAnalytics.district == district]
+    if state: filters.append(RegionalAnalytics.state == state)
+    return filters
+  if state: return [RegionalAnalytics.region_level == 'state', RegionalAnalytics.state == state]
+  return [RegionalAnalytics.region_level == 'national']
+
+def region_window(district=None, state=None, days=30):
+  since = analytics_today() - timedelta(days=days - 1)
+  return RegionalAnalytics.query.filter(*region_filters(district, state), RegionalAnalytics.analysis_date >= since).all()
+
+def latest_region_snapshot(district=None, state=None):
+  latest = db.session.query(func.max(RegionalAnalytics.analysis_date)).filter(*region_filters(district, state)).scalar()
+  if latest is None: return []
+  return RegionalAnalytics.query.filter(*region_filters(district, state), RegionalAnalytics.analysis_date == latest).all()
+
+def merge_counts(rows, field):
+  merged = {}
+  for row in rows:
+    for key, count in ((row.analytics_data or {}).get(field) or {}).items(): merged[key] = merged.get(key, 0) + count
+  return merged
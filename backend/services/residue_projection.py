@@ -0,0 +1,65 @@
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select
+from extensions import db
+from models.amu import AntimicrobialRecord
+from models.livestock import Livestock
+from models.user import Farmer
+from services.withdrawal_periods import withdrawal_periods, normalize_drug
+
+def residue_ratios(days_since_end, withdrawal_days, peak_ratio):
+  decay = np.log(peak_ratio) / withdrawal_days
+  return peak_ratio * np.exp(-decay[:, None] * np.maximum(days_since_end, 0))
+
+def superpose(curves, groups, group_count):
+  return np.stack([np.bincount(groups, weights=curves[:, day], minlength=group_count) for day in range(curves.shape[1])], axis=1) if len(curves) else np.zeros((group_count, curves.shape[1]))
+
+def first_safe_day(curves):
+  above = curves > 1.0
+  last_above = np.where(above.any(axis=1), curves.shape[1] - 1 - np.argmax(above[:, ::-1], axis=1), -1)
+  return np.where(last_above < curves.shape[1] - 1, last_above + 1, -1)
+
+def _active_records(today, district=None, state=None, farmer_id=None):
+  stmt = select(
+    AntimicrobialRecord.livestock_id, Livestock.rfid_tag, Livestock.species, AntimicrobialRecord.drug_name,
+    AntimicrobialRecord.start_date, AntimicrobialRecord.duration_days, AntimicrobialRecord.withdrawal_end_date
+  ).join(Livestock, Livestock.id == AntimicrobialRecord.livestock_id).join(Farmer, Farmer.id == Livestock.farmer_id).where(
+    AntimicrobialRecord.withdrawal_end_date >= today, Livestock.is_active == True
+  )
+  if farmer_id is not None: stmt = stmt.where(Farmer.id == farmer_id)
+  if district: stmt = stmt.where(Farmer.district == district)
+  if state: stmt = stmt.where(Farmer.state == state)
+  return db.session.execute(stmt.order_by(AntimicrobialRecord.livestock_id).execution_options(stream_results=True, yield_per=current_app.config.get('AMU_METRICS_CHUNK', 100000)))
+
+def project_residues(horizon_days=None, district=None, state=None, farmer_id=None):
+  horizon_days = horizon_days or current_app.config.get('AMU_RESIDUE_HORIZON_DAYS', 30)
+  peak_ratio = float(current_app.config.get('AMU_RESIDUE_PEAK_RATIO', 100.0))
+  today = datetime.now(timezone.utc).date()
+
+  groups, group_index, group_codes, treatment_ends, withdrawal_days = [], {}, [], [], []
+  for livestock_id, rfid_tag, species, drug_name, start_date, duration_days, withdrawal_end_date in _active_records(today, district, state, farmer_id):
+    treatment_end = start_date + timedelta(days=duration_days or 0)
+    for period in withdrawal_periods.tissues(drug_name, species):
+      if not period.withdrawal_period_days: continue
+      key = (livestock_id, normalize_drug(drug_name), period.tissue_type)
+      if key not in group_index:
+        group_index[key] = len(groups)
+        groups.append({'livestock_id': livestock_id, 'rfid_tag': rfid_tag, 'species': species, 'drug_name': drug_name, 'tissue_type': period.tissue_type, 'mrl_value': period.mrl_value, 'mrl_unit': period.mrl_unit, 'withdrawal_end_date': withdrawal_end_date})
+      group = groups[group_index[key]]
+      group['withdrawal_end_date'] = max(group['withdrawal_end_date'], withdrawal_end_date)
+      group_codes.append(group_index[key])
+      treatment_ends.append((treatment_end - today).days)
+      withdrawal_days.append(period.withdrawal_period_days)
+
+  days = np.arange(horizon_days)
+  days_since_end = days[None, :] - np.array(treatment_ends, dtype=float)[:, None]
+  curves = superpose(residue_ratios(days_since_end, np.array(withdrawal_days, dtype=float), peak_ratio), np.array(group_codes, dtype=np.int64), len(groups))
+  safe_days = first_safe_day(curves)
+
+  for group, curve, safe_day in zip(groups, curves, safe_days):
+    group['safe_from'] = (today + timedelta(days=int(safe_day))).isoformat() if safe_day >= 0 else None
+    group['withdrawal_end_date'] = group['withdrawal_end_date'].isoformat()
+    group['residue_ratio'] = np.round(curve, 4).tolist()
+    group['estimated_residue'] = np.round(curve * group['mrl_value'], 4).tolist() if group['mrl_value'] else None
+  return {'start_date': today.isoformat(), 'horizon_days': horizon_days, 'peak_ratio': peak_ratio, 'projections': groups}
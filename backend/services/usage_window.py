@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, func, tuple_, delete
+from extensions import db
+from models.amu import AntimicrobialRecord, AntimicrobialUsageDaily
+from services.withdrawal_periods import normalize_drug
+from utils.upsert import upsert_increment
+from utils.log import get_logger
+
+logger = get_logger('amu.usage')
+
+def usage_rule(drug_category=None):
+  config = current_app.config
+  rule = config.get('AMU_USAGE_RULES', {}).get((drug_category or '').strip().lower(), {})
+  return rule.get('threshold', config.get('AMU_USAGE_THRESHOLD', 3)), rule.get('window_days', config.get('AMU_USAGE_WINDOW_DAYS', 30))
+
+def max_window_days():
+  config = current_app.config
+  return max([config.get('AMU_USAGE_WINDOW_DAYS', 30)] + [rule.get('window_days', 0) for rule in config.get('AMU_USAGE_RULES', {}).values()])
+
+def usage_today():
+  return datetime.now(timezone.utc).date()
+
+def _upsert(rows):
+  upsert_increment(AntimicrobialUsageDaily.__table__, rows, ('livestock_id', 'drug_key', 'usage_date'), ('usage_count',))
+
+def record_usage(entries, usage_date=None):
+  usage_date = usage_date or usage_today()
+  counts = {}
+  for livestock_id, drug_name in entries:
+    key = (livestock_id, normalize_drug(drug_name))
+    counts[key] = counts.get(key, 0) + 1
+  if counts: _upsert([{'livestock_id': livestock_id, 'drug_key': drug_key, 'usage_date': usage_date, 'usage_count': count} for (livestock_id, drug_key), count in counts.items()])
+  return counts
+
+def window_counts(keys, window_days, today=None):
+  today = today or usage_today()
+  keys = {(livestock_id, normalize_drug(drug_name)) for livestock_id, drug_name in keys}
+  if not keys: return {}
+  rows = db.session.execute(
+    select(AntimicrobialUsageDaily.livestock_id, AntimicrobialUsageDaily.drug_key, func.sum(AntimicrobialUsageDaily.usage_count)).where(
+      tuple_(AntimicrobialUsageDaily.livestock_id, AntimicrobialUsageDaily.drug_key).in_(keys),
+      AntimicrobialUsageDaily.usage_date > today - timedelta(days=window_days)
+    ).group_by(AntimicrobialUsageDaily.livestock_id, AntimicrobialUsageDaily.drug_key)
+  ).all()
+  return {(livestock_id, drug_key): int(total) for livestock_id, drug_key, total in rows}
+
+def excessive_usage(records):
+  record_usage([(livestock_id, drug_name) for livestock_id, drug_name, _ in records])
+  rules = {}
+  for livestock_id, drug_name, drug_category in records: rules.setdefault((livestock_id, normalize_drug(drug_name)), (drug_name, *usage_rule(drug_category)))
+  by_window = {}
+  for key, (_, _, window_days) in rules.items(): by_window.setdefault(window_days, []).append(key)
+
+  flagged = {}
+  for window_days, keys in by_window.items():
+    for key, total in window_counts(keys, window_days).items():
+      drug_name, threshold, _ = rules[key]
+      if total >= threshold: flagged[key] = {'drug_name': drug_name, 'count': total, 'threshold': threshold, 'window_days': window_days}
+  return flagged
+
+def rebuild_usage():
+  today = usage_today()
+  since = today - timedelta(days=max_window_days() - 1)
+  usage_date = func.date(AntimicrobialRecord.created_at)
+  rows = db.session.execute(
+    select(AntimicrobialRecord.livestock_id, AntimicrobialRecord.drug_name, usage_date, func.count(AntimicrobialRecord.id)).where(
+      AntimicrobialRecord.created_at >= datetime.combine(since, datetime.min.time())
+    ).group_by(AntimicrobialRecord.livestock_id, AntimicrobialRecord.drug_name, usage_date)
+  ).all()
+  buckets = {}
+  for livestock_id, drug_name, day, count in rows:
+    day = day if not isinstance(day, str) else datetime.strptime(day, '%Y-%m-%d').date()
+    key = (livestock_id, normalize_drug(drug_name), day)
+    buckets[key] = buckets.get(key, 0) + count
+  db.session.execute(delete(AntimicrobialUsageDaily))
+  if buckets: _upsert([{'livestock_id': l, 'drug_key': d, 'usage_date': day, 'usage_count': c} for (l, d, day), c in buckets.items()])
+  db.session.commit()
+  logger.info('AMU usage window rebuilt', extra={'fields': {'since': since.isoformat(), 'buckets': len(buckets)}})
+  return len(buckets)
+
+def prune_usage():
+  cutoff = usage_today() - timedelta(days=max_window_days())
+  result = db.session.execute(delete(AntimicrobialUsageDaily).where(AntimicrobialUsageDaily.usage_date <= cutoff))
+  db.session.commit()
+  return result.rowcount
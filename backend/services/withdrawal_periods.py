@@ -0,0 +1,76 @@
+import threading, time
+from collections import namedtuple
+from sqlalchemy import event, func, select
+from extensions import db
+from models.amu import WithdrawalPeriod
+
+Period = namedtuple('Period', ['drug_name', 'species', 'tissue_type', 'withdrawal_period_days', 'mrl_value', 'mrl_unit'])
+
+def normalize_drug(drug_name):
+  return (drug_name or '').strip().lower()
+
+class WithdrawalPeriodTable:
+  def __init__(self, check_interval=60):
+    self.check_interval = check_interval
+    self._periods = {}
+    self._strictest = {}
+    self._by_drug = {}
+    self._version = None
+    self._checked_at = 0
+    self._stale = True
+    self._lock = threading.Lock()
+
+  def init_app(self, app):
+    self.check_interval = app.config.get('WITHDRAWAL_CACHE_CHECK_SECONDS', self.check_interval)
+    app.extensions['withdrawal_periods'] = self
+
+  def lookup(self, drug_name, species, tissue_type=None):
+    self._ensure_fresh()
+    if tissue_type: return self._periods.get((normalize_drug(drug_name), species, tissue_type))
+    return self._strictest.get((normalize_drug(drug_name), species))
+
+  def tissues(self, drug_name, species):
+    self._ensure_fresh()
+    return self._by_drug.get((normalize_drug(drug_name), species), ())
+
+  def invalidate(self):
+    self._stale = True
+
+  @property
+  def version(self):
+    return self._version
+
+  def _ensure_fresh(self):
+    if not self._stale and time.monotonic() - self._checked_at < self.check_interval: return
+    with self._lock:
+      if not self._stale and time.monotonic() - self._checked_at < self.check_interval: return
+      version = tuple(db.session.execute(select(func.count(WithdrawalPeriod.id), func.max(WithdrawalPeriod.id), func.max(WithdrawalPeriod.updated_at))).one())
+      if self._stale or version != self._version: self._load(version)
+      self._checked_at = time.monotonic()
+
+  def _load(self, version):
+    periods, strictest = {}, {}
+    rows = db.session.execute(select(
+      WithdrawalPeriod.drug_name, WithdrawalPeriod.species, WithdrawalPeriod.tissue_type,
+      WithdrawalPeriod.withdrawal_period_days, WithdrawalPeriod.mrl_value, WithdrawalPeriod.mrl_unit
+    )).all()
+    for row in rows:
+      period = Period(*row)
+      drug = normalize_drug(period.drug_name)
+      key = (drug, period.species, period.tissue_type)
+      if key not in periods or period.withdrawal_period_days > periods[key].withdrawal_period_days: periods[key] = period
+      current = strictest.get((drug, period.species))
+      if current is None or period.withdrawal_period_days > current.withdrawal_period_days: strictest[(drug, period.species)] = period
+    by_drug = {}
+    for (drug, species, _), period in periods.items(): by_drug.setdefault((drug, species), []).append(period)
+    self._periods, self._strictest, self._by_drug = periods, strictest, by_drug
+    self._version = version
+    self._stale = False
+
+withdrawal_periods = WithdrawalPeriodTable()
+
+@event.listens_for(WithdrawalPeriod, 'after_insert')
+@event.listens_for(WithdrawalPeriod, 'after_update')
+@event.listens_for(WithdrawalPeriod, 'after_delete')
+def invalidate_withdrawal_periods(mapper, connection, target):
+  withdrawal_periods.invalidate()
@@ -1,15 +1,23 @@
+import base64, hashlib
 from cryptography.fernet import Fernet
-import os
+from extensions import cipher
+from utils.log import get_logger
 
-encryption_key = os.getenv('AADHAAR_ENCRYPTION_KEY')
-if not encryption_key:
-  encryption_key = Fernet.generate_key().decode()
-  print(f"Generated new encryption key: {encryption_key}")
-  print("Add this to your .env file as AADHAAR_ENCRYPTION_KEY")
-else:
-  encryption_key = encryption_key.encode()
+logger = get_logger('encryption')
 
-cipher = Fernet(encryption_key)
+def derived_key(secret_key):
+  return base64.urlsafe_b64encode(hashlib.sha256(f'aadhaar:{secret_key}'.encode()).digest())
+
+def create_cipher(config):
+  encryption_key = config.get('AADHAAR_ENCRYPTION_KEY')
+  if not encryption_key: return Fernet(derived_key(config['SECRET_KEY']))
+  return Fernet(encryption_key.encode())
+
+def init_cipher(app):
+  if not app.config.get('AADHAAR_ENCRYPTION_KEY'):
+    if not (app.debug or app.testing): raise RuntimeError('AADHAAR_ENCRYPTION_KEY must be set outside development and testing')
+    logger.warning('AADHAAR_ENCRYPTION_KEY not set; deriving the Aadhaar key from SECRET_KEY. Add a persistent key to your .env file')
+  cipher.init_app(app)
 
 def encrypt_aadhaar(aadhaar_number):
   if not aadhaar_number:
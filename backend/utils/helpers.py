@@ -1,12 +1,10 @@
-import hashlib, json
 from datetime import datetime, timedelta, timezone
 from flask import request, g
-from extensions import db
-from ..models.requests import TraceabilityLog
-from ..models.amu import WithdrawalPeriod
+from services.ledger import append_event, append_events
+from services.withdrawal_periods import withdrawal_periods
 
-def calculate_withdrawal_end_date(drug_name, species, start_date, duration_days):
-  withdrawal_period = WithdrawalPeriod.query.filter_by(drug_name=drug_name, species=species).first()
+def calculate_withdrawal_end_date(drug_name, species, start_date, duration_days, tissue_type=None):
+  withdrawal_period = withdrawal_periods.lookup(drug_name, species, tissue_type)
   if withdrawal_period:
     end_date = start_date + timedelta(days=duration_days)
     withdrawal_end = end_date + timedelta(days=withdrawal_period.withdrawal_period_days)
@@ -14,27 +12,10 @@ def calculate_withdrawal_end_date(drug_name, species, start_date, duration_days)
   return None, None
 
 def create_traceability_log(livestock_id, event_type, event_data):
-  last_log = TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(TraceabilityLog.timestamp.desc()).first()
-  previous_hash = last_log.hash_value if last_log else "0"
-  hash_data = {
-    'livestock_id': livestock_id,
-    'event_type': event_type,
-    'event_data': event_data,
-    'timestamp': datetime.now(timezone.utc).isoformat(),
-    'previous_hash': previous_hash
-  }
-  current_hash = hashlib.sha256(json.dumps(hash_data, sort_keys=True).encode()).hexdigest()
-  log = TraceabilityLog(
-    livestock_id=livestock_id,
-    event_type=event_type,
-    event_data=event_data,
-    performed_by=g.current_user.id,
-    hash_value=current_hash,
-    previous_hash=previous_hash,
-    ip_address=request.remote_addr
-  )
-  db.session.add(log)
-  return log
+  return append_event(livestock_id, event_type, event_data, performed_by=g.principal.user_id, ip_address=request.remote_addr)
+
+def create_traceability_logs(events):
+  return append_events(events, performed_by=g.principal.user_id, ip_address=request.remote_addr)
 
 def generate_unique_id(prefix, length=10):
   import random, string
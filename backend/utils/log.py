@@ -0,0 +1,78 @@
+import atexit, json, logging, os, queue, random, sys, time
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request
+
+LOGGER_NAME = 'cattlesense'
+_listener = None
+
+def get_logger(name=None):
+  return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+class JsonFormatter(logging.Formatter):
+  def format(self, record):
+    entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name, 'msg': record.getMessage()}
+    entry.update(getattr(record, 'fields', {}))
+    if record.exc_info: entry['exc'] = self.formatException(record.exc_info)
+    return json.dumps(entry, default=str)
+
+AUTH_FAILURES = {'missing_token', 'invalid', 'expired', 'revoked', 'error'}
+
+class SamplingFilter(logging.Filter):
+  def __init__(self, rate=1.0, warning_rate=1.0):
+    super().__init__()
+    self.rate = rate
+    self.warning_rate = warning_rate
+
+  def filter(self, record):
+    if record.levelno >= logging.ERROR: return True
+    rate = self.warning_rate if record.levelno >= logging.WARNING else self.rate
+    return rate >= 1.0 or random.random() < rate
+
+def init_logging(app):
+  global _listener
+  logger = get_logger()
+  logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+  logger.propagate = False
+  for handler in list(logger.handlers): logger.removeHandler(handler)
+
+  stream_handler = logging.StreamHandler(sys.stdout)
+  stream_handler.setFormatter(JsonFormatter())
+  log_queue = queue.SimpleQueue()
+  logger.addHandler(QueueHandler(log_queue))
+  _stop_listener()
+  _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+  _listener.start()
+
+  request_logger = get_logger('request')
+  for f in list(request_logger.filters): request_logger.removeFilter(f)
+  request_logger.addFilter(SamplingFilter(app.config.get('LOG_REQUEST_SAMPLE_RATE', 1.0), app.config.get('LOG_AUTH_FAILURE_SAMPLE_RATE', 1.0)))
+
+  @app.before_request
+  def start_request_timer():
+    g.request_started = time.perf_counter()
+
+  @app.after_request
+  def log_request(response):
+    started = g.get('request_started')
+    fields = {
+      'method': request.method,
+      'path': request.path,
+      'status': response.status_code,
+      'latency_ms': round((time.perf_counter() - started) * 1000, 2) if started else None,
+      'auth': g.get('auth_outcome'),
+      'user_id': g.principal.user_id if g.get('principal') else None
+    }
+    level = logging.ERROR if response.status_code >= 500 else logging.WARNING if g.get('auth_outcome') in AUTH_FAILURES else logging.INFO
+    request_logger.log(level, 'request', extra={'fields': fields})
+    return response
+
+def _stop_listener():
+  if _listener and _listener._thread is not None: _listener.stop()
+
+def _restart_listener_after_fork():
+  if _listener and _listener._thread is not None:
+    _listener._thread = None
+    _listener.start()
+
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
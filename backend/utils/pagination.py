@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from flask import current_app, request
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import and_, or_
+
+class InvalidCursor(ValueError):
+  pass
+
+def page_size():
+  per_page = request.args.get('per_page', current_app.config.get('PAGINATION_DEFAULT', 20), type=int)
+  return max(1, min(per_page, current_app.config.get('PAGINATION_MAX', 100)))
+
+def _serializer():
+  return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='list-cursor')
+
+def _encode_value(value):
+  if isinstance(value, datetime): return ['datetime', value.isoformat()]
+  if isinstance(value, date): return ['date', value.isoformat()]
+  return [None, value]
+
+def _decode_value(kind, value):
+  if kind == 'datetime': return datetime.fromisoformat(value)
+  if kind == 'date': return date.fromisoformat(value)
+  return value
+
+def encode_cursor(scope, sort_value, row_id):
+  return _serializer().dumps([scope, *_encode_value(sort_value), row_id])
+
+def decode_cursor(scope, token):
+  try:
+    cursor_scope, kind, value, row_id = _serializer().loads(token)
+    sort_value, row_id = _decode_value(kind, value), int(row_id)
+  except (BadSignature, TypeError, ValueError): raise InvalidCursor('Invalid cursor')
+  if cursor_scope != scope: raise InvalidCursor('Invalid cursor')
+  return sort_value, row_id
+
+def _nullable(sort_column):
+  return getattr(sort_column.expression, 'nullable', False)
+
+def _after(sort_column, id_column, sort_value, row_id, descending):
+  next_id = id_column < row_id if descending else id_column > row_id
+  if sort_value is None: return and_(sort_column.is_(None), next_id)
+  after = or_(sort_column < sort_value if descending else sort_column > sort_value, and_(sort_column == sort_value, next_id))
+  return or_(after, sort_column.is_(None)) if _nullable(sort_column) else after
+
+def paginate_request(query, scope, sort_column, id_column, descending=True):
+  per_page = page_size()
+  order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+  if sort_column is id_column: order = order[1:]
+  # NULL sort values go last in both directions on every dialect, so a cursor can resume inside them.
+  elif _nullable(sort_column): order = (sort_column.is_(None), *order)
+  if 'cursor' not in request.args:
+    pagination = query.order_by(*order).paginate(page=request.args.get('page', 1, type=int), per_page=per_page, error_out=False)
+    return pagination.items, {'total': pagination.total, 'page': pagination.page, 'pages': pagination.pages, 'per_page': per_page}
+
+  page_query = query
+  if request.args['cursor']:
+    sort_value, row_id = decode_cursor(scope, request.args['cursor'])
+    page_query = page_query.filter(_after(sort_column, id_column, sort_value, row_id, descending))
+  rows = page_query.order_by(*order).limit(per_page + 1).all()
+  items = rows[:per_page]
+  last = items[-1] if len(rows) > per_page else None
+  meta = {'next_cursor': encode_cursor(scope, getattr(last, sort_column.key), getattr(last, id_column.key)) if last else None, 'per_page': per_page}
+  if request.args.get('include_total') in ('1', 'true'): meta['total'] = query.order_by(None).count()
+  return items, meta
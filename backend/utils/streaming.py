@@ -0,0 +1,34 @@
+import json
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SSE_MIMETYPE = 'text/event-stream'
+
+def wants_ndjson():
+  return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def iter_ndjson(rows, serialize, batch_size=None):
+  batch_size = batch_size or current_app.config.get('STREAM_BATCH_SIZE', 500)
+  if hasattr(rows, 'yield_per'): rows = rows.yield_per(batch_size)
+  lines = []
+  for row in rows:
+    lines.append(json.dumps(serialize(row), default=str))
+    if len(lines) >= batch_size:
+      yield '\n'.join(lines) + '\n'
+      lines = []
+  if lines: yield '\n'.join(lines) + '\n'
+
+def ndjson_response(rows, serialize, batch_size=None):
+  return Response(stream_with_context(iter_ndjson(rows, serialize, batch_size)), mimetype=NDJSON_MIMETYPE)
+
+def attachment_response(chunks, mimetype, filename):
+  return Response(stream_with_context(chunks), mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def sse_event(data, event=None, event_id=None):
+  lines = [f'id: {event_id}'] if event_id is not None else []
+  if event: lines.append(f'event: {event}')
+  lines.append(f'data: {json.dumps(data, default=str)}')
+  return '\n'.join(lines) + '\n\n'
+
+def event_stream_response(events):
+  return Response(stream_with_context(events), mimetype=SSE_MIMETYPE, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
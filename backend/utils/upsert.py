@@ -0,0 +1,21 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from extensions import db
+
+UPSERT_DIALECTS = {'mysql': mysql, 'postgresql': postgresql, 'sqlite': sqlite}
+UPSERT_CHUNK = 1000
+
+def upsert_increment(table, rows, key_columns, increment_columns, chunk_size=UPSERT_CHUNK):
+  dialect = UPSERT_DIALECTS[db.session.get_bind().dialect.name]
+  for start in range(0, len(rows), chunk_size):
+    stmt = dialect.insert(table).values(rows[start:start + chunk_size])
+    if dialect is mysql: stmt = stmt.on_duplicate_key_update({column: table.c[column] + stmt.inserted[column] for column in increment_columns})
+    else: stmt = stmt.on_conflict_do_update(index_elements=[table.c[column] for column in key_columns], set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns})
+    db.session.execute(stmt)
+
+def insert_ignore(table, rows, key_columns, chunk_size=UPSERT_CHUNK):
+  dialect = UPSERT_DIALECTS[db.session.get_bind().dialect.name]
+  for start in range(0, len(rows), chunk_size):
+    stmt = dialect.insert(table).values(rows[start:start + chunk_size])
+    if dialect is mysql: stmt = stmt.on_duplicate_key_update({column: table.c[column] for column in key_columns})
+    else: stmt = stmt.on_conflict_do_nothing(index_elements=[table.c[column] for column in key_columns])
+    db.session.execute(stmt)
@@ -0,0 +1,55 @@
+import pytest
+from types import SimpleNamespace
+from flask import Flask
+import extensions
+from extensions import LazyService
+
+def counting_factory(calls):
+  def factory(config):
+    calls.append(config)
+    return object()
+  return factory
+
+@pytest.fixture
+def pid(monkeypatch):
+  current = SimpleNamespace(value=1000)
+  monkeypatch.setattr(extensions, 'os', SimpleNamespace(getpid=lambda: current.value, environ={}))
+  return current
+
+def test_factory_runs_once_per_process(pid):
+  calls = []
+  service = LazyService('probe', counting_factory(calls))
+  assert not service.initialized
+  first = service.get()
+  assert service.get() is first and len(calls) == 1 and service.initialized
+
+  pid.value = 1001
+  assert not service.initialized
+  child = service.get()
+  assert child is not first and len(calls) == 2
+  assert service.get() is child
+
+def test_factory_reads_app_config(pid):
+  calls = []
+  app = Flask(__name__)
+  service = LazyService('probe', counting_factory(calls))
+  service.init_app(app)
+  service.get()
+  assert calls == [app.config] and app.extensions['probe'] is service
+  service.reset()
+  with app.app_context(): service.get()
+  assert len(calls) == 2
+
+def test_string_factory_is_imported(pid):
+  service = LazyService('probe', 'collections:OrderedDict')
+  assert service.get() == {}
+
+@pytest.mark.parametrize('factory,error,match', [
+  ('collections.OrderedDict', ValueError, 'must look like "module:attr"'),
+  (':OrderedDict', ValueError, 'must look like "module:attr"'),
+  ('collections:', ValueError, 'must look like "module:attr"'),
+  ('no_such_module:factory', ImportError, 'no_such_module:factory.*"probe"'),
+  ('collections:no_such_factory', ImportError, 'collections:no_such_factory.*"probe"'),
+])
+def test_bad_factory_string_fails_clearly(factory, error, match):
+  with pytest.raises(error, match=match): LazyService('probe', factory).get()
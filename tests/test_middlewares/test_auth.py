@@ -0,0 +1,172 @@
+import pytest, time
+from dataclasses import asdict
+from flask import Flask, g, jsonify
+from sqlalchemy import event, update
+import models
+from extensions import db
+from middlewares import auth
+from middlewares.token_verifier import PublicKeysUnavailable
+from routes.onboarding import onboarding_bp
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': 'uid_1', 'email': 'farmer@test.com', 'exp': time.time() + 3600})
+  with app.app_context():
+    db.create_all()
+    user = models.User(firebase_uid='uid_1', email='farmer@test.com', name='Asha', role='farmer', is_profile_complete=True, onboarding_step=3)
+    user.farmer = models.Farmer(farm_name='Green Acres')
+    db.session.add(user)
+    db.session.commit()
+    yield app
+  auth.token_cache.clear()
+
+def test_cache_hit_builds_principal_without_queries(app):
+  with app.test_request_context():
+    assert auth.authenticate('token') == 'ok'
+    expected = g.principal
+
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  with app.test_request_context():
+    assert auth.authenticate('token') == 'cache_hit'
+    assert g.principal == expected
+    assert (g.principal.role, g.principal.profile_id, g.principal.is_profile_complete) == ('farmer', expected.profile_id, True)
+    assert statements == []
+    assert g.principal.user.farmer.farm_name == 'Green Acres'
+    assert len(statements) == 1
+
+def test_change_from_another_worker_is_seen_after_the_principal_ttl(app, monkeypatch):
+  with app.test_request_context():
+    auth.authenticate('token')
+    user_id = g.principal.user_id
+  # A Core update stands in for a change made in another process: no ORM event reaches this cache.
+  db.session.execute(update(models.User).where(models.User.id == user_id).values(role='researcher'))
+  db.session.commit()
+  with app.test_request_context():
+    assert (auth.authenticate('token'), g.principal.role) == ('cache_hit', 'farmer')
+
+  monkeypatch.setattr(auth.token_cache, 'principal_ttl', 0)
+  with app.test_request_context():
+    assert (auth.authenticate('token'), g.principal.role, g.principal.profile_id) == ('cache_hit', 'researcher', None)
+
+def test_missing_public_keys_return_503(app, monkeypatch):
+  def unavailable(token): raise PublicKeysUnavailable('Public signing keys could not be fetched yet')
+  monkeypatch.setattr(auth, 'verify_id_token', unavailable)
+  with app.test_request_context(headers={'Authorization': 'Bearer token'}):
+    response, status, headers = auth.verify_firebase_token(lambda: 'ok')()
+    assert (status, headers['Retry-After'], response.get_json()['error'], g.auth_outcome) == (503, '30', 'Token verification unavailable', 'unavailable')
+
+def test_onboarding_change_evicts_cached_principal(app):
+  with app.test_request_context():
+    auth.authenticate('token')
+    user = auth.current_user()
+    user.onboarding_step = 4
+    db.session.commit()
+  assert len(auth.token_cache) == 0
+
+PROFILES = {
+  'farmer': lambda: models.Farmer(farm_name='Green Acres'),
+  'veterinary': lambda: models.Veterinarian(license_number='VET-1'),
+  'government': lambda: models.GovernmentOfficial(government_id='GOV-1', department_name='Animal Husbandry'),
+  'researcher': lambda: models.Researcher(institution_name='ICAR')
+}
+
+@pytest.fixture
+def people(app):
+  users = {}
+  for role, make_profile in PROFILES.items():
+    user = models.User(firebase_uid=f'{role}_uid', email=f'{role}_profile@test.com', name=role, role=role, is_profile_complete=True, onboarding_step=3)
+    setattr(user, auth.ROLE_PROFILES[role], make_profile())
+    users[role] = user
+  users['pending'] = models.User(firebase_uid='pending_uid', email='pending@test.com', name='pending', role='veterinary', onboarding_step=1)
+  db.session.add_all(users.values())
+  db.session.commit()
+  ids = {role: user.id for role, user in users.items()}
+  db.session.expunge_all()
+  return ids
+
+@pytest.mark.parametrize('role', list(PROFILES))
+def test_principal_resolves_each_role_profile(app, people, role):
+  user = auth.load_user(role, id=people[role])
+  principal = auth.Principal.from_user(user)
+  profile = getattr(user, auth.ROLE_PROFILES[role])
+  assert (principal.user_id, principal.role, principal.profile_id, principal.is_profile_complete) == (people[role], role, profile.id, True)
+  assert principal.profile is profile
+
+  cached = auth.Principal(**asdict(principal))
+  db.session.expunge_all()
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  assert cached.profile.id == principal.profile_id
+  assert cached.profile.user_id == people[role]
+  assert len(statements) == 1
+
+def test_principal_without_profile(app, people):
+  principal = auth.Principal.from_user(auth.load_user(firebase_uid='pending_uid'))
+  assert (principal.role, principal.profile_id, principal.profile, principal.is_profile_complete, principal.onboarding_step) == ('veterinary', None, None, False, 1)
+
+def test_load_user_without_role_joins_every_profile(app, people):
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  user = auth.load_user(firebase_uid='researcher_uid')
+  assert (user.researcher.institution_name, user.farmer, user.veterinarian, user.government_official) == ('ICAR', None, None, None)
+  assert len(statements) == 1
+
+@auth.require_role('farmer', 'veterinary')
+@auth.require_profile_complete
+def guarded():
+  return 'ok'
+
+@pytest.mark.parametrize('principal,expected', [
+  (None, (401, {'error': 'Authentication required'})),
+  (auth.Principal(1, 'researcher', 4, True, 3), (403, {'error': 'Insufficient permissions'})),
+  (auth.Principal(1, 'farmer', None, False, 1), (403, {'error': 'Profile incomplete', 'onboarding_step': 1})),
+  (auth.Principal(1, 'veterinary', 2, True, 3), (200, 'ok'))
+])
+def test_decorators_read_the_principal(app, principal, expected):
+  with app.test_request_context():
+    g.principal = principal
+    result = guarded()
+    if isinstance(result, tuple): result = (result[1], result[0].get_json())
+    else: result = (200, result)
+    assert result == expected
+
+@pytest.fixture
+def onboarding_app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  app.register_blueprint(onboarding_bp)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': token, 'email': f'{token}@test.com', 'exp': time.time() + 3600})
+
+  @app.route('/whoami')
+  @auth.verify_firebase_token
+  def whoami():
+    return jsonify(asdict(g.principal) if g.principal else None)
+
+  with app.app_context():
+    db.create_all()
+    db.session.add(models.User(firebase_uid='new_farmer', email='new_farmer@test.com', name='New Farmer', role='farmer', onboarding_step=1))
+    db.session.commit()
+  yield app
+  auth.token_cache.clear()
+
+def test_onboarding_updates_the_cached_principal(onboarding_app):
+  client = onboarding_app.test_client()
+  headers = {'Authorization': 'Bearer new_farmer'}
+  before = client.get('/whoami', headers=headers).get_json()
+  assert (before['profile_id'], before['onboarding_step'], before['is_profile_complete']) == (None, 1, False)
+  assert client.get('/whoami', headers=headers).get_json() == before
+
+  farmer_id = client.post('/api/onboarding/farmer', json={'farm_name': 'Green Acres'}, headers=headers).get_json()['farmer_id']
+  after_profile = client.get('/whoami', headers=headers).get_json()
+  assert (after_profile['profile_id'], after_profile['onboarding_step'], after_profile['is_profile_complete']) == (farmer_id, 2, False)
+
+  assert client.post('/api/onboarding/complete-livestock', headers=headers).status_code == 200
+  complete = client.get('/whoami', headers=headers).get_json()
+  assert (complete['profile_id'], complete['onboarding_step'], complete['is_profile_complete']) == (farmer_id, 3, True)
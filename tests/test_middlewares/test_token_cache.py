@@ -0,0 +1,95 @@
+import time
+from middlewares.token_cache import TokenCache, PRINCIPAL_FIELDS
+
+class FakePrincipal:
+  def __init__(self, user_id, role, profile_id=None):
+    self.user_id = user_id
+    self.role = role
+    self.profile_id = profile_id
+    self.is_profile_complete = True
+    self.onboarding_step = 3
+
+def claims(uid='uid_1', ttl=3600):
+  return {'uid': uid, 'email': f'{uid}@test.com', 'exp': time.time() + ttl}
+
+class TestTokenCache:
+  def test_digest_is_stable(self):
+    assert TokenCache.digest('abc') == TokenCache.digest('abc')
+    assert TokenCache.digest('abc') != TokenCache.digest('abd')
+
+  def test_put_and_get(self):
+    cache = TokenCache()
+    key = cache.digest('token')
+    cache.put(key, claims(), FakePrincipal(7, 'farmer', 12))
+    entry = cache.get(key)
+
+    assert entry['uid'] == 'uid_1'
+    assert entry['user_id'] == 7
+    assert entry['role'] == 'farmer'
+    assert entry['profile_id'] == 12
+    assert entry['is_profile_complete'] is True
+
+  def test_expired_token_not_cached(self):
+    cache = TokenCache()
+    key = cache.digest('token')
+    cache.put(key, claims(ttl=-1))
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+  def test_entry_expires_at_exp(self):
+    cache = TokenCache()
+    key = cache.digest('token')
+    cache.put(key, claims(ttl=0.05))
+    time.sleep(0.1)
+    assert cache.get(key) is None
+
+  def test_bounded_size_evicts_least_recent(self):
+    cache = TokenCache(max_size=2)
+    keys = [cache.digest(f'token{i}') for i in range(3)]
+    cache.put(keys[0], claims('a'))
+    cache.put(keys[1], claims('b'))
+    cache.get(keys[0])
+    cache.put(keys[2], claims('c'))
+
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+  def test_attach_principal(self):
+    cache = TokenCache()
+    key = cache.digest('token')
+    cache.put(key, claims())
+    assert cache.get(key)['user_id'] is None
+    cache.attach_principal(key, FakePrincipal(3, 'veterinary'))
+    assert cache.get(key)['role'] == 'veterinary'
+
+  def test_principal_expires_before_the_token(self):
+    cache = TokenCache(principal_ttl=0.05)
+    key = cache.digest('token')
+    cache.put(key, claims(), FakePrincipal(7, 'farmer', 12))
+    time.sleep(0.1)
+    entry = cache.get(key)
+    assert entry['uid'] == 'uid_1'
+    assert {field: entry[field] for field in PRINCIPAL_FIELDS} == dict.fromkeys(PRINCIPAL_FIELDS)
+
+    cache.attach_principal(key, FakePrincipal(7, 'veterinary', 3))
+    assert (cache.get(key)['role'], cache.get(key)['profile_id']) == ('veterinary', 3)
+
+  def test_invalidate_uid_clears_all_tokens(self):
+    cache = TokenCache()
+    key1, key2, key3 = cache.digest('t1'), cache.digest('t2'), cache.digest('t3')
+    cache.put(key1, claims('a'))
+    cache.put(key2, claims('a'))
+    cache.put(key3, claims('b'))
+    cache.invalidate_uid('a')
+
+    assert cache.get(key1) is None
+    assert cache.get(key2) is None
+    assert cache.get(key3) is not None
+
+  def test_returned_entry_is_a_copy(self):
+    cache = TokenCache()
+    key = cache.digest('token')
+    cache.put(key, claims())
+    cache.get(key)['uid'] = 'tampered'
+    assert cache.get(key)['uid'] == 'uid_1'
@@ -0,0 +1,168 @@
+import pytest, base64, json, threading, time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from firebase_admin import auth
+from middlewares import token_verifier
+from middlewares.token_verifier import OfflineTokenVerifier, PublicKeyStore, PublicKeysUnavailable
+
+PROJECT_ID = 'cattlesense-test'
+
+def b64(data):
+  return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def make_certificate(key):
+  name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'securetoken.test')])
+  now = datetime.now(timezone.utc)
+  cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()).serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1)).sign(key, hashes.SHA256())
+  return cert.public_bytes(serialization.Encoding.PEM).decode()
+
+def sign_token(key, kid='key-1', **overrides):
+  now = int(time.time())
+  payload = {'iss': f'https://securetoken.google.com/{PROJECT_ID}', 'aud': PROJECT_ID, 'sub': 'firebase_uid_1', 'email': 'farmer@test.com', 'iat': now, 'auth_time': now, 'exp': now + 3600}
+  payload.update(overrides)
+  header = {'alg': 'RS256', 'kid': kid, 'typ': 'JWT'}
+  signing_input = f'{b64(json.dumps(header).encode())}.{b64(json.dumps(payload).encode())}'
+  signature = key.sign(signing_input.encode(), padding.PKCS1v15(), hashes.SHA256())
+  return f'{signing_input}.{b64(signature)}'
+
+@pytest.fixture(scope='module')
+def signing_key():
+  return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+@pytest.fixture
+def key_server(signing_key):
+  state = {'keys': {'key-1': make_certificate(signing_key)}, 'requests': 0}
+
+  class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      state['requests'] += 1
+      body = json.dumps(state['keys']).encode()
+      self.send_response(200)
+      self.send_header('Content-Type', 'application/json')
+      self.send_header('Cache-Control', 'public, max-age=19302, must-revalidate, no-transform')
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, *args):
+      pass
+
+  server = HTTPServer(('127.0.0.1', 0), Handler)
+  thread = threading.Thread(target=server.serve_forever, daemon=True)
+  thread.start()
+  state['url'] = f'http://127.0.0.1:{server.server_port}/keys'
+  yield state
+  server.shutdown()
+
+@pytest.fixture
+def verifier(key_server):
+  store = PublicKeyStore(url=key_server['url'])
+  yield OfflineTokenVerifier(PROJECT_ID, store)
+  store.stop()
+
+class TestPublicKeyStore:
+  def test_refresh_honours_max_age(self, key_server):
+    store = PublicKeyStore(url=key_server['url'])
+    max_age = store.refresh()
+
+    assert max_age == 19302
+    assert store.expires_at - store.last_refresh == 19302
+    assert store.get('key-1') is not None
+    store.stop()
+
+  def test_keys_fetched_once(self, key_server):
+    store = PublicKeyStore(url=key_server['url'])
+    for _ in range(5): store.get('key-1')
+    assert key_server['requests'] == 1
+    store.stop()
+
+  def test_first_fetch_is_synchronous(self, key_server):
+    store = PublicKeyStore(url=key_server['url'])
+    store.ensure_started()
+    assert key_server['requests'] == 1
+    assert store.get('key-1') is not None
+    assert store._timer is not None and key_server['requests'] == 1
+    store.stop()
+
+  def test_fails_fast_without_keys(self):
+    store = PublicKeyStore(url='http://127.0.0.1:9/keys', timeout=5)
+    started = time.monotonic()
+    store.ensure_started()
+    for _ in range(3):
+      with pytest.raises(PublicKeysUnavailable): store.get('key-1')
+    assert time.monotonic() - started < 2
+    assert store._timer is not None
+    store.stop()
+
+  def test_concurrent_refresh_soon_schedules_one_timer(self, monkeypatch):
+    timers = []
+
+    class FakeTimer:
+      def __init__(self, delay, function):
+        self.cancelled = False
+        timers.append(self)
+      def start(self):
+        pass
+      def cancel(self):
+        self.cancelled = True
+
+    clock = time.time
+    def slow_clock():
+      time.sleep(0.01)
+      return clock()
+
+    monkeypatch.setattr(threading, 'Timer', FakeTimer)
+    monkeypatch.setattr(token_verifier.time, 'time', slow_clock)
+    store = PublicKeyStore(url='http://127.0.0.1:9/keys')
+    barrier = threading.Barrier(8)
+    def unknown_kid():
+      barrier.wait()
+      store.refresh_soon()
+    threads = [threading.Thread(target=unknown_kid) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    assert len(timers) == 1
+    assert [timer.cancelled for timer in timers] == [False]
+
+class TestOfflineTokenVerifier:
+  def test_valid_token(self, verifier, signing_key):
+    claims = verifier.verify(sign_token(signing_key))
+    assert claims['uid'] == 'firebase_uid_1'
+    assert claims['email'] == 'farmer@test.com'
+
+  def test_no_network_after_first_fetch(self, verifier, signing_key, key_server):
+    for _ in range(10): verifier.verify(sign_token(signing_key))
+    assert key_server['requests'] == 1
+
+  def test_expired_token(self, verifier, signing_key):
+    with pytest.raises(auth.ExpiredIdTokenError):
+      verifier.verify(sign_token(signing_key, exp=int(time.time()) - 10))
+
+  def test_wrong_audience(self, verifier, signing_key):
+    with pytest.raises(auth.InvalidIdTokenError):
+      verifier.verify(sign_token(signing_key, aud='other-project'))
+
+  def test_wrong_issuer(self, verifier, signing_key):
+    with pytest.raises(auth.InvalidIdTokenError):
+      verifier.verify(sign_token(signing_key, iss='https://securetoken.google.com/other-project'))
+
+  def test_unknown_kid(self, verifier, signing_key):
+    with pytest.raises(auth.InvalidIdTokenError, match='kid'):
+      verifier.verify(sign_token(signing_key, kid='key-2'))
+
+  def test_tampered_signature(self, verifier, signing_key):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(auth.InvalidIdTokenError, match='signature'):
+      verifier.verify(sign_token(other_key))
+
+  def test_malformed_token(self, verifier):
+    with pytest.raises(auth.InvalidIdTokenError):
+      verifier.verify('not-a-jwt')
+
+  def test_future_issued_at(self, verifier, signing_key):
+    with pytest.raises(auth.InvalidIdTokenError):
+      verifier.verify(sign_token(signing_key, iat=int(time.time()) + 600))
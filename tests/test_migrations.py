@@ -0,0 +1,75 @@
+import logging.config, os
+import pytest
+import sqlalchemy as sa
+from datetime import datetime, timezone
+from flask import Flask
+from flask_migrate import Migrate, upgrade, downgrade
+import models
+from extensions import db
+from services.partitions import PARTITIONED_TABLES, add_months, month_start, partition_name, ensure_partitions
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'migrations')
+POSTGRES_URL = os.getenv('TEST_POSTGRES_URL')
+
+def make_app(monkeypatch, url):
+  # env.py loads alembic.ini's logging config, which would disable every logger configured so far.
+  monkeypatch.setattr(logging.config, 'fileConfig', lambda *args, **kwargs: None)
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI=url, PARTITION_MONTHS_AHEAD=3)
+  db.init_app(app)
+  Migrate(app, db, directory=MIGRATIONS)
+  return app
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+  app = make_app(monkeypatch, f"sqlite:///{tmp_path / 'cattlesense.db'}")
+  with app.app_context():
+    yield app
+
+def schema():
+  inspector = sa.inspect(db.engine)
+  return {name: ({c['name'] for c in inspector.get_columns(name)}, {i['name'] for i in inspector.get_indexes(name)}) for name in inspector.get_table_names() if name != 'alembic_version'}
+
+def test_upgrade_builds_the_model_schema(app):
+  upgrade()
+  assert schema() == {table.name: (set(table.c.keys()), {index.name for index in table.indexes}) for table in db.metadata.sorted_tables}
+  assert db.session.execute(sa.text('SELECT version_num FROM alembic_version')).scalar() == 'f3d8c16b2a70'
+
+def test_upgrade_leaves_a_create_all_database_alone(app):
+  db.create_all()
+  before = schema()
+  upgrade()
+  assert schema() == before
+
+def test_downgrade_to_base_drops_everything(app):
+  upgrade()
+  downgrade(revision='base')
+  assert schema() == {}
+
+def test_partitions_are_skipped_outside_postgresql(app):
+  db.create_all()
+  assert ensure_partitions() == []
+
+@pytest.fixture
+def postgres(monkeypatch):
+  if not POSTGRES_URL: pytest.skip('TEST_POSTGRES_URL is not set')
+  pytest.importorskip('psycopg2')
+  app = make_app(monkeypatch, POSTGRES_URL)
+  with app.app_context():
+    upgrade()
+    yield app
+    db.session.rollback()
+    downgrade(revision='base')
+
+def test_ensure_partitions_adds_months_and_moves_default_rows(postgres):
+  current = month_start(datetime.now(timezone.utc).date())
+  later = add_months(current, 4)
+  user_id = db.session.execute(sa.text("INSERT INTO users (firebase_uid, email, name, role) VALUES ('farmer_1', 'farmer_1@test.com', 'Farmer', 'farmer') RETURNING id")).scalar()
+  farmer_id = db.session.execute(sa.text("INSERT INTO farmers (user_id, farm_name) VALUES (:user_id, 'Farm') RETURNING id"), {'user_id': user_id}).scalar()
+  db.session.execute(sa.text("INSERT INTO alerts (farmer_id, alert_type, title, message, created_at) VALUES (:farmer_id, 'mrl_breach', 'MRL', 'MRL', :created_at)"), {'farmer_id': farmer_id, 'created_at': later})
+  db.session.commit()
+
+  assert ensure_partitions(4) == [partition_name(table, later) for table in PARTITIONED_TABLES]
+  assert db.session.execute(sa.text(f"SELECT count(*) FROM {partition_name('alerts', later)}")).scalar() == 1
+  assert db.session.execute(sa.text('SELECT count(*) FROM alerts_default')).scalar() == 0
+  assert ensure_partitions(4) == []
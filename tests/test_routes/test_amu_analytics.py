@@ -0,0 +1,42 @@
+import pytest, time
+from datetime import datetime, timezone
+from flask import Flask
+import models
+from extensions import db
+from middlewares import auth
+from routes.amu import amu_bp
+
+JURISDICTIONS = {'maharashtra_official': ('Maharashtra', 'Aurangabad'), 'bihar_official': ('Bihar', 'Aurangabad'), 'bihar_state_official': ('Bihar', None)}
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  app.register_blueprint(amu_bp)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': token, 'email': f'{token}@test.com', 'exp': time.time() + 3600})
+  with app.app_context():
+    db.create_all()
+    for n, (uid, (state, district)) in enumerate(JURISDICTIONS.items()):
+      user = models.User(firebase_uid=uid, email=f'{uid}@test.com', name=uid, role='government', is_profile_complete=True, onboarding_step=3)
+      user.government_official = models.GovernmentOfficial(government_id=f'GOV-{n}', department_name='Animal Husbandry', jurisdiction_state=state, jurisdiction_district=district)
+      db.session.add(user)
+    today = datetime.now(timezone.utc).date()
+    for state, count in (('Maharashtra', 7), ('Bihar', 3)):
+      db.session.add(models.RegionalAnalytics(region_level='district', region='Aurangabad', state=state, district='Aurangabad', analysis_date=today, amu_usage_count=count, analytics_data={'drug_categories': {state: count}}))
+    db.session.commit()
+  yield app
+  auth.token_cache.clear()
+
+def regional(app, token, **args):
+  return app.test_client().get('/api/amu/analytics/regional', query_string=args, headers={'Authorization': f'Bearer {token}'})
+
+def test_same_named_districts_stay_in_their_state(app):
+  for token, state, count in (('maharashtra_official', 'Maharashtra', 7), ('bihar_official', 'Bihar', 3)):
+    body = regional(app, token).get_json()
+    assert (body['region'], body['total_amu_records']) == ('Aurangabad', count)
+    assert body['drug_category_distribution'] == [{'category': state, 'count': count}]
+
+def test_district_query_uses_the_official_state(app):
+  assert regional(app, 'bihar_state_official', district='Aurangabad').get_json()['total_amu_records'] == 3
@@ -0,0 +1,76 @@
+import pytest, time
+from datetime import date
+from flask import Flask
+import models
+from extensions import db
+from middlewares import auth
+from routes import amu
+from routes.amu import amu_bp
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  app.register_blueprint(amu_bp)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': token, 'email': f'{token}@test.com', 'exp': time.time() + 3600})
+  with app.app_context():
+    db.create_all()
+    for n in (1, 2):
+      user = models.User(id=n, firebase_uid=f'farmer_{n}', email=f'farmer_{n}@test.com', name=f'Farmer {n}', role='farmer', is_profile_complete=True, onboarding_step=3)
+      user.farmer = models.Farmer(id=n, farm_name=f'Farm {n}')
+      db.session.add(user)
+    vet = models.User(id=3, firebase_uid='vet_1', email='vet_1@test.com', name='Vet', role='veterinary', is_profile_complete=True, onboarding_step=3)
+    vet.veterinarian = models.Veterinarian(id=1, license_number='VET-1')
+    db.session.add(vet)
+    for livestock_id, farmer_id in ((1, 1), (2, 1), (3, 2)): db.session.add(models.Livestock(id=livestock_id, farmer_id=farmer_id, rfid_tag=f'RFID-{livestock_id}', species='cattle'))
+    for prescription_id, livestock_id, farmer_id in ((1, 1, 1), (2, 3, 2)): db.session.add(models.Prescription(id=prescription_id, veterinarian_id=1, farmer_id=farmer_id, livestock_id=livestock_id, prescription_number=f'RX-{prescription_id}', prescription_date=date.today()))
+    db.session.commit()
+  yield app
+  auth.token_cache.clear()
+
+def count(app, model, **filters):
+  with app.app_context():
+    return model.query.filter_by(**filters).count()
+
+def post_batch(app, records, token='farmer_1'):
+  return app.test_client().post('/api/amu/records/batch', json={'defaults': {'drug_name': 'Oxytetracycline', 'dosage': 10, 'unit': 'ml'}, 'records': records}, headers={'Authorization': f'Bearer {token}'})
+
+def test_batch_is_written_in_one_transaction(app):
+  response = post_batch(app, [{'livestock_id': 1, 'prescription_id': 1, 'prescribed_by': 1}, {'livestock_id': 2}])
+  assert response.status_code == 201
+  assert response.get_json()['created'] == 2
+  assert count(app, models.AntimicrobialRecord) == 2
+  assert count(app, models.TraceabilityLog, event_type='amu_recorded') == 2
+
+def test_bad_references_are_reported_per_row(app):
+  response = post_batch(app, [
+    {'livestock_id': 1, 'prescription_id': 1},
+    {'livestock_id': 3},
+    {'livestock_id': 99},
+    {'livestock_id': 2, 'prescription_id': 1},
+    {'livestock_id': 1, 'prescription_id': 2},
+    {'livestock_id': 1, 'prescription_id': 404},
+    {'livestock_id': 1, 'prescription_id': [1]},
+    {'livestock_id': 1, 'prescribed_by': 404},
+  ])
+  assert response.status_code == 400
+  assert [(detail['index'], detail['error']) for detail in response.get_json()['details']] == [
+    (1, 'Unauthorized access'),
+    (2, 'Livestock not found'),
+    (3, 'Prescription not found for this livestock'),
+    (4, 'Prescription not found for this livestock'),
+    (5, 'Prescription not found for this livestock'),
+    (6, 'Prescription not found for this livestock'),
+    (7, 'Prescribing veterinarian not found'),
+  ]
+  assert count(app, models.AntimicrobialRecord) == 0
+
+def test_failed_write_rolls_back_the_batch(app, monkeypatch):
+  def fail(*args, **kwargs): raise RuntimeError('alert store unavailable')
+  monkeypatch.setattr(amu, 'raise_alerts', fail)
+  response = post_batch(app, [{'livestock_id': 1}, {'livestock_id': 2}])
+  assert response.status_code == 500
+  assert count(app, models.AntimicrobialRecord) == 0
+  assert count(app, models.TraceabilityLog) == 0
@@ -0,0 +1,80 @@
+import pytest, json, time
+from datetime import date
+from flask import Flask
+import models
+from extensions import db
+from middlewares import auth
+from routes.livestock import livestock_bp
+from routes.prescription import prescription_bp
+from services.ledger import append_events
+from utils.streaming import NDJSON_MIMETYPE, wants_ndjson
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', STREAM_BATCH_SIZE=2)
+  db.init_app(app)
+  app.register_blueprint(livestock_bp)
+  app.register_blueprint(prescription_bp)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': token, 'email': f'{token}@test.com', 'exp': time.time() + 3600})
+  with app.app_context():
+    db.create_all()
+    for n in (1, 2):
+      user = models.User(id=n, firebase_uid=f'farmer_{n}', email=f'farmer_{n}@test.com', name=f'Farmer {n}', role='farmer', is_profile_complete=True, onboarding_step=3)
+      user.farmer = models.Farmer(id=n, farm_name=f'Farm {n}')
+      db.session.add(user)
+    vet = models.User(id=3, firebase_uid='vet_1', email='vet_1@test.com', name='Vet', role='veterinary', is_profile_complete=True, onboarding_step=3)
+    vet.veterinarian = models.Veterinarian(id=1, license_number='VET-1')
+    db.session.add(vet)
+    db.session.add(models.Livestock(id=1, farmer_id=1, rfid_tag='RFID-1', species='cattle'))
+    for n in range(1, 4): db.session.add(models.Prescription(id=n, veterinarian_id=1, farmer_id=1, livestock_id=1, prescription_number=f'RX-{n}', prescription_date=date(2026, 3, n), drugs_prescribed=[{'drug_name': 'Oxytetracycline'}]))
+    for n in range(1, 6): db.session.add(models.AntimicrobialRecord(livestock_id=1, prescription_id=1, drug_name='Oxytetracycline', dosage=n, unit='ml', start_date=date(2026, 3, n)))
+    db.session.flush()
+    append_events([(1, 'livestock_updated', {'n': n}) for n in range(3)], performed_by=1)
+    db.session.commit()
+  yield app
+  auth.token_cache.clear()
+
+def get(app, path, token='farmer_1', accept=NDJSON_MIMETYPE):
+  headers = {'Accept': accept}
+  if token: headers['Authorization'] = f'Bearer {token}'
+  return app.test_client().get(path, headers=headers)
+
+def lines(response):
+  assert response.status_code == 200
+  assert response.mimetype == NDJSON_MIMETYPE
+  return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_prescription_amu_records_stream_one_object_per_line(app):
+  records = lines(get(app, '/api/prescription/1/amu-records'))
+  assert [record['dosage'] for record in records] == [5, 4, 3, 2, 1]
+  assert lines(get(app, '/api/prescription/1/amu-records', token='vet_1')) == records
+
+def test_livestock_prescriptions_stream_one_object_per_line(app):
+  prescriptions = lines(get(app, '/api/prescription/livestock/1'))
+  assert [(p['prescription_number'], p['drugs_count']) for p in prescriptions] == [('RX-3', 1), ('RX-2', 1), ('RX-1', 1)]
+
+def test_trace_streams_one_object_per_line(app):
+  entries = lines(get(app, '/api/livestock/1/trace'))
+  assert [entry['event_data'] for entry in entries] == [{'n': 2}, {'n': 1}, {'n': 0}]
+  assert all(set(entry) == {'id', 'event_type', 'event_data', 'timestamp', 'hash'} for entry in entries)
+
+@pytest.mark.parametrize('path', ['/api/prescription/1/amu-records', '/api/prescription/livestock/1'])
+def test_streams_still_enforce_ownership(app, path):
+  response = get(app, path, token='farmer_2')
+  assert (response.status_code, response.mimetype) == (403, 'application/json')
+
+@pytest.mark.parametrize('path', ['/api/prescription/1/amu-records', '/api/prescription/livestock/1', '/api/livestock/1/trace'])
+def test_streams_require_a_token(app, path):
+  assert get(app, path, token=None).status_code == 401
+
+def test_json_stays_the_default(app):
+  response = get(app, '/api/prescription/livestock/1', accept='application/json, application/x-ndjson;q=0.5')
+  assert response.mimetype == 'application/json'
+  assert response.get_json()['total'] == 3
+
+@pytest.mark.parametrize('accept,expected', [(NDJSON_MIMETYPE, True), ('application/json', False), ('*/*', False), ('application/x-ndjson, application/json;q=0.9', True)])
+def test_wants_ndjson(accept, expected):
+  with Flask(__name__).test_request_context(headers={'Accept': accept}):
+    assert wants_ndjson() is expected
@@ -0,0 +1,51 @@
+import pytest, time
+from datetime import datetime
+from flask import Flask
+import models
+from extensions import db
+from middlewares import auth
+from routes.livestock import livestock_bp
+
+JURISDICTIONS = {'state_official': ('Punjab', None), 'district_official': ('Punjab', 'Ludhiana')}
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  app.register_blueprint(livestock_bp)
+  auth.token_cache.clear()
+  monkeypatch.setattr(auth, 'verify_id_token', lambda token: {'uid': token, 'email': f'{token}@test.com', 'exp': time.time() + 3600})
+  with app.app_context():
+    db.create_all()
+    for n, (uid, (state, district)) in enumerate(JURISDICTIONS.items()):
+      user = models.User(firebase_uid=uid, email=f'{uid}@test.com', name=uid, role='government', is_profile_complete=True, onboarding_step=3)
+      user.government_official = models.GovernmentOfficial(government_id=f'GOV-{n}', department_name='Animal Husbandry', jurisdiction_state=state, jurisdiction_district=district)
+      db.session.add(user)
+    db.session.add(models.User(firebase_uid='no_profile', email='no_profile@test.com', name='no_profile', role='government', is_profile_complete=True, onboarding_step=3))
+    for state, district in (('Punjab', None), ('Punjab', 'Ludhiana'), ('Punjab', 'Amritsar'), ('Kerala', None)):
+      db.session.add(models.ChainVerificationRun(state=state, district=district, status='completed', started_at=datetime(2026, 3, 1)))
+    db.session.commit()
+  yield app
+  auth.token_cache.clear()
+
+def runs(app, token, **args):
+  return app.test_client().get('/api/livestock/trace/verification', query_string=args, headers={'Authorization': f'Bearer {token}'})
+
+def test_district_official_is_pinned_to_their_district(app):
+  response = runs(app, 'district_official')
+  assert response.status_code == 200
+  assert (response.get_json()['state'], response.get_json()['district'], len(response.get_json()['runs'])) == ('Punjab', 'Ludhiana', 1)
+  assert runs(app, 'district_official', state='Punjab', district='Ludhiana').status_code == 200
+  assert runs(app, 'district_official', district='Amritsar').status_code == 403
+  assert runs(app, 'district_official', state='Kerala').status_code == 403
+
+def test_state_official_reads_districts_in_their_state_only(app):
+  assert runs(app, 'state_official').get_json()['district'] is None
+  assert runs(app, 'state_official', district='Amritsar').get_json()['district'] == 'Amritsar'
+  assert runs(app, 'state_official', state='Kerala').status_code == 403
+
+def test_official_without_profile_is_rejected(app):
+  response = runs(app, 'no_profile')
+  assert response.status_code == 400
+  assert response.get_json() == {'error': 'Government official profile not found'}
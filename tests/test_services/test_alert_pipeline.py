@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timezone
+from flask import Flask
+from sqlalchemy import event
+import models
+from extensions import db, alert_broker
+from services.alert_pipeline import alert_fingerprint, alert_candidate, combine_metadata, coalesce_candidates, summarize, raise_alerts
+from services.alert_stream import init_alert_stream
+from services.counters import init_counters, owner_counters, _track_flush
+
+NOW = datetime(2026, 3, 1, 8, 0, tzinfo=timezone.utc)
+
+def withdrawal(livestock_id, end_date, drug_name='Oxytetracycline', group='poultry'):
+  return alert_candidate(
+    'withdrawal_period', 'medium', 3, livestock_id, f'Withdrawal period for {drug_name}', f'Withdrawal period ends on {end_date}. Do not sell products until then.',
+    drug_name=drug_name, group=group, metadata={'withdrawal_by_livestock': {str(livestock_id): end_date}, 'withdrawal_days': 10}
+  )
+
+class TestFingerprint:
+  def test_drug_name_is_normalized(self):
+    assert alert_fingerprint('withdrawal_period', 3, drug_name=' Oxytetracycline') == alert_fingerprint('withdrawal_period', 3, drug_name='oxytetracycline')
+
+  def test_scope_parts_change_fingerprint(self):
+    base = alert_fingerprint('withdrawal_period', 3, None, 'oxy', 'poultry')
+    assert len({base, alert_fingerprint('excessive_use', 3, None, 'oxy', 'poultry'), alert_fingerprint('withdrawal_period', 4, None, 'oxy', 'poultry'),
+      alert_fingerprint('withdrawal_period', 3, 9, 'oxy', 'poultry'), alert_fingerprint('withdrawal_period', 3, None, 'oxy', 'cattle')}) == 5
+
+class TestCombineMetadata:
+  def test_merge_rules(self):
+    merged = combine_metadata([
+      {'livestock_ids': [2, 1], 'occurrences': 2, 'first_seen_at': '2026-03-01T08:00:00', 'withdrawal_end_date': '2026-03-20', 'drug_name': 'a'},
+      {'livestock_ids': [1, 3], 'occurrences': 1, 'first_seen_at': '2026-03-02T08:00:00', 'withdrawal_end_date': '2026-03-15', 'drug_name': 'b'}
+    ])
+    assert merged == {'livestock_ids': [1, 2, 3], 'occurrences': 3, 'first_seen_at': '2026-03-01T08:00:00', 'withdrawal_end_date': '2026-03-20', 'drug_name': 'b'}
+
+  def test_withdrawal_dates_are_kept_per_animal(self):
+    merged = combine_metadata([
+      {'withdrawal_by_livestock': {'1': '2026-03-20', '2': '2026-03-10'}},
+      {'withdrawal_by_livestock': {'2': '2026-03-15', '3': '2026-03-05'}}
+    ])
+    assert merged['withdrawal_by_livestock'] == {'1': '2026-03-20', '2': '2026-03-15', '3': '2026-03-05'}
+    assert merged['withdrawal_end_date'] == '2026-03-20'
+
+  def test_missing_values_are_skipped(self):
+    assert combine_metadata([{'withdrawal_days': None}, {'withdrawal_days': 7}, {}]) == {'withdrawal_days': 7}
+
+class TestCoalesceCandidates:
+  def test_flock_treatment_becomes_one_alert(self):
+    coalesced = coalesce_candidates([withdrawal(i, '2026-03-11' if i % 2 else '2026-03-12') for i in range(1, 1001)], NOW)
+    (alert,) = coalesced.values()
+    assert alert['alert_metadata']['livestock_ids'] == list(range(1, 1001))
+    assert alert['alert_metadata']['occurrences'] == 1000
+    assert alert['alert_metadata']['first_seen_at'] == '2026-03-01T08:00:00'
+    assert alert['alert_metadata']['withdrawal_by_livestock']['1'] == '2026-03-11'
+    assert alert['alert_metadata']['withdrawal_by_livestock']['2'] == '2026-03-12'
+    assert alert['alert_metadata']['withdrawal_end_date'] == '2026-03-12'
+    assert alert['message'] == 'Withdrawal periods end between 2026-03-11 and 2026-03-12 for 1000 animals. Do not sell products until then.'
+
+  def test_other_drugs_and_groups_stay_separate(self):
+    assert len(coalesce_candidates([withdrawal(1, '2026-03-11'), withdrawal(1, '2026-03-11', drug_name='Enrofloxacin'), withdrawal(2, '2026-03-11', group='cattle')], NOW)) == 3
+
+def test_withdrawal_summary_uses_one_date_when_all_match():
+  (alert,) = coalesce_candidates([withdrawal(1, '2026-03-11'), withdrawal(2, '2026-03-11')], NOW).values()
+  assert alert['message'] == 'Withdrawal period ends on 2026-03-11 for 2 animals. Do not sell products until then.'
+
+def test_single_animal_keeps_original_message():
+  assert summarize('excessive_use', {'livestock_ids': [4], 'drug_name': 'x', 'threshold': 3, 'window_days': 30}, 'original') == 'original'
+  assert summarize('consultation_request', {'livestock_ids': [4, 5]}, 'original') == 'original'
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  alert_broker.init_app(app)
+  init_alert_stream(app)
+  with app.app_context():
+    db.create_all()
+    yield app
+  alert_broker.reset()
+
+def test_merged_repeat_reaches_broker(app):
+  subscription = alert_broker.subscribe(['alerts:farmer:3'])
+  assert raise_alerts([withdrawal(1, '2026-03-11')]) == (1, 0)
+  db.session.commit()
+  assert subscription.wait(0) == set()
+
+  assert raise_alerts([withdrawal(2, '2026-03-12')]) == (0, 1)
+  db.session.commit()
+  (alert_id,) = [alert.id for alert in models.Alert.query.all()]
+  assert subscription.wait(0) == {alert_id}
+  subscription.close()
+
+@pytest.fixture
+def counted(app):
+  init_counters(app)
+  yield app
+  event.remove(db.session, 'after_flush', _track_flush)
+
+def test_merge_into_read_alert_marks_it_unread(counted):
+  raise_alerts([withdrawal(1, '2026-03-11')])
+  db.session.commit()
+  alert = models.Alert.query.one()
+  alert.status = 'read'
+  db.session.commit()
+  assert owner_counters('farmer', 3).get('alerts.status.unread') == 0
+
+  assert raise_alerts([withdrawal(2, '2026-03-12')]) == (0, 1)
+  db.session.commit()
+  assert models.Alert.query.one().status == 'unread'
+  counters = owner_counters('farmer', 3)
+  assert (counters['alerts.status.unread'], counters['alerts.status.read']) == (1, 0)
+
+def test_first_raise_locks_fingerprint_before_reading_open_alerts(app):
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  for livestock_id in (1, 2):
+    raise_alerts([withdrawal(livestock_id, '2026-03-11')])
+    db.session.commit()
+  locks = [i for i, statement in enumerate(statements) if 'alert_fingerprint_locks' in statement]
+  reads = [i for i, statement in enumerate(statements) if statement.startswith('SELECT alerts.')]
+  assert len(locks) == 4 and len(reads) == 2
+  assert locks[1] < reads[0] and locks[3] < reads[1]
+  assert models.AlertFingerprintLock.query.count() == 1
+  assert models.Alert.query.count() == 1
@@ -0,0 +1,73 @@
+import pytest
+from flask import Flask
+from types import SimpleNamespace
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+import models
+from extensions import db
+from services import counters
+from services import alert_state
+from services.alert_state import alert_filters, transition_alerts, ALERT_TRANSITIONS
+
+class TestAlertFilters:
+  def test_builds_conditions(self):
+    conditions = alert_filters({'type': 'withdrawal_period', 'severity': 'high', 'livestock_id': '4', 'created_before': '2026-01-31'})
+    assert [str(c) for c in conditions] == ['alerts.alert_type = :alert_type_1', 'alerts.severity = :severity_1', 'alerts.livestock_id = :livestock_id_1', 'alerts.created_at < :created_at_1']
+
+  def test_status_is_validated_but_not_a_condition(self):
+    assert alert_filters({'status': 'unread'}) == []
+
+  @pytest.mark.parametrize('filters', [
+    {'type': 'flood'}, {'severity': 'extreme'}, {'status': 'deleted'}, {'created_before': '31/01/2026'},
+    {'created_before': 20260131}, {'type': ['excessive_use']}, {'livestock_id': 'four'}, {'livestock_id': True}
+  ])
+  def test_rejects_invalid_values(self, filters):
+    with pytest.raises(ValueError): alert_filters(filters)
+
+def test_transitions_only_move_forward():
+  for target, sources, _ in ALERT_TRANSITIONS.values(): assert target not in sources
+
+def test_status_change_deltas(monkeypatch):
+  applied = []
+  monkeypatch.setattr(counters, 'apply_deltas', applied.append)
+  counters.count_status_change([(3, None, 'high', 'excessive_use'), (3, None, 'high', 'excessive_use')], 'unread', 'acknowledged')
+  assert applied[0][('farmer', 3, 'alerts.status.unread')] == -2
+  assert applied[0][('farmer', 3, 'alerts.acknowledged.type.excessive_use')] == 2
+  assert len(applied[0]) == 6
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    yield app
+
+def test_transition_is_one_update(app, monkeypatch):
+  applied = []
+  monkeypatch.setattr(counters, 'apply_deltas', applied.append)
+  for status in ('unread', 'read', 'acknowledged', 'resolved'):
+    db.session.add(models.Alert(farmer_id=1, alert_type='excessive_use', severity='high', status=status, title='t', message='m'))
+  db.session.commit()
+
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  assert transition_alerts('resolve', 'farmer', 1) == [1, 2, 3]
+  assert sum(statement.startswith('UPDATE alerts') for statement in statements) == 1
+  assert sorted(next(key for key, amount in delta.items() if amount < 0 and key[2].startswith('alerts.status.'))[2] for delta in applied) == ['alerts.status.acknowledged', 'alerts.status.read', 'alerts.status.unread']
+  assert sorted(status for (status,) in db.session.query(models.Alert.status)) == ['resolved'] * 4
+
+def test_postgresql_returns_previous_status_from_the_update(app, monkeypatch):
+  applied, statements = [], []
+  monkeypatch.setattr(counters, 'apply_deltas', applied.append)
+  monkeypatch.setattr(alert_state, 'RETURNING_DIALECTS', ('sqlite',))
+  def execute(statement):
+    statements.append(str(statement.compile(dialect=postgresql.dialect())))
+    return SimpleNamespace(all=lambda: [(5, 1, None, 'high', 'excessive_use', 'read'), (4, 1, None, 'high', 'excessive_use', 'unread')])
+  monkeypatch.setattr(db.session, 'execute', execute)
+
+  assert transition_alerts('acknowledge', 'farmer', 1) == [4, 5]
+  (statement,) = statements
+  assert statement.startswith('UPDATE alerts SET') and 'FOR UPDATE' in statement and statement.endswith('RETURNING alerts.id, alerts.farmer_id, alerts.veterinarian_id, alerts.severity, alerts.alert_type, anon_1.status')
+  assert sorted(next(key for key, amount in delta.items() if amount < 0)[2] for delta in applied) == ['alerts.status.read', 'alerts.status.unread']
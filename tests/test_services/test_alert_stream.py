@@ -0,0 +1,43 @@
+import json
+import pytest
+from services.alert_stream import MemoryBroker, alert_channels, create_alert_broker
+from utils.streaming import sse_event
+
+class TestMemoryBroker:
+  def test_publish_wakes_matching_subscribers(self):
+    broker = MemoryBroker()
+    farmer, vet = broker.subscribe(['alerts:farmer:1']), broker.subscribe(['alerts:veterinarian:2'])
+    broker.publish({channel: [] for channel in alert_channels(1, None)})
+    assert farmer.wait(0) == set()
+    assert vet.wait(0) is None
+
+  def test_wait_clears_notification(self):
+    broker = MemoryBroker()
+    subscription = broker.subscribe(['alerts:farmer:1'])
+    broker.publish({'alerts:farmer:1': [4]})
+    broker.publish({'alerts:farmer:1': [5]})
+    assert subscription.wait(0) == {4, 5}
+    assert subscription.wait(0) is None
+
+  def test_close_unsubscribes(self):
+    broker = MemoryBroker()
+    subscription = broker.subscribe(['alerts:farmer:1'])
+    subscription.close()
+    broker.publish({'alerts:farmer:1': []})
+    assert subscription.wait(0) is None
+    assert broker._subscriptions == {}
+
+def test_alert_channels():
+  assert alert_channels(3, 7) == ['alerts:farmer:3', 'alerts:veterinarian:7']
+  assert alert_channels(3, None) == ['alerts:farmer:3']
+
+def test_create_alert_broker():
+  assert isinstance(create_alert_broker({}), MemoryBroker)
+  with pytest.raises(ValueError): create_alert_broker({'ALERT_BROKER_URL': 'amqp://localhost'})
+
+def test_sse_event():
+  frame = sse_event({'id': 4, 'title': 'x'}, 'alert', 4)
+  lines = frame.split('\n')
+  assert frame.endswith('\n\n')
+  assert lines[:2] == ['id: 4', 'event: alert']
+  assert json.loads(lines[2][len('data: '):]) == {'id': 4, 'title': 'x'}
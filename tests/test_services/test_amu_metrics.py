@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from services.amu_metrics import unit_factor, parse_frequency, administered_mg
+
+class TestUnitFactor:
+  @pytest.mark.parametrize('unit,expected', [('mg', (1.0, False)), ('G', (1000.0, False)), ('mcg', (0.001, False)), ('mg/kg', (1.0, True)), (' g / kg ', (1000.0, True))])
+  def test_mass_units(self, unit, expected):
+    assert unit_factor(unit) == expected
+
+  @pytest.mark.parametrize('unit', ['ml', 'IU', '', None])
+  def test_unconvertible_units(self, unit):
+    assert np.isnan(unit_factor(unit)[0])
+
+class TestParseFrequency:
+  @pytest.mark.parametrize('frequency,expected', [
+    (None, (1.0, False)), ('once daily', (1.0, False)), ('twice daily', (2.0, False)), ('BID', (2.0, False)),
+    ('three times a day', (3.0, False)), ('every 8 hours', (3.0, False)), ('q12h', (2.0, False)), ('4x/day', (4.0, False)),
+    ('every other day', (0.5, False)), ('single dose', (1.0, True))
+  ])
+  def test_frequencies(self, frequency, expected):
+    assert parse_frequency(frequency) == pytest.approx(expected)
+
+  def test_weekly(self):
+    assert parse_frequency('once a week')[0] == pytest.approx(1 / 7)
+
+class TestAdministeredMg:
+  def test_course_total(self):
+    mg = administered_mg(np.array([10.0, 2.0]), np.array([1.0, 1000.0]), np.array([True, False]), np.array([30.0, 400.0]), np.array([2.0, 1.0]), np.array([False, True]), np.array([3.0, 5.0]))
+    assert mg.tolist() == [1800.0, 2000.0]
+
+  def test_missing_duration_counts_one_day(self):
+    mg = administered_mg(np.array([5.0]), np.array([1.0]), np.array([False]), np.array([1.0]), np.array([1.0]), np.array([False]), np.array([np.nan]))
+    assert mg.tolist() == [5.0]
+
+  def test_unconvertible_unit_is_nan(self):
+    mg = administered_mg(np.array([5.0]), np.array([np.nan]), np.array([False]), np.array([1.0]), np.array([1.0]), np.array([False]), np.array([1.0]))
+    assert np.isnan(mg[0])
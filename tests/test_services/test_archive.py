@@ -0,0 +1,35 @@
+import pytest
+from datetime import datetime, timezone
+from flask import Flask
+import models
+from extensions import db, segment_store
+from services import archive
+from services.ledger import append_events
+from services.checkpoints import create_checkpoints
+
+@pytest.fixture
+def app(tmp_path):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', TRACE_ARCHIVE_URL=str(tmp_path))
+  db.init_app(app)
+  segment_store.reset()
+  with app.app_context():
+    db.create_all()
+    yield app
+  segment_store.reset()
+
+def test_find_log_opens_one_segment(app, monkeypatch):
+  for n in range(4):
+    append_events([(livestock_id, 'livestock_updated', {'n': n}) for livestock_id in (1, 2, 3)], performed_by=1)
+  db.session.commit()
+  create_checkpoints(datetime.now(timezone.utc).date())
+  assert archive.archive_segments(older_than_days=-1)['segments'] == 3
+
+  reads = []
+  read_segment = archive.read_segment
+  monkeypatch.setattr(archive, 'read_segment', lambda segment: reads.append(segment.livestock_id) or read_segment(segment))
+  archived = models.TraceabilitySegment.query.filter_by(livestock_id=2).one()
+  log = archive.find_log(archived.first_log_id + 3)
+  assert (log.livestock_id, log.event_data) == (2, {'n': 1})
+  assert reads == [2]
+  assert archive.find_log(10_000) is None
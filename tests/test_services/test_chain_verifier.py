@@ -0,0 +1,49 @@
+from datetime import datetime
+from services.ledger import GENESIS_HASH, compute_hash
+from services.chain_verifier import verify_chain, batch_chains
+
+def build_chain(livestock_id, events, legacy=0):
+  rows, previous = [], GENESIS_HASH
+  for i, event in enumerate(events):
+    timestamp = datetime(2025, 1, 1, 10, 0, i)
+    hash_value = compute_hash(livestock_id, 'livestock_updated', event, timestamp, previous)
+    rows.append((i + 1, 'livestock_updated', event, timestamp, hash_value, previous, None if i < legacy else i + 1))
+    previous = hash_value
+  return rows
+
+class TestVerifyChain:
+  def test_intact_chain(self):
+    report = verify_chain(1, build_chain(1, [{'n': i} for i in range(5)]))
+    assert report['logs'] == 5
+    assert report['breaks'] == []
+
+  def test_tampered_event_data(self):
+    rows = build_chain(1, [{'n': i} for i in range(3)])
+    rows[1] = rows[1][:2] + ({'n': 99},) + rows[1][3:]
+    report = verify_chain(1, rows)
+    assert report['breaks'] == [{'log_id': 2, 'reason': 'hash_mismatch'}]
+
+  def test_deleted_log_breaks_link(self):
+    rows = build_chain(1, [{'n': i} for i in range(3)])
+    del rows[1]
+    reasons = {b['reason'] for b in verify_chain(1, rows)['breaks']}
+    assert reasons == {'previous_hash_mismatch', 'sequence_gap'}
+
+  def test_legacy_logs_are_link_checked_only(self):
+    rows = build_chain(1, [{'n': i} for i in range(4)], legacy=2)
+    rows[0] = rows[0][:2] + ({'n': 99},) + rows[0][3:]
+    report = verify_chain(1, rows)
+    assert report['legacy_logs'] == 2
+    assert report['breaks'] == []
+
+  def test_chain_resumes_from_archived_anchor(self):
+    rows = build_chain(1, [{'n': i} for i in range(5)])
+    anchor = (rows[1][4], rows[1][6])
+    assert verify_chain(1, rows[2:], anchor)['breaks'] == []
+    assert verify_chain(1, rows[3:], anchor)['breaks'] != []
+
+def test_batch_chains_keeps_chains_whole():
+  chains = [(i, build_chain(i, [{}] * 3), None) for i in range(5)]
+  batches = list(batch_chains(iter(chains), 7))
+  assert [len(b) for b in batches] == [3, 2]
+  assert sum(len(rows) for b in batches for _, rows, _ in b) == 15
@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timezone
+from flask import Flask
+from sqlalchemy import event, update, null
+import models
+from extensions import db
+from services.ledger import append_events
+from services.checkpoints import create_checkpoints, build_inclusion_proof
+from services.merkle import verify_inclusion
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    yield app
+
+def today():
+  return datetime.now(timezone.utc).date()
+
+def append(counts):
+  append_events([(livestock_id, 'livestock_updated', {'n': n}) for livestock_id, count in counts.items() for n in range(count)], performed_by=1)
+  db.session.commit()
+
+def assert_provable(log):
+  proof = build_inclusion_proof(log)
+  checkpoint, daily = proof['animal_checkpoint'], proof['daily_root']
+  assert verify_inclusion(proof['leaf'], checkpoint['proof'], checkpoint['root_hash'])
+  assert verify_inclusion(daily['leaf'], daily['proof'], daily['root_hash'])
+  return proof
+
+def test_every_log_is_provable_across_runs(app):
+  append({1: 5, 2: 3, 3: 1})
+  create_checkpoints(today())
+  append({2: 6})
+  daily = create_checkpoints(today())
+
+  assert daily.animal_count == 3
+  logs = models.TraceabilityLog.query.all()
+  assert models.TraceabilityMerkleNode.query.filter(models.TraceabilityMerkleNode.level == 0).count() == len(logs)
+  for log in logs: assert_provable(log)
+
+def test_proof_reads_stored_nodes_only(app):
+  append({1: 13, 2: 2})
+  create_checkpoints(today())
+  log = models.TraceabilityLog.query.filter_by(livestock_id=1).order_by(models.TraceabilityLog.id).offset(6).first()
+
+  statements = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+  proof = assert_provable(log)
+  assert proof['leaf_index'] == 6
+  assert len(statements) == 4
+  assert not any('traceability_logs' in statement for statement in statements)
+
+def test_checkpoints_without_peaks_are_rebuilt(app):
+  append({1: 4})
+  create_checkpoints(today())
+  db.session.execute(update(models.TraceabilityCheckpoint).values(merkle_peaks=null(), daily_proof=null()))
+  models.TraceabilityMerkleNode.query.delete()
+  db.session.commit()
+
+  create_checkpoints(today())
+  for log in models.TraceabilityLog.query.all(): assert_provable(log)
@@ -0,0 +1,25 @@
+from services.counters import alert_keys, livestock_keys, data_request_keys, open_alerts
+
+class TestCounterKeys:
+  def test_alert_counts_for_farmer_and_vet(self):
+    keys = alert_keys(3, 9, 'unread', 'high', 'excessive_use')
+    assert ('farmer', 3, 'alerts.status.unread') in keys
+    assert ('veterinarian', 9, 'alerts.unread.severity.high') in keys
+    assert ('veterinarian', 9, 'alerts.unread.type.excessive_use') in keys
+    assert len(keys) == 6
+
+  def test_alert_without_vet(self):
+    assert {owner for owner, _, _ in alert_keys(3, None, 'read', 'low', 'mrl_breach')} == {'farmer'}
+
+  def test_inactive_livestock_not_counted(self):
+    assert livestock_keys(3, False, 'healthy') == []
+    assert livestock_keys(3, True, 'sick') == [('farmer', 3, 'livestock.active'), ('farmer', 3, 'livestock.health.sick')]
+
+  def test_data_request_status(self):
+    assert data_request_keys(5, 'pending') == [('researcher', 5, 'data_requests.status.pending')]
+
+class TestOpenAlerts:
+  def test_sums_unread_and_read_only(self):
+    counters = {'alerts.unread.severity.critical': 2, 'alerts.read.severity.critical': 1, 'alerts.acknowledged.severity.critical': 5}
+    assert open_alerts(counters, 'severity', 'critical') == 3
+    assert open_alerts(counters, 'type', 'mrl_breach') == 0
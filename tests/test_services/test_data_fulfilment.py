@@ -0,0 +1,29 @@
+from services.data_fulfilment import pseudonymiser, anonymise, ANONYMISED_FIELDS
+from services.dataset_export import EXPORT_FIELDS
+
+class TestPseudonymiser:
+  def test_stable_within_a_request(self):
+    pseudonym = pseudonymiser('secret', 7)
+    assert pseudonym('farm', 12) == pseudonymiser('secret', 7)('farm', 12)
+    assert len(pseudonym('farm', 12)) == 24
+
+  def test_scoped_by_kind_request_and_key(self):
+    reference = pseudonymiser('secret', 7)('farm', 12)
+    assert pseudonymiser('secret', 7)('animal', 12) != reference
+    assert pseudonymiser('secret', 8)('farm', 12) != reference
+    assert pseudonymiser('other', 7)('farm', 12) != reference
+
+  def test_none_stays_none(self):
+    assert pseudonymiser('secret', 7)('animal', None) is None
+
+class TestAnonymise:
+  def test_drops_record_id_and_replaces_identifiers(self):
+    assert 'record_id' not in ANONYMISED_FIELDS and 'farmer_id' not in ANONYMISED_FIELDS and 'livestock_id' not in ANONYMISED_FIELDS
+    assert {'farm_ref', 'animal_ref', 'district'} <= set(ANONYMISED_FIELDS)
+    row = tuple(range(len(EXPORT_FIELDS)))
+    [[anonymised]] = list(anonymise(iter([[row]]), lambda kind, value: f'{kind}-{value}'))
+    values = dict(zip(ANONYMISED_FIELDS, anonymised))
+    assert values['farm_ref'] == f'farm-{EXPORT_FIELDS.index("farmer_id")}'
+    assert values['animal_ref'] == f'animal-{EXPORT_FIELDS.index("livestock_id")}'
+    assert values['district'] == EXPORT_FIELDS.index('district')
+    assert len(anonymised) == len(EXPORT_FIELDS) - 1
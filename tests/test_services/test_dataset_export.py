@@ -0,0 +1,29 @@
+import csv, io
+from datetime import date
+import pytest
+from services.dataset_export import encode_csv, encode_parquet
+
+COLUMNS = (('record_id', None, 'int64'), ('start_date', None, 'date32'), ('drug_name', None, 'string'))
+CHUNKS = [[(1, date(2025, 1, 1), 'Oxytetracycline'), (2, None, 'Enrofloxacin, 10%')], [(3, date(2025, 2, 1), None)]]
+
+class TestEncodeCsv:
+  def test_header_then_one_piece_per_chunk(self):
+    pieces = list(encode_csv(iter(CHUNKS), ('record_id', 'start_date', 'drug_name')))
+    assert len(pieces) == 2
+    rows = list(csv.reader(io.StringIO(b''.join(pieces).decode())))
+    assert rows == [['record_id', 'start_date', 'drug_name'], ['1', '2025-01-01', 'Oxytetracycline'], ['2', '', 'Enrofloxacin, 10%'], ['3', '2025-02-01', '']]
+
+  def test_empty_export_has_header(self):
+    assert b''.join(encode_csv(iter([]), ('record_id',))) == b'record_id\r\n'
+
+class TestEncodeParquet:
+  def test_one_row_group_per_chunk(self):
+    pq = pytest.importorskip('pyarrow.parquet')
+    parquet = pq.ParquetFile(io.BytesIO(b''.join(encode_parquet(iter(CHUNKS), COLUMNS))))
+    assert parquet.num_row_groups == 2
+    assert parquet.read().to_pylist()[1] == {'record_id': 2, 'start_date': None, 'drug_name': 'Enrofloxacin, 10%'}
+
+  def test_streams_before_footer(self):
+    pytest.importorskip('pyarrow')
+    pieces = encode_parquet(iter(CHUNKS), COLUMNS)
+    assert next(pieces).startswith(b'PAR1')
@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+import models
+from extensions import db
+from services.farm_rollup import record_farm_usage, farm_usage_summary, rebuild_farm_usage
+
+TODAY = datetime(2026, 3, 31).date()
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    for livestock_id, farmer_id in ((1, 1), (2, 1), (3, 2)): db.session.add(models.Livestock(id=livestock_id, farmer_id=farmer_id, rfid_tag=f'RFID-{livestock_id}', species='cattle'))
+    db.session.commit()
+    yield app
+
+def days_ago(n):
+  return TODAY - timedelta(days=n)
+
+def rollup():
+  return {(row.farmer_id, row.usage_date, row.drug_key, row.category_key, row.unit): (row.record_count, row.total_dosage) for row in models.FarmAmuDaily.query.all()}
+
+def test_repeated_records_increment_one_bucket(app):
+  assert record_farm_usage([(1, 'Oxytetracycline', 'Tetracycline', 10, 'ml'), (1, ' oxytetracycline', 'tetracycline ', 5, 'ml'), (1, 'Oxytetracycline', 'Tetracycline', 2, 'g')], TODAY) == 2
+  record_farm_usage([(1, 'OXYTETRACYCLINE', 'Tetracycline', 2.5, 'ml'), (2, 'Oxytetracycline', None, None, 'ml')], TODAY)
+  db.session.commit()
+  assert rollup() == {
+    (1, TODAY, 'oxytetracycline', 'tetracycline', 'ml'): (3, 17.5),
+    (1, TODAY, 'oxytetracycline', 'tetracycline', 'g'): (1, 2.0),
+    (2, TODAY, 'oxytetracycline', '', 'ml'): (1, 0.0),
+  }
+
+def test_summary_reads_recent_and_top_drugs(app):
+  record_farm_usage([(1, 'Oxytetracycline', None, 1, 'ml')] * 3, TODAY)
+  record_farm_usage([(1, 'Enrofloxacin', None, 1, 'ml')] * 2, days_ago(29))
+  record_farm_usage([(1, 'Enrofloxacin', None, 1, 'ml')] * 2, days_ago(30))
+  record_farm_usage([(1, 'Colistin', None, 1, 'ml')] * 5, days_ago(90))
+  record_farm_usage([(2, 'Colistin', None, 1, 'ml')] * 9, TODAY)
+  db.session.commit()
+  assert farm_usage_summary(1, today=TODAY) == {'total': 12, 'recent': 5, 'top_drugs': [('Enrofloxacin', 4), ('Oxytetracycline', 3)]}
+  assert farm_usage_summary(3, today=TODAY) == {'total': 0, 'recent': 0, 'top_drugs': []}
+
+def test_rebuild_matches_incremental_rollup(app):
+  records = [(1, 'Oxytetracycline', 'Tetracycline', 10, 'ml', 0), (2, 'Oxytetracycline ', 'Tetracycline', 5, 'ml', 0), (3, 'Enrofloxacin', None, 3, 'ml', 2), (1, 'Oxytetracycline', 'Tetracycline', 4, 'ml', 5)]
+  for livestock_id, drug_name, drug_category, dosage, unit, age in records:
+    db.session.add(models.AntimicrobialRecord(livestock_id=livestock_id, drug_name=drug_name, drug_category=drug_category, dosage=dosage, unit=unit, start_date=days_ago(age), created_at=datetime.combine(days_ago(age), datetime.min.time()) + timedelta(hours=8)))
+    record_farm_usage([(1 if livestock_id < 3 else 2, drug_name, drug_category, dosage, unit)], days_ago(age))
+  db.session.commit()
+  incremental = rollup()
+
+  assert rebuild_farm_usage() == 3
+  assert rollup() == incremental
+
+  record_farm_usage([(1, 'Oxytetracycline', 'Tetracycline', 100, 'ml')], days_ago(5))
+  record_farm_usage([(2, 'Enrofloxacin', None, 100, 'ml')], days_ago(2))
+  db.session.commit()
+  assert rebuild_farm_usage(since=days_ago(2)) == 2
+  assert rollup()[(2, days_ago(2), 'enrofloxacin', '', 'ml')] == (1, 3.0)
+  assert rollup()[(1, days_ago(5), 'oxytetracycline', 'tetracycline', 'ml')] == (2, 104.0)
@@ -0,0 +1,52 @@
+import pytest
+from datetime import datetime
+from flask import Flask
+import models
+from extensions import db
+from services.ledger import GENESIS_HASH, compute_hash, lock_chain_head, append_event, append_events
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    yield app
+
+def chain(livestock_id):
+  return models.TraceabilityLog.query.filter_by(livestock_id=livestock_id).order_by(models.TraceabilityLog.id).all()
+
+def test_hash_is_stable():
+  timestamp = datetime(2025, 1, 1, 10, 0, 0)
+  first = compute_hash(7, 'livestock_updated', {'weight_kg': 410, 'stage': 'adult'}, timestamp, GENESIS_HASH)
+  assert first == compute_hash(7, 'livestock_updated', {'stage': 'adult', 'weight_kg': 410}, timestamp, GENESIS_HASH)
+  assert first != compute_hash(7, 'livestock_updated', {'stage': 'adult', 'weight_kg': 411}, timestamp, GENESIS_HASH)
+  assert first != compute_hash(7, 'livestock_updated', {'stage': 'adult', 'weight_kg': 410}, timestamp, 'f' * 64)
+
+def test_head_bootstraps_from_legacy_logs(app):
+  for n, previous in enumerate([GENESIS_HASH, 'a' * 64]):
+    db.session.add(models.TraceabilityLog(livestock_id=1, event_type='legacy', event_data={'n': n}, performed_by=1, timestamp=datetime(2024, 1, 1), hash_value='ab'[n] * 64, previous_hash=previous))
+  db.session.commit()
+
+  head = lock_chain_head(1)
+  assert (head.last_hash, head.sequence) == ('b' * 64, 2)
+  log = append_event(1, 'livestock_updated', {'n': 2}, performed_by=1)
+  db.session.commit()
+  assert (log.previous_hash, log.sequence) == ('b' * 64, 3)
+  assert models.TraceabilityChainHead.query.count() == 1
+
+def test_bulk_append_links_each_chain(app):
+  append_event(2, 'livestock_added', {}, performed_by=1)
+  db.session.commit()
+  append_events([(livestock_id, 'amu_recorded', {'n': n}) for n in range(3) for livestock_id in (1, 2)], performed_by=1)
+  db.session.commit()
+
+  for livestock_id, length in ((1, 3), (2, 4)):
+    logs = chain(livestock_id)
+    assert [log.sequence for log in logs] == list(range(1, length + 1))
+    assert logs[0].previous_hash == GENESIS_HASH
+    for previous, log in zip(logs, logs[1:]): assert log.previous_hash == previous.hash_value
+    for log in logs: assert log.hash_value == compute_hash(log.livestock_id, log.event_type, log.event_data, log.timestamp, log.previous_hash)
+    head = db.session.get(models.TraceabilityChainHead, livestock_id)
+    assert (head.last_hash, head.sequence) == (logs[-1].hash_value, length)
@@ -0,0 +1,64 @@
+import pytest
+from services.merkle import leaf_hash, node_hash, merkle_root, inclusion_proof, verify_inclusion, extend_peaks, root_from_peaks, find_peak, peak_siblings, bagged_proof
+
+def leaves(n):
+  return [leaf_hash(f'event-{i}') for i in range(n)]
+
+class TestMerkle:
+  def test_single_leaf_is_root(self):
+    assert merkle_root(leaves(1)) == leaves(1)[0]
+
+  def test_two_leaves(self):
+    a, b = leaves(2)
+    assert merkle_root([a, b]) == node_hash(a, b)
+
+  def test_leaf_and_node_hashes_are_domain_separated(self):
+    a, b = leaves(2)
+    assert leaf_hash(a + b) != node_hash(a, b)
+
+  @pytest.mark.parametrize('n', [1, 2, 3, 5, 8, 13, 100])
+  def test_every_leaf_proves_inclusion(self, n):
+    tree = leaves(n)
+    root = merkle_root(tree)
+    for i in range(n):
+      proof = inclusion_proof(tree, i)
+      assert len(proof) <= max(n - 1, 0).bit_length()
+      assert verify_inclusion(tree[i], proof, root)
+
+  def test_proof_rejects_other_leaf(self):
+    tree = leaves(7)
+    assert not verify_inclusion(tree[4], inclusion_proof(tree, 3), merkle_root(tree))
+
+  def test_empty_tree_rejected(self):
+    with pytest.raises(ValueError): merkle_root([])
+
+  def test_index_out_of_range(self):
+    with pytest.raises(IndexError): inclusion_proof(leaves(3), 3)
+
+  @pytest.mark.parametrize('n', [1, 2, 3, 6, 7, 16, 33])
+  def test_peaks_resume_to_same_root(self, n):
+    tree = leaves(n)
+    for split in range(n + 1):
+      peaks = extend_peaks(extend_peaks([], tree[:split]), tree[split:])
+      assert root_from_peaks(peaks) == merkle_root(tree)
+      assert sum(size for size, _ in peaks) == n
+
+  @pytest.mark.parametrize('n', [1, 2, 3, 6, 7, 16, 33])
+  def test_peak_proofs_match_tree_root(self, n):
+    tree = leaves(n)
+    peaks = extend_peaks([], tree)
+    for i in range(n):
+      position, start = find_peak(peaks, i)
+      proof = bagged_proof(peaks, position, inclusion_proof(tree[start:start + peaks[position][0]], i - start))
+      assert verify_inclusion(tree[i], proof, merkle_root(tree))
+
+  @pytest.mark.parametrize('n', [1, 2, 3, 6, 7, 16, 33])
+  def test_peak_nodes_answer_proofs(self, n):
+    tree, nodes = leaves(n), []
+    peaks = extend_peaks(extend_peaks([], tree[:n // 3], nodes), tree[n // 3:], nodes)
+    stored = {(level, position): hash_value for level, position, hash_value in nodes}
+    assert len(stored) == len(nodes)
+    for i in range(n):
+      position, _ = find_peak(peaks, i)
+      proof = [{'position': side, 'hash': stored[(level, sibling)]} for level, sibling, side in peak_siblings(i, peaks[position][0])]
+      assert verify_inclusion(stored[(0, i)], bagged_proof(peaks, position, proof), merkle_root(tree))
@@ -0,0 +1,72 @@
+import pytest
+from datetime import date, datetime
+from flask import Flask
+from sqlalchemy import update
+import models
+from extensions import db
+from utils.pagination import InvalidCursor, encode_cursor, decode_cursor, page_size, paginate_request
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SECRET_KEY='test-secret', PAGINATION_DEFAULT=20, PAGINATION_MAX=100)
+  return app
+
+class TestCursor:
+  @pytest.mark.parametrize('sort_value', [datetime(2026, 3, 1, 12, 30, 5), date(2026, 3, 1), 42, None])
+  def test_round_trip(self, app, sort_value):
+    with app.app_context():
+      assert decode_cursor('alerts', encode_cursor('alerts', sort_value, 7)) == (sort_value, 7)
+
+  def test_rejects_other_scope(self, app):
+    with app.app_context():
+      with pytest.raises(InvalidCursor): decode_cursor('livestock', encode_cursor('alerts', 1, 1))
+
+  def test_rejects_tampered_token(self, app):
+    with app.app_context():
+      token = encode_cursor('alerts', 1, 1)
+      with pytest.raises(InvalidCursor): decode_cursor('alerts', token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'))
+
+  def test_rejects_other_secret(self, app):
+    with app.app_context(): token = encode_cursor('alerts', 1, 1)
+    app.config['SECRET_KEY'] = 'rotated'
+    with app.app_context():
+      with pytest.raises(InvalidCursor): decode_cursor('alerts', token)
+
+class TestPageSize:
+  @pytest.mark.parametrize('query,expected', [('', 20), ('?per_page=5', 5), ('?per_page=5000', 100), ('?per_page=0', 1), ('?per_page=abc', 20)])
+  def test_clamped(self, app, query, expected):
+    with app.test_request_context(f'/list{query}'):
+      assert page_size() == expected
+
+@pytest.fixture
+def alerts(app):
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    for n, day in enumerate([3, None, 1, 3, None, 2, None], start=1):
+      db.session.add(models.Alert(id=n, farmer_id=1, alert_type='mrl_breach', title='MRL breach', message='MRL breach', created_at=datetime(2026, 3, day or 1)))
+    db.session.flush()
+    db.session.execute(update(models.Alert).where(models.Alert.id.in_([2, 5, 7])).values(created_at=None))
+    db.session.commit()
+  return app
+
+def walk(app, descending):
+  seen, cursor = [], ''
+  while cursor is not None:
+    with app.test_request_context('/alerts', query_string={'cursor': cursor, 'per_page': 2}):
+      items, meta = paginate_request(models.Alert.query, 'alerts', models.Alert.created_at, models.Alert.id, descending=descending)
+      seen += [item.id for item in items]
+      cursor = meta['next_cursor']
+  return seen
+
+class TestPaginateRequest:
+  def test_cursor_pages_through_null_sort_values(self, alerts):
+    assert walk(alerts, descending=True) == [4, 1, 6, 3, 7, 5, 2]
+    assert walk(alerts, descending=False) == [3, 6, 1, 4, 2, 5, 7]
+
+  def test_page_mode_uses_the_same_order(self, alerts):
+    with alerts.test_request_context('/alerts?page=2&per_page=3'):
+      items, meta = paginate_request(models.Alert.query, 'alerts', models.Alert.created_at, models.Alert.id)
+      assert [item.id for item in items] == [3, 7, 5]
@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+import models
+from extensions import db
+from services import regional_analytics
+from services.regional_analytics import changed_days
+
+TODAY = datetime(2026, 3, 31).date()
+STARTED_AT = datetime(2026, 3, 31, 12, 0, 0)
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', ANALYTICS_COMMIT_LAG_SECONDS=300)
+  db.init_app(app)
+  monkeypatch.setattr(regional_analytics, 'analytics_today', lambda: TODAY)
+  with app.app_context():
+    db.create_all()
+    yield app
+
+def days_ago(n):
+  return TODAY - timedelta(days=n)
+
+def add_record(record_id, start_date, created_at):
+  db.session.add(models.AntimicrobialRecord(id=record_id, livestock_id=1, drug_name='Oxytetracycline', dosage=1, unit='ml', start_date=start_date, created_at=created_at))
+
+def add_breach(alert_id, created_at):
+  db.session.add(models.Alert(id=alert_id, farmer_id=1, alert_type='mrl_breach', severity='high', title='MRL breach', message='MRL breach', created_at=created_at))
+
+def last_run(last_amu_record_id, last_alert_id):
+  return models.RegionalAnalyticsRun(status='completed', started_at=STARTED_AT, last_amu_record_id=last_amu_record_id, last_alert_id=last_alert_id)
+
+def test_first_run_covers_every_day_up_to_today(app):
+  add_record(1, days_ago(40), STARTED_AT)
+  add_record(2, TODAY + timedelta(days=3), STARTED_AT)
+  add_breach(1, datetime.combine(days_ago(10), datetime.min.time()))
+  db.session.commit()
+  assert changed_days(None) == [days_ago(40), days_ago(10), days_ago(1), TODAY]
+
+def test_rows_above_the_high_water_mark_are_picked_up(app):
+  add_record(5, days_ago(20), STARTED_AT - timedelta(days=2))
+  add_record(11, days_ago(7), STARTED_AT + timedelta(minutes=5))
+  add_breach(3, STARTED_AT - timedelta(days=2))
+  add_breach(4, datetime.combine(days_ago(3), datetime.min.time()) + timedelta(hours=1))
+  db.session.commit()
+  assert changed_days(last_run(10, 3)) == [days_ago(7), days_ago(3), days_ago(1), TODAY]
+
+def test_rows_committed_out_of_id_order_are_picked_up(app):
+  # The last run started just after midnight and read max ids 10 and 3 while record 8 and alert 2 were still in flight.
+  run = last_run(10, 3)
+  run.started_at = datetime.combine(days_ago(1), datetime.min.time()) + timedelta(minutes=2)
+  add_record(8, days_ago(12), run.started_at - timedelta(seconds=60))
+  add_breach(2, run.started_at - timedelta(minutes=4))
+  add_record(6, days_ago(25), run.started_at - timedelta(minutes=10))
+  add_breach(1, run.started_at - timedelta(minutes=10))
+  db.session.commit()
+  assert changed_days(run) == [days_ago(12), days_ago(2), days_ago(1), TODAY]
+
+  app.config['ANALYTICS_COMMIT_LAG_SECONDS'] = 0
+  assert changed_days(run) == [days_ago(1), TODAY]
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from services.residue_projection import residue_ratios, superpose, first_safe_day
+
+class TestResidueRatios:
+  def test_reaches_mrl_at_withdrawal_day(self):
+    ratios = residue_ratios(np.array([[0.0, 5.0, 10.0, 20.0]]), np.array([10.0]), 100.0)
+    assert ratios[0].tolist() == pytest.approx([100.0, 10.0, 1.0, 0.01])
+
+  def test_peak_during_treatment(self):
+    ratios = residue_ratios(np.array([[-2.0, -1.0, 0.0]]), np.array([10.0]), 100.0)
+    assert ratios[0].tolist() == pytest.approx([100.0, 100.0, 100.0])
+
+class TestSuperpose:
+  def test_sums_courses_of_same_group(self):
+    curves = np.array([[4.0, 2.0], [1.0, 0.5], [3.0, 3.0]])
+    assert superpose(curves, np.array([0, 0, 1]), 2).tolist() == [[5.0, 2.5], [3.0, 3.0]]
+
+  def test_empty(self):
+    assert superpose(np.zeros((0, 3)), np.array([], dtype=np.int64), 0).shape == (0, 3)
+
+class TestFirstSafeDay:
+  def test_safe_days(self):
+    curves = np.array([[3.0, 2.0, 0.9, 0.5], [0.5, 0.4, 0.3, 0.2], [5.0, 4.0, 3.0, 2.0]])
+    assert first_safe_day(curves).tolist() == [2, 0, -1]
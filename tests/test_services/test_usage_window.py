@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+import models
+from extensions import db
+from services import usage_window
+from services.usage_window import record_usage, window_counts, excessive_usage, rebuild_usage, prune_usage
+
+TODAY = datetime(2026, 3, 31).date()
+
+@pytest.fixture
+def app(monkeypatch):
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', AMU_USAGE_THRESHOLD=3, AMU_USAGE_WINDOW_DAYS=30, AMU_USAGE_RULES={'critical': {'threshold': 2, 'window_days': 7}})
+  db.init_app(app)
+  monkeypatch.setattr(usage_window, 'usage_today', lambda: TODAY)
+  with app.app_context():
+    db.create_all()
+    yield app
+
+def days_ago(n):
+  return TODAY - timedelta(days=n)
+
+def buckets():
+  return {(row.livestock_id, row.drug_key, row.usage_date): row.usage_count for row in models.AntimicrobialUsageDaily.query.all()}
+
+def test_usage_accumulates_per_animal_drug_and_day(app):
+  record_usage([(1, 'Oxytetracycline'), (1, ' oxytetracycline '), (2, 'Oxytetracycline')])
+  record_usage([(1, 'OXYTETRACYCLINE')])
+  record_usage([(1, 'Oxytetracycline')], days_ago(1))
+  db.session.commit()
+  assert buckets() == {(1, 'oxytetracycline', TODAY): 3, (2, 'oxytetracycline', TODAY): 1, (1, 'oxytetracycline', days_ago(1)): 1}
+
+def test_window_sums_only_days_inside_the_window(app):
+  for n in (0, 6, 7, 29, 30): record_usage([(1, 'Enrofloxacin')], days_ago(n))
+  db.session.commit()
+  assert window_counts([(1, 'enrofloxacin')], 7) == {(1, 'enrofloxacin'): 2}
+  assert window_counts([(1, 'Enrofloxacin'), (2, 'Enrofloxacin')], 30) == {(1, 'enrofloxacin'): 4}
+  assert window_counts([], 30) == {}
+
+def test_threshold_and_window_follow_the_category_rule(app):
+  record_usage([(1, 'Colistin'), (2, 'Amoxicillin'), (2, 'Amoxicillin')], days_ago(10))
+  flagged = excessive_usage([(1, 'Colistin', 'Critical'), (2, 'Amoxicillin', None)])
+  assert flagged == {(2, 'amoxicillin'): {'drug_name': 'Amoxicillin', 'count': 3, 'threshold': 3, 'window_days': 30}}
+
+  flagged = excessive_usage([(1, 'Colistin', 'critical')])
+  assert flagged == {(1, 'colistin'): {'drug_name': 'Colistin', 'count': 2, 'threshold': 2, 'window_days': 7}}
+
+def test_rebuild_and_prune(app):
+  created = [datetime.combine(days_ago(n), datetime.min.time()) + timedelta(hours=9) for n in (0, 0, 3, 45)]
+  for n, created_at in enumerate(created): db.session.add(models.AntimicrobialRecord(livestock_id=1, drug_name='Oxytetracycline ' if n else 'Oxytetracycline', dosage=1, unit='ml', start_date=created_at.date(), created_at=created_at))
+  record_usage([(9, 'Stale')], days_ago(2))
+  db.session.commit()
+
+  assert rebuild_usage() == 2
+  assert buckets() == {(1, 'oxytetracycline', TODAY): 2, (1, 'oxytetracycline', days_ago(3)): 1}
+
+  record_usage([(1, 'Oxytetracycline')], days_ago(31))
+  db.session.commit()
+  assert prune_usage() == 1
+  assert len(buckets()) == 2
@@ -0,0 +1,59 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event, insert
+import models
+from extensions import db
+from services.withdrawal_periods import WithdrawalPeriodTable, withdrawal_periods
+
+@pytest.fixture
+def app():
+  app = Flask(__name__)
+  app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+  db.init_app(app)
+  with app.app_context():
+    db.create_all()
+    for tissue, days in (('meat', 28), ('milk', 7)): db.session.add(models.WithdrawalPeriod(drug_name='Oxytetracycline', species='cattle', tissue_type=tissue, withdrawal_period_days=days))
+    db.session.add(models.WithdrawalPeriod(drug_name='Oxytetracycline', species='poultry', tissue_type='eggs', withdrawal_period_days=5))
+    db.session.commit()
+    yield app
+
+@pytest.fixture
+def statements(app):
+  captured = []
+  event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: captured.append(statement))
+  return captured
+
+def test_lookup_picks_tissue_or_strictest(app):
+  table = WithdrawalPeriodTable()
+  assert table.lookup(' oxytetracycline', 'cattle').withdrawal_period_days == 28
+  assert table.lookup('Oxytetracycline', 'cattle', 'milk').withdrawal_period_days == 7
+  assert table.lookup('Oxytetracycline', 'cattle', 'eggs') is None
+  assert table.lookup('Enrofloxacin', 'cattle') is None
+  assert sorted(p.tissue_type for p in table.tissues('OXYTETRACYCLINE', 'cattle')) == ['meat', 'milk']
+
+def test_lookups_are_served_from_memory(app, statements):
+  table = WithdrawalPeriodTable(check_interval=3600)
+  table.lookup('Oxytetracycline', 'cattle')
+  loaded = len(statements)
+  for _ in range(100): table.lookup('Oxytetracycline', 'poultry', 'eggs')
+  assert len(statements) == loaded == 2
+
+def test_orm_change_invalidates(app):
+  withdrawal_periods.check_interval = 3600
+  withdrawal_periods.invalidate()
+  assert withdrawal_periods.lookup('Oxytetracycline', 'cattle').withdrawal_period_days == 28
+  db.session.add(models.WithdrawalPeriod(drug_name='Oxytetracycline', species='cattle', tissue_type='meat', withdrawal_period_days=35))
+  db.session.commit()
+  assert withdrawal_periods.lookup('Oxytetracycline', 'cattle').withdrawal_period_days == 35
+
+def test_new_version_is_picked_up_after_check_interval(app):
+  table = WithdrawalPeriodTable(check_interval=3600)
+  table.lookup('Oxytetracycline', 'cattle')
+  version = table.version
+  db.session.execute(insert(models.WithdrawalPeriod), [{'drug_name': 'Enrofloxacin', 'species': 'cattle', 'tissue_type': 'meat', 'withdrawal_period_days': 14}])
+  db.session.commit()
+  assert table.lookup('Enrofloxacin', 'cattle') is None
+
+  table.check_interval = 0
+  assert table.lookup('Enrofloxacin', 'cattle').withdrawal_period_days == 14
+  assert table.version != version
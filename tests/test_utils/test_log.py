@@ -0,0 +1,75 @@
+import json, logging, random, sys
+from flask import Flask, g
+from utils import log
+from utils.log import JsonFormatter, SamplingFilter, init_logging, get_logger
+
+def make_record(level, msg='request', **fields):
+  record = logging.LogRecord('cattlesense.request', level, __file__, 1, msg, None, None)
+  if fields: record.fields = fields
+  return record
+
+class TestSamplingFilter:
+  def test_keeps_every_warning_and_error(self):
+    sampler = SamplingFilter(rate=0.0)
+    assert all(sampler.filter(make_record(level)) for level in (logging.WARNING, logging.ERROR, logging.CRITICAL) for _ in range(200))
+    assert not any(sampler.filter(make_record(logging.INFO)) for _ in range(200))
+
+  def test_errors_ignore_the_warning_rate(self):
+    sampler = SamplingFilter(rate=0.0, warning_rate=0.0)
+    assert sampler.filter(make_record(logging.ERROR))
+    assert not sampler.filter(make_record(logging.WARNING))
+
+  def test_drops_the_expected_share_of_info(self, monkeypatch):
+    monkeypatch.setattr(log, 'random', random.Random(7))
+    sampler = SamplingFilter(rate=0.1)
+    kept = sum(sampler.filter(make_record(logging.INFO)) for _ in range(20000))
+    assert 1800 < kept < 2200
+
+class TestJsonFormatter:
+  def test_fields_are_merged_into_one_object(self):
+    entry = json.loads(JsonFormatter().format(make_record(logging.WARNING, 'request', method='GET', status=401, auth='expired')))
+    assert set(entry) == {'ts', 'level', 'logger', 'msg', 'method', 'status', 'auth'}
+    assert (entry['level'], entry['logger'], entry['msg'], entry['status']) == ('WARNING', 'cattlesense.request', 'request', 401)
+
+  def test_exceptions_are_formatted(self):
+    try: raise ValueError('boom')
+    except ValueError:
+      record = make_record(logging.ERROR, 'failed')
+      record.exc_info = sys.exc_info()
+    entry = json.loads(JsonFormatter().format(record))
+    assert 'ValueError: boom' in entry['exc']
+
+def make_app():
+  app = Flask(__name__)
+  app.config.update(LOG_LEVEL='INFO', LOG_REQUEST_SAMPLE_RATE=1.0, LOG_AUTH_FAILURE_SAMPLE_RATE=1.0)
+  init_logging(app)
+
+  @app.route('/ok')
+  def ok():
+    return 'ok'
+
+  @app.route('/denied')
+  def denied():
+    g.auth_outcome = 'expired'
+    return 'denied', 401
+  return app
+
+class TestInitLogging:
+  def test_queue_listener_lifecycle(self):
+    make_app()
+    first = log._listener
+    assert first._thread is not None
+    make_app()
+    assert first._thread is None and log._listener is not first and log._listener._thread is not None
+    log._stop_listener()
+    assert log._listener._thread is None
+
+  def test_one_json_line_per_request(self, capsys):
+    app = make_app()
+    client = app.test_client()
+    client.get('/ok')
+    client.get('/denied')
+    log._stop_listener()
+    entries = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(e['level'], e['path'], e['status'], e['auth']) for e in entries] == [('INFO', '/ok', 200, None), ('WARNING', '/denied', 401, 'expired')]
+    assert all(e['msg'] == 'request' and e['method'] == 'GET' and e['user_id'] is None and e['latency_ms'] >= 0 for e in entries)